@@ -0,0 +1,8 @@
+# Benchmarks for the site generator. The generator's modules live in src/ and
+# import each other as top-level modules, so make them importable from here.
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
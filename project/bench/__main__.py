@@ -0,0 +1,74 @@
+# Usage, from the project directory:
+#   python3 -m bench run --pages 200 --save baseline.json
+#   python3 -m bench compare baseline.json current.json --threshold 0.1
+#   python3 -m bench corpus /tmp/content --pages 10000
+import argparse
+import sys
+
+from bench.corpus import CorpusConfig, write_corpus
+from bench.harness import compare_results, format_results, load_results, run_benchmark, save_results
+
+
+def add_corpus_arguments(parser):
+    defaults = CorpusConfig()
+    parser.add_argument("--pages", type=int, default=defaults.pages)
+    parser.add_argument("--blocks-per-page", type=int, default=defaults.blocks_per_page)
+    parser.add_argument("--words-per-paragraph", type=int, default=defaults.words_per_paragraph)
+    parser.add_argument("--link-density", type=float, default=defaults.link_density)
+    parser.add_argument("--emphasis-density", type=float, default=defaults.emphasis_density)
+    parser.add_argument("--list-length", type=int, default=defaults.list_length)
+    parser.add_argument("--code-block-ratio", type=float, default=defaults.code_block_ratio)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def corpus_config(args):
+    return CorpusConfig(
+        pages=args.pages,
+        blocks_per_page=args.blocks_per_page,
+        words_per_paragraph=args.words_per_paragraph,
+        link_density=args.link_density,
+        emphasis_density=args.emphasis_density,
+        list_length=args.list_length,
+        code_block_ratio=args.code_block_ratio,
+        seed=args.seed,
+    )
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python3 -m bench")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="time each pipeline stage on a synthetic corpus")
+    add_corpus_arguments(run)
+    run.add_argument("--repeat", type=int, default=3, help="runs per stage; the fastest is kept")
+    run.add_argument("--save", help="write the results to this JSON file")
+
+    compare = commands.add_parser("compare", help="compare two saved results")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.1,
+                         help="slowdown fraction that counts as a regression (default: 0.1)")
+
+    corpus = commands.add_parser("corpus", help="write a synthetic content directory")
+    corpus.add_argument("content_dir")
+    add_corpus_arguments(corpus)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        results = run_benchmark(corpus_config(args), args.repeat)
+        print(format_results(results))
+        if args.save:
+            save_results(results, args.save)
+        return 0
+    if args.command == "compare":
+        lines, regressions = compare_results(
+            load_results(args.baseline), load_results(args.current), args.threshold
+        )
+        print("\n".join(lines))
+        return 1 if regressions else 0
+    write_corpus(corpus_config(args), args.content_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
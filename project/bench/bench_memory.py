@@ -0,0 +1,76 @@
+# Bytes per node of parsed trees: dict-backed nodes (as the classes were before __slots__),
+# the slotted node classes, and the flat NodeArena.
+# Run from the project directory: python3 -m bench.bench_memory
+import tracemalloc
+
+from bench.corpus import CorpusConfig, generate_corpus
+from block_markdown_converter import markdown_to_html_node
+from htmlnode import LeafNode, ParentNode
+from node_arena import NodeArena
+
+
+class DictNode:
+    # Same fields as HTMLNode, but with a per-instance __dict__ and an empty props dict per leaf
+    def __init__(self, tag, value, children, props):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+def to_dict_nodes(node):
+    if isinstance(node, ParentNode):
+        return DictNode(node.tag, None, [to_dict_nodes(child) for child in node.children],
+                        dict(node.props) if node.props else None)
+    return DictNode(node.tag, node.value, None, dict(node.props) if node.props else {})
+
+
+def copy_tree(node):
+    if isinstance(node, ParentNode):
+        return ParentNode(node.tag, [copy_tree(child) for child in node.children], node.props)
+    return LeafNode(node.tag, node.value, node.props)
+
+
+def count_nodes(node):
+    if isinstance(node, ParentNode):
+        return 1 + sum(count_nodes(child) for child in node.children)
+    return 1
+
+
+def measure(build):
+    # Allocated bytes still alive after build() returns, with its result held
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    config = CorpusConfig(pages=50)
+    markdowns = [markdown for _, markdown in generate_corpus(config)]
+    source_bytes = sum(len(markdown.encode()) for markdown in markdowns)
+
+    # Text values are shared by all three representations, so parse once and measure only the structure
+    trees = [markdown_to_html_node(markdown) for markdown in markdowns]
+    nodes = sum(count_nodes(tree) for tree in trees)
+
+    _, dict_bytes = measure(lambda: [to_dict_nodes(tree) for tree in trees])
+    _, slot_bytes = measure(lambda: [copy_tree(tree) for tree in trees])
+
+    def build_arena():
+        arena = NodeArena()
+        roots = [arena.add(tree) for tree in trees]
+        return arena, roots
+    (arena, roots), arena_bytes = measure(build_arena)
+    assert all(arena.to_html(root) == tree.to_html() for root, tree in zip(roots, trees))
+
+    print(f"{len(trees)} pages, {source_bytes} bytes of markdown, {nodes} HTML nodes")
+    print(f"dict-backed nodes  {dict_bytes / nodes:7.1f} bytes/node")
+    print(f"slotted nodes      {slot_bytes / nodes:7.1f} bytes/node")
+    print(f"NodeArena          {arena_bytes / nodes:7.1f} bytes/node")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Compare the old page pipeline (concatenate the tree into one string, fill the template with
+# str.replace, write it) with streaming the tree through the compiled template into the file.
+# Run from the project directory: python3 -m bench.bench_serialize
+import os
+import tempfile
+import timeit
+import tracemalloc
+
+from block_markdown_converter import markdown_to_html_node
+from htmlnode import LeafNode
+from template import compile_template
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "template.html")
+BASEPATH = "/StaticSiteGenerator/"
+
+
+def concat_to_html(node):
+    # The serializer as it was before streaming: every level concatenates its children
+    if isinstance(node, LeafNode):
+        return node.to_html()
+    children_html = ""
+    for child in node.children:
+        children_html += concat_to_html(child)
+    return f"<{node.tag}{node.props_to_html()}>{children_html}</{node.tag}>"
+
+
+def make_markdown(blocks):
+    parts = []
+    for i in range(blocks):
+        parts.append(f"## Section {i}")
+        parts.append(f"Some **bold** and _italic_ words with a [link](/page/{i}) in paragraph {i}.")
+        parts.append("\n".join(f"- item {j} of list {i}" for j in range(10)))
+        parts.append("```\ncode line one\ncode line two\n```")
+    return "\n\n".join(parts)
+
+
+def write_concat(node, template_content, path):
+    html_content = concat_to_html(node)
+    final_html = template_content.replace("{{ Title }}", "Title").replace("{{ Content }}", html_content)
+    final_html = final_html.replace('href="/', f'href="{BASEPATH}')
+    final_html = final_html.replace('src="/', f'src="{BASEPATH}')
+    with open(path, 'w') as f:
+        f.write(final_html)
+
+
+def write_streaming(node, template, path):
+    with open(path, 'w') as f:
+        template.write(f, {"Title": "Title", "Content": node})
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    with open(TEMPLATE_PATH) as f:
+        template_content = f.read()
+    template = compile_template(TEMPLATE_PATH, BASEPATH)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "page.html")
+        for blocks in (100, 1000, 10000):
+            node = markdown_to_html_node(make_markdown(blocks))
+            size = len(node.to_html())
+            number = max(1, 2000 // blocks)
+            concat = min(timeit.repeat(lambda: write_concat(node, template_content, path), number=number, repeat=5))
+            stream = min(timeit.repeat(lambda: write_streaming(node, template, path), number=number, repeat=5))
+            concat /= number
+            stream /= number
+            concat_peak = peak_memory(lambda: write_concat(node, template_content, path))
+            stream_peak = peak_memory(lambda: write_streaming(node, template, path))
+            print(f"{size / 1024:9.0f} KiB  concat {concat * 1e3:8.2f} ms {concat_peak / 1024:8.0f} KiB peak"
+                  f"  streaming {stream * 1e3:8.2f} ms {stream_peak / 1024:8.0f} KiB peak")
+
+
+if __name__ == "__main__":
+    main()
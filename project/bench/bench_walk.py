@@ -0,0 +1,122 @@
+# Compare the listdir-based tree walks (a listdir per directory, then isfile/isdir and, for
+# static files, os.stat on every entry) with the shared os.scandir walker, by time and by
+# the directory-listing and stat calls each makes on a generated tree.
+# Run from the project directory: python3 -m bench.bench_walk [--entries 100000]
+import argparse
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from walk import walk_files
+
+FANOUT = 10
+DEPTH = 3
+
+
+def make_tree(root, entries):
+    # FANOUT ** DEPTH leaf directories under DEPTH levels, the remaining entries spread over
+    # them as files, one in five of them markdown
+    dirs = [root]
+    for _ in range(DEPTH):
+        dirs = [os.path.join(parent, f"d{i}") for parent in dirs for i in range(FANOUT)]
+    for dir_path in dirs:
+        os.makedirs(dir_path)
+    dir_count = sum(FANOUT ** level for level in range(1, DEPTH + 1))
+    files_per_dir = max(1, (entries - dir_count) // len(dirs))
+    for dir_path in dirs:
+        for i in range(files_per_dir):
+            with open(os.path.join(dir_path, f"f{i}.md" if i % 5 == 0 else f"f{i}.css"), 'w') as f:
+                f.write("x")
+    return dir_count + files_per_dir * len(dirs)
+
+
+def listdir_pages(dir_path):
+    # collect_pages as it was before the walker
+    pages = []
+    for entry in os.listdir(dir_path):
+        entry_path = os.path.join(dir_path, entry)
+        if os.path.isfile(entry_path):
+            if entry_path.endswith('.md'):
+                pages.append(entry_path)
+        elif os.path.isdir(entry_path):
+            pages.extend(listdir_pages(entry_path))
+    return pages
+
+
+def listdir_static(source_dir_path, rel_dir_path=""):
+    # collect_static_files as it was, plus the os.stat sync_static_files made on each file
+    files = []
+    for filename in os.listdir(os.path.join(source_dir_path, rel_dir_path)):
+        rel_path = os.path.join(rel_dir_path, filename)
+        from_path = os.path.join(source_dir_path, rel_path)
+        if os.path.isfile(from_path):
+            files.append((rel_path, os.stat(from_path).st_size))
+        else:
+            files.extend(listdir_static(source_dir_path, rel_path))
+    return files
+
+
+def scandir_pages(root):
+    return [entry.path for _, entry in walk_files(root, include=("*.md",))]
+
+
+def scandir_static(root):
+    return [(rel_path, entry.stat().st_size) for rel_path, entry in walk_files(root)]
+
+
+@contextmanager
+def counting_calls(counts):
+    # os.path.isfile and isdir call os.stat, so patching os covers them too. A DirEntry's
+    # is_file() and is_dir() make no call when the filesystem reports entry types (d_type),
+    # as Linux's common filesystems do; its stat() is one call, made once per entry, which
+    # main adds for the walks that use it.
+    originals = {name: getattr(os, name) for name in ("listdir", "scandir", "stat")}
+
+    def counted(name):
+        def call(*args, **kwargs):
+            counts[name] = counts.get(name, 0) + 1
+            return originals[name](*args, **kwargs)
+        return call
+
+    for name in originals:
+        setattr(os, name, counted(name))
+    try:
+        yield
+    finally:
+        for name, function in originals.items():
+            setattr(os, name, function)
+
+
+def measure(walk, root):
+    counts = {}
+    with counting_calls(counts):
+        result = walk(root)
+    start = time.perf_counter()
+    walk(root)
+    return result, time.perf_counter() - start, counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=100000, help="files and directories in the tree")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "tree")
+        created = make_tree(root, args.entries)
+        print(f"{created} entries")
+        for name, old, new in (("pages", listdir_pages, scandir_pages), ("static", listdir_static, scandir_static)):
+            old_result, old_time, old_counts = measure(old, root)
+            new_result, new_time, new_counts = measure(new, root)
+            assert sorted(old_result) == new_result
+            if new is scandir_static:
+                # One DirEntry.stat() per file
+                new_counts["stat"] = new_counts.get("stat", 0) + len(new_result)
+            for label, elapsed, counts in (("listdir", old_time, old_counts), ("scandir", new_time, new_counts)):
+                listings = counts.get("listdir", 0) + counts.get("scandir", 0)
+                print(f"{name:7} {label}  {elapsed * 1e3:8.1f} ms  {listings:6} listings  "
+                      f"{counts.get('stat', 0):7} stats")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Deterministic synthetic markdown corpus for benchmarks
+import os
+import random
+
+WORDS = (
+    "the ring fellowship shire hobbit wizard elf dwarf road mountain river forest "
+    "king steward tower shadow light song tale journey quest council gate hall"
+).split()
+
+
+class CorpusConfig:
+    def __init__(
+        self,
+        pages=100,
+        blocks_per_page=40,
+        words_per_paragraph=60,
+        link_density=0.05,
+        emphasis_density=0.05,
+        list_length=6,
+        code_block_ratio=0.1,
+        seed=1,
+    ):
+        self.pages = pages
+        self.blocks_per_page = blocks_per_page
+        self.words_per_paragraph = words_per_paragraph
+        # Fraction of words that become a link or image, and that get bold/italic/code
+        self.link_density = link_density
+        self.emphasis_density = emphasis_density
+        self.list_length = list_length
+        self.code_block_ratio = code_block_ratio
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def make_inline_text(rng, config, words):
+    parts = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < config.link_density:
+            if rng.random() < 0.2:
+                word = f"![{word}](/images/{word}.png)"
+            else:
+                word = f"[{word}](/blog/{rng.choice(WORDS)})"
+        elif roll < config.link_density + config.emphasis_density:
+            word = rng.choice(("**{}**", "_{}_", "`{}`")).format(word)
+        parts.append(word)
+    return " ".join(parts)
+
+
+def make_block(rng, config):
+    roll = rng.random()
+    if roll < config.code_block_ratio:
+        lines = [" ".join(rng.choice(WORDS) for _ in range(6)) for _ in range(8)]
+        return "```\n" + "\n".join(lines) + "\n```"
+    roll = rng.random()
+    if roll < 0.15:
+        return f"## {make_inline_text(rng, config, 5)}"
+    if roll < 0.3:
+        return "\n".join(
+            f"- {make_inline_text(rng, config, 8)}" for _ in range(config.list_length)
+        )
+    if roll < 0.4:
+        return "\n".join(
+            f"{i + 1}. {make_inline_text(rng, config, 8)}" for i in range(min(config.list_length, 9))
+        )
+    if roll < 0.5:
+        return "\n".join(f"> {make_inline_text(rng, config, 10)}" for _ in range(3))
+    words = config.words_per_paragraph
+    return "\n".join(
+        make_inline_text(rng, config, words // 3) for _ in range(3)
+    )
+
+
+def make_page(config, index):
+    # Each page gets its own generator, so page i is the same whatever the page count
+    rng = random.Random(f"{config.seed}:{index}")
+    blocks = [f"# Page {index}: {make_inline_text(rng, config, 4)}"]
+    for _ in range(config.blocks_per_page):
+        blocks.append(make_block(rng, config))
+    return "\n\n".join(blocks) + "\n"
+
+
+def generate_corpus(config):
+    # Returns a list of (relative path, markdown) pairs
+    return [(os.path.join(f"page{i}", "index.md"), make_page(config, i)) for i in range(config.pages)]
+
+
+def write_corpus(config, content_dir):
+    for rel_path, markdown in generate_corpus(config):
+        path = os.path.join(content_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(markdown)
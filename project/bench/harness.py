@@ -0,0 +1,152 @@
+# Times each stage of the page pipeline separately over a synthetic corpus
+import json
+import os
+import platform
+import tempfile
+import time
+
+from block_markdown_converter import (
+    BlockType,
+    block_to_block_type,
+    markdown_to_blocks,
+    markdown_to_html_node,
+)
+from inline_markdown_converter import text_to_textnodes
+from template import compile_template
+
+from bench.corpus import generate_corpus
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "template.html")
+STAGES = ("markdown_to_blocks", "block_to_block_type", "text_to_textnodes", "to_html", "template", "write")
+
+
+def inline_texts(block, block_type):
+    # The inline text each block type hands to text_to_textnodes, as the node builders do
+    lines = block.split("\n")
+    if block_type == BlockType.PARAGRAPH:
+        return [" ".join(lines)]
+    if block_type == BlockType.HEADING:
+        return [block.lstrip("#").strip()]
+    if block_type == BlockType.QUOTE:
+        return [" ".join(line.lstrip(">").strip() for line in lines)]
+    if block_type == BlockType.UNORDERED_LIST:
+        return [line[2:] for line in lines]
+    if block_type == BlockType.ORDERED_LIST:
+        return [line[3:] for line in lines]
+    return []
+
+
+def time_stage(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return time.perf_counter() - start
+
+
+def run_once(pages, template, out_dir):
+    # Inputs for every stage are prepared outside the timed region
+    timings = {}
+    counts = {}
+    markdowns = [markdown for _, markdown in pages]
+    timings["markdown_to_blocks"] = time_stage(markdown_to_blocks, markdowns)
+
+    blocks = [block for markdown in markdowns for block in markdown_to_blocks(markdown)]
+    timings["block_to_block_type"] = time_stage(block_to_block_type, blocks)
+    counts["block_to_block_type"] = len(blocks)
+
+    texts = [text for block in blocks for text in inline_texts(block, block_to_block_type(block))]
+    timings["text_to_textnodes"] = time_stage(text_to_textnodes, texts)
+    counts["text_to_textnodes"] = len(texts)
+
+    nodes = [markdown_to_html_node(markdown) for markdown in markdowns]
+    timings["to_html"] = time_stage(lambda node: node.to_html(), nodes)
+
+    contents = [node.to_html() for node in nodes]
+    timings["template"] = time_stage(
+        lambda content: template.render({"Title": "Title", "Content": content}), contents
+    )
+
+    rendered = [template.render({"Title": "Title", "Content": content}) for content in contents]
+    paths = [os.path.join(out_dir, f"page{i}.html") for i in range(len(rendered))]
+
+    def write(job):
+        path, html = job
+        with open(path, 'w') as f:
+            f.write(html)
+    timings["write"] = time_stage(write, list(zip(paths, rendered)))
+    counts["write_bytes"] = sum(len(html.encode()) for html in rendered)
+    return timings, counts
+
+
+def run_benchmark(config, repeat=3):
+    pages = generate_corpus(config)
+    template = compile_template(TEMPLATE_PATH, "/")
+    source_bytes = sum(len(markdown.encode()) for _, markdown in pages)
+
+    best = {}
+    with tempfile.TemporaryDirectory() as out_dir:
+        for _ in range(repeat):
+            timings, counts = run_once(pages, template, out_dir)
+            for stage, seconds in timings.items():
+                best[stage] = min(seconds, best.get(stage, seconds))
+
+    stages = {}
+    for stage in STAGES:
+        seconds = best[stage]
+        stages[stage] = {
+            "seconds": seconds,
+            "pages_per_second": len(pages) / seconds if seconds else None,
+            "source_mb_per_second": source_bytes / 1e6 / seconds if seconds else None,
+        }
+    for stage, count in counts.items():
+        if stage in stages:
+            stages[stage]["items"] = count
+    return {
+        "config": config.to_dict(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "source_bytes": source_bytes,
+        "output_bytes": counts["write_bytes"],
+        "stages": stages,
+    }
+
+
+def format_results(results):
+    lines = [f"{'stage':<22}{'seconds':>10}{'pages/s':>12}{'MB/s':>10}"]
+    for stage, result in results["stages"].items():
+        lines.append(
+            f"{stage:<22}{result['seconds']:>10.4f}{result['pages_per_second']:>12.1f}"
+            f"{result['source_mb_per_second']:>10.2f}"
+        )
+    return "\n".join(lines)
+
+
+def save_results(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_results(baseline, current, threshold=0.1):
+    # Returns (report lines, regressed stage names); a stage regresses when it is
+    # more than threshold slower than the baseline
+    lines = [f"{'stage':<22}{'baseline':>10}{'current':>10}{'change':>9}"]
+    regressions = []
+    if baseline.get("config") != current.get("config"):
+        lines.append("warning: corpus configs differ, the comparison may be meaningless")
+    for stage, result in current["stages"].items():
+        if stage not in baseline["stages"]:
+            continue
+        before = baseline["stages"][stage]["seconds"]
+        after = result["seconds"]
+        change = (after - before) / before if before else 0.0
+        marker = ""
+        if change > threshold:
+            regressions.append(stage)
+            marker = "  REGRESSION"
+        lines.append(f"{stage:<22}{before:>10.4f}{after:>10.4f}{change:>+9.1%}{marker}")
+    return lines, regressions
@@ -1,2 +1,7 @@
-python3 src/main.py
-cd public && python3 -m http.server 8888
\ No newline at end of file
+# Rebuild through a running build daemon (python3 src/main.py --daemon) when there is one,
+# otherwise do a full build
+python3 src/client.py "$@"
+if [ $? -eq 3 ]; then
+    python3 src/main.py
+fi
+cd public && python3 -m http.server 8888
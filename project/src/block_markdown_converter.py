@@ -1,6 +1,17 @@
+import time
 from enum import Enum
-from htmlnode import ParentNode
+from htmlnode import ParentNode, RawHTML
+from dependencies import (
+    collect_references,
+    collects_words,
+    get_reference_collector,
+    locate_references,
+    record_references,
+    record_words,
+)
 from inline_markdown_converter import text_to_textnodes
+from minify import Minifier
+from profiling import get_profiler
 from textnode import text_node_to_html_node, TextNode, TextType
 
 
@@ -14,19 +25,24 @@ class BlockType(Enum):
 
 
 def block_to_block_type(block):
+    return block_lines_to_block_type(block.split('\n'))
+
+
+def block_lines_to_block_type(lines):
+    first_line = lines[0]
+
     # Headings start with 1-6 # characters, followed by a space and then the heading text.
-    if block.startswith('#'):
+    if first_line.startswith('#'):
         # Check if it's a valid heading format
-        parts = block.split(' ', 1)
+        parts = first_line.split(' ', 1)
         if len(parts) > 1 and 1 <= len(parts[0]) <= 6 and all(char == '#' for char in parts[0]):
             return BlockType.HEADING
 
     # Code blocks start and end with 3 backticks
-    if block.startswith('```') and block.endswith('```'):
+    if first_line.startswith('```') and lines[-1].endswith('```'):
         return BlockType.CODE
 
     # Quote blocks: every line starts with >
-    lines = block.split('\n')
     if all(line.startswith('>') for line in lines):
         return BlockType.QUOTE
 
@@ -48,51 +64,136 @@ def block_to_block_type(block):
     return BlockType.PARAGRAPH
 
 
-def markdown_to_blocks(markdown):
-    # Split by one or more blank lines (two or more newlines)
-    blocks = markdown.split('\n\n')
+def iter_block_lines(lines):
+    # Scan lines (without their trailing newline) once and yield each block as a list of lines.
+    # An empty line ends a block, and each block is trimmed the way str.strip() would trim it
+    # joined, which matches splitting the whole document on blank lines.
+    for _, block in iter_numbered_blocks(lines):
+        yield block
+
+
+def iter_numbered_blocks(lines, first_line=1):
+    # iter_block_lines, yielding (line number the block starts on, block), with lines
+    # numbered from first_line
+    block = []
+    start = first_line
+    for number, line in enumerate(lines, first_line):
+        if not line:
+            if block:
+                yield start, finish_block(block)
+                block = []
+            continue
+        if not block:
+            # Leading whitespace of a block is dropped, including whitespace-only lines
+            line = line.lstrip()
+            if not line:
+                continue
+            start = number
+        block.append(line)
+    if block:
+        yield start, finish_block(block)
+
+
+def finish_block(block):
+    # Trailing whitespace of a block is dropped, including whitespace-only lines
+    while not block[-1].strip():
+        block.pop()
+    block[-1] = block[-1].rstrip()
+    return block
+
+
+def read_lines(f):
+    # Iterate a text file's lines without their newlines, reading one line at a time
+    for line in f:
+        if line.endswith('\n'):
+            line = line[:-1]
+        yield line
 
-    # Process each block
-    result = []
-    for block in blocks:
-        # Strip leading/trailing whitespace
-        cleaned_block = block.strip()
 
-        # Only add non-empty blocks
-        if cleaned_block:
-            result.append(cleaned_block)
-    return result
+def markdown_to_blocks(markdown):
+    return ['\n'.join(lines) for lines in iter_block_lines(markdown.split('\n'))]
 
 
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
+    return markdown_lines_to_html_node(markdown.split('\n'))
+
+
+# Minified blocks are memoized apart from plain ones
+MINIFIED_MEMO_PREFIX = "\x00minified\x00"
+
+
+def markdown_lines_to_html_node(lines, memo=None, minify=False, first_line=1):
+    # lines can be any iterable, such as read_lines(f), so a file is parsed as it is read.
+    # With a BlockMemo, each block becomes a leaf of its rendered HTML, reused across pages;
+    # minify says whether that HTML is rendered minified.
+    # Links and images are reported to the reference collector with their line, counting
+    # the first of lines as first_line, along with the words of the text.
     children = []
-    for block in blocks:
-        html_node = block_to_html_node(block)
-        children.append(html_node)
+    for start_line, block_lines in iter_numbered_blocks(lines, first_line):
+        if memo is None:
+            if get_reference_collector() is None:
+                children.append(block_lines_to_html_node(block_lines))
+                continue
+            with collect_references() as collector:
+                children.append(block_lines_to_html_node(block_lines))
+            record_references(locate_references(collector.references, block_lines, start_line))
+            record_words(collector.words)
+            continue
+        block = '\n'.join(block_lines)
+        if minify:
+            block = MINIFIED_MEMO_PREFIX + block
+        entry = memo.get(block)
+        if entry is None or (entry[3] is None and collects_words()):
+            # Memoized before words were collected, which only a new parse can supply
+            # The block's links, images and words are memoized with it, since a hit skips inline parsing
+            with collect_references() as collector:
+                node = block_lines_to_html_node(block_lines)
+            if minify:
+                minifier = Minifier()
+                entry = (node.to_minified_html(minifier), collector.references, minifier.saved, collector.words)
+            else:
+                entry = (node.to_html(), collector.references, 0, collector.words)
+            memo.put(block, *entry)
+        html, references, saved, words = entry
+        record_references(locate_references(references, block_lines, start_line))
+        record_words(words)
+        children.append(RawHTML(html, saved))
     return ParentNode("div", children, None)
 
 
 def block_to_html_node(block):
-    block_type = block_to_block_type(block)
+    return block_lines_to_html_node(block.split('\n'))
+
+
+def block_lines_to_html_node(lines):
+    block_type = block_lines_to_block_type(lines)
     if block_type == BlockType.PARAGRAPH:
-        return paragraph_to_html_node(block)
+        return paragraph_to_html_node(lines)
     if block_type == BlockType.HEADING:
-        return heading_to_html_node(block)
+        return heading_to_html_node(lines)
     if block_type == BlockType.CODE:
-        return code_to_html_node(block)
+        return code_to_html_node(lines)
     if block_type == BlockType.ORDERED_LIST:
-        return olist_to_html_node(block)
+        return olist_to_html_node(lines)
     if block_type == BlockType.UNORDERED_LIST:
-        return ulist_to_html_node(block)
+        return ulist_to_html_node(lines)
     if block_type == BlockType.QUOTE:
-        return quote_to_html_node(block)
+        return quote_to_html_node(lines)
     raise ValueError("invalid block type")
 
 
 def text_to_children(text):
-    # Convert text to TextNode objects
-    text_nodes = text_to_textnodes(text)
+    # Convert text to TextNode objects, timing it separately from block parsing when profiling
+    profiler = get_profiler()
+    if profiler is None:
+        text_nodes = text_to_textnodes(text)
+    else:
+        start = time.perf_counter()
+        text_nodes = text_to_textnodes(text)
+        profiler.add_time("inline_parse", time.perf_counter() - start)
+    collector = get_reference_collector()
+    if collector is not None:
+        collector.add_text_nodes(text_nodes)
 
     # Convert each TextNode to an HTMLNode
     html_nodes = []
@@ -103,12 +204,12 @@ def text_to_children(text):
     return html_nodes
 
 
-def paragraph_to_html_node(block):
-    # Replace newlines with spaces to make a single line of text
-    block = block.replace("\n", " ")
+def paragraph_to_html_node(lines):
+    # Join the lines with spaces to make a single line of text
+    text = " ".join(lines)
 
-    # Process inline markdown in block and get children nodes
-    children = text_to_children(block)
+    # Process inline markdown in the text and get children nodes
+    children = text_to_children(text)
 
     # Create paragraph node with children
     paragraph_node = ParentNode("p", children)
@@ -116,7 +217,9 @@ def paragraph_to_html_node(block):
     return paragraph_node
 
 
-def heading_to_html_node(block):
+def heading_to_html_node(lines):
+    block = "\n".join(lines)
+
     # Count the heading level (number of # at start)
     level = 0
     for char in block:
@@ -143,7 +246,9 @@ def heading_to_html_node(block):
     return ParentNode(f"h{level}", children)
 
 
-def code_to_html_node(block):
+def code_to_html_node(lines):
+    block = "\n".join(lines)
+
     # Verify that the code block has the correct format (starts and ends with ```)
     if not block.startswith("```") or not block.endswith("```"):
         raise ValueError("Invalid code block: missing ``` delimiters")
@@ -168,10 +273,7 @@ def code_to_html_node(block):
     return ParentNode("pre", [code])
 
 
-def olist_to_html_node(block):
-    # Split the block into individual list items by newline
-    items = block.split("\n")
-
+def olist_to_html_node(items):
     # Create an array to hold our list item nodes
     html_items = []
 
@@ -191,10 +293,7 @@ def olist_to_html_node(block):
     return ParentNode("ol", html_items)
 
 
-def ulist_to_html_node(block):
-    # Split the block into individual list items by newline
-    items = block.split("\n")
-
+def ulist_to_html_node(items):
     # Create an array to hold our list item nodes
     html_items = []
 
@@ -213,10 +312,7 @@ def ulist_to_html_node(block):
     return ParentNode("ul", html_items)
 
 
-def quote_to_html_node(block):
-    # Split the block into individual quote lines
-    lines = block.split("\n")
-
+def quote_to_html_node(lines):
     # Create an array to hold the processed lines without the quote markers
     new_lines = []
 
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+class BlockMemo:
+    # Least recently used map from a block's exact text to its rendered HTML, the links and
+    # images it references, the bytes minifying it saved and its words (None unless words
+    # were being collected), so blocks that repeat across pages (disclaimers, bios, footers)
+    # are classified and parsed only once. The size counted is the length of the text stored,
+    # in characters; max_bytes=0 turns it off.
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.fragments = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def get(self, block):
+        # Returns (html, references, saved, words), or None
+        entry = self.fragments.get(block)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.fragments.move_to_end(block)
+        self.hits += 1
+        return entry
+
+    def put(self, block, html, references=(), saved=0, words=None):
+        # words is None when they weren't collected
+        entry = (html, tuple(references), saved, tuple(words) if words is not None else None)
+        size = entry_size(block, entry)
+        if size > self.max_bytes:
+            # Would evict everything else and still not fit
+            return
+        old = self.fragments.pop(block, None)
+        if old is not None:
+            self.size -= entry_size(block, old)
+        self.fragments[block] = entry
+        self.size += size
+        self.evict()
+
+    def evict(self):
+        while self.size > self.max_bytes:
+            block, entry = self.fragments.popitem(last=False)
+            self.size -= entry_size(block, entry)
+            self.evictions += 1
+
+    def resize(self, max_bytes):
+        # Shrinking the limit evicts straight away
+        self.max_bytes = max_bytes
+        if max_bytes <= 0:
+            self.clear()
+        else:
+            self.evict()
+
+    def clear(self):
+        self.fragments.clear()
+        self.size = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.fragments),
+            "bytes": self.size,
+            "evictions": self.evictions,
+        }
+
+
+def entry_size(block, entry):
+    html, references, _, words = entry
+    size = len(block) + len(html) + sum(len(url) for _, url in references)
+    return size + sum(len(word) for word in words or ())
+
+
+# Shared per process, like the template cache, so it spans every page a process builds
+block_memo = BlockMemo()
+
+
+def configure_block_memo(max_bytes):
+    block_memo.resize(max_bytes)
@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import socket
+import sys
+
+from daemon import DEFAULT_SOCKET_PATH
+
+# Exit status when no daemon is listening, so scripts can fall back to a full build
+NO_DAEMON = 3
+
+
+def send_request(request, socket_path=DEFAULT_SOCKET_PATH):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(socket_path)
+        conn.sendall(json.dumps(request).encode() + b"\n")
+        with conn.makefile('rb') as f:
+            return json.loads(f.readline())
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Ask a running build daemon (main.py --daemon) to rebuild")
+    parser.add_argument("changed", nargs="*",
+                        help="paths that changed; without any, every source is checked")
+    parser.add_argument("--basepath", help="URL prefix for absolute links (default: the daemon's)")
+    parser.add_argument("--explain", action="store_true", help="say why each page is rebuilt")
+    parser.add_argument("--status", action="store_true", help="show what the daemon holds instead of building")
+    parser.add_argument("--shutdown", action="store_true", help="stop the daemon")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="daemon socket path")
+    return parser.parse_args(argv)
+
+
+def build_request(args):
+    if args.shutdown:
+        return {"command": "shutdown"}
+    if args.status:
+        return {"command": "status"}
+    # The daemon has a working directory of its own, so paths go over absolute
+    changed = [os.path.abspath(path) for path in args.changed]
+    return {"command": "build", "changed": changed or None, "basepath": args.basepath, "explain": args.explain}
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    request = build_request(args)
+    try:
+        response = send_request(request, args.socket)
+    except OSError as e:
+        print(f"No build daemon on {args.socket}: {e}", file=sys.stderr)
+        return NO_DAEMON
+
+    if response.get("log"):
+        print(response["log"], end="")
+    if not response.get("ok"):
+        print(f"Build failed: {response.get('error')}", file=sys.stderr)
+        return 1
+    if "seconds" in response:
+        pages = response["pages"]
+        print(f"Build done in {response['seconds'] * 1000:.1f} ms: rebuilt {pages['rebuilt']} pages, "
+              f"skipped {pages['skipped']}")
+    elif request["command"] == "status":
+        print(json.dumps(response, indent=1))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
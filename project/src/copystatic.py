@@ -1,16 +1,285 @@
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
+from fingerprint import (
+    REFERENCING_EXTENSIONS,
+    asset_url,
+    fingerprint_path,
+    is_fingerprinted,
+    rewrite_css_references,
+)
+from manifest import (
+    ASSET_MANIFEST_FILENAME,
+    hash_bytes,
+    hash_file,
+    load_static_manifest,
+    remove_stale_outputs,
+    save_asset_manifest,
+    save_static_manifest,
+)
+from minify import STATIC_MINIFIERS, add_savings, format_savings
+from walk import walk_files
 
-def copy_files_recursive(source_dir_path, dest_dir_path):
-    if not os.path.exists(dest_dir_path):
-        os.mkdir(dest_dir_path)
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; reflinks are simply never attempted there
+    fcntl = None
 
-    for filename in os.listdir(source_dir_path):
-        from_path = os.path.join(source_dir_path, filename)
-        dest_path = os.path.join(dest_dir_path, filename)
-        print(f" * {from_path} -> {dest_path}")
-        if os.path.isfile(from_path):
-            shutil.copy(from_path, dest_path)
+# ioctl request that clones one file's extents into another on btrfs, XFS and similar
+FICLONE = 0x40049409
+COPY_THREADS = 8
+
+
+def collect_static_files(source_dir_path, include=None, exclude=None):
+    # Return the path of every file under source_dir_path, relative to it, in walk order
+    return [rel_path for rel_path, _ in walk_files(source_dir_path, include, exclude)]
+
+
+def copy_file(from_path, dest_path, link=False):
+    # Copy one file using the cheapest mechanism the filesystem allows and return its name.
+    # The old destination is unlinked first so a previous hardlink never gets written through.
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+
+    if link:
+        try:
+            os.link(from_path, dest_path)
+            return "hardlink"
+        except OSError:
+            pass
+
+    with open(from_path, 'rb') as src, open(dest_path, 'wb') as dst:
+        method = _clone_or_copy(src, dst)
+    shutil.copystat(from_path, dest_path)
+    return method
+
+
+def transform_file(from_path, transforms):
+    # The content of a text file with each transform (text -> text) applied in turn
+    with open(from_path, 'rb') as f:
+        text = f.read().decode()
+    for transform in transforms:
+        text = transform(text)
+    return text.encode()
+
+
+def write_transformed(from_path, dest_path, data):
+    # Write the transformed content of from_path. It gets the source's mtime, like a copy,
+    # so the next sync can tell it is current.
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    with open(dest_path, 'wb') as f:
+        f.write(data)
+    shutil.copystat(from_path, dest_path)
+
+
+def _clone_or_copy(src, dst):
+    if fcntl is not None:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return "reflink"
+        except OSError:
+            pass
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            remaining = os.fstat(src.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+            if remaining == 0:
+                return "copy_file_range"
+        except OSError:
+            pass
+        # Start over with a plain copy if the kernel refused part way
+        src.seek(0)
+        dst.seek(0)
+        dst.truncate()
+
+    shutil.copyfileobj(src, dst, 1 << 20)
+    return "copy"
+
+
+def check_file_current(from_path, from_stat, dest_path, old_entry, use_hash, transformed=False):
+    # Returns "mtime" or "hash" for whichever check showed the copy is current, or None.
+    # Size and mtime are enough when they match; the content hash (if enabled) is only
+    # computed to catch files whose mtime changed without their content changing.
+    # A transformed (minified or optimized) copy is expected to have the size recorded when it was written.
+    try:
+        dest_stat = os.stat(dest_path)
+    except OSError:
+        return None
+    if transformed:
+        if old_entry is None or old_entry["size"] != from_stat.st_size:
+            return None
+        expected_size = old_entry.get("output_size")
+    else:
+        expected_size = from_stat.st_size
+    if dest_stat.st_size != expected_size:
+        return None
+    if dest_stat.st_mtime_ns == from_stat.st_mtime_ns:
+        return "mtime"
+    if use_hash and old_entry is not None and old_entry.get("hash") == hash_file(from_path):
+        return "hash"
+    return None
+
+
+def output_rel_path(rel_path, entry):
+    # Where a static manifest entry's file was written, relative to the output root
+    return entry.get("output", rel_path) if entry is not None else rel_path
+
+
+def sync_static_files(source_dir_path, dest_dir_path, use_hash=False, link=False, threads=COPY_THREADS,
+                      on_written=None, minify=False, fingerprint=False, png_optimizer=None):
+    # Bring dest_dir_path in line with source_dir_path, copying only what changed
+    # and deleting files that were synced before but no longer exist in the source.
+    # on_written, if given, is called with the destination path of every file copied.
+    # With minify, file types that have a minifier (CSS) are written minified instead.
+    # With fingerprint, assets are written under names that include a hash of their content
+    # (index.css -> index.3f9a1c2b.css), so they can be cached forever; stats["assets"] and
+    # asset-manifest.json map each original URL to the fingerprinted one.
+    # png_optimizer, a png_optimize.PNGOptimizer, makes PNGs be written losslessly recompressed.
+    stats = {"copied": 0, "bytes_copied": 0, "skipped": 0, "bytes_avoided": 0, "removed": 0, "minify_saved": {},
+             "assets": None, "images": None}
+    old_files = load_static_manifest(dest_dir_path)
+    new_files = {}
+    to_copy = []
+    # Stylesheets name other assets, so with fingerprints they are written once those names are known
+    deferred = []
+
+    for rel_path, dir_entry in walk_files(source_dir_path):
+        from_path = dir_entry.path
+        # Cached by the entry, and the only stat the source needs
+        from_stat = dir_entry.stat()
+
+        old_entry = old_files.get(rel_path)
+        extension = os.path.splitext(rel_path)[1].lower()
+        minifier = STATIC_MINIFIERS.get(extension) if minify else None
+        optimizer = png_optimizer if extension == ".png" else None
+        fingerprinted = fingerprint and is_fingerprinted(rel_path)
+        if fingerprinted and extension in REFERENCING_EXTENSIONS:
+            deferred.append((rel_path, from_path, from_stat.st_size, minifier))
+            continue
+
+        # A file written under the other naming scheme is never current
+        dest_path = os.path.join(dest_dir_path, output_rel_path(rel_path, old_entry))
+        current = None
+        if (old_entry is not None and "output" in old_entry) == fingerprinted:
+            transformed = minifier is not None or optimizer is not None
+            current = check_file_current(from_path, from_stat, dest_path, old_entry, use_hash, transformed)
+        if current is not None:
+            new_files[rel_path] = old_entry or {"size": from_stat.st_size, "hash": None}
+            stats["skipped"] += 1
+            stats["bytes_avoided"] += from_stat.st_size
+            if current == "hash":
+                # Same content under a new mtime: record the new mtime so the next check is cheap
+                os.utime(dest_path, ns=(from_stat.st_atime_ns, from_stat.st_mtime_ns))
+            continue
+        to_copy.append((rel_path, from_path, from_stat.st_size, minifier, optimizer, fingerprinted))
+
+    def copy_one(job):
+        rel_path, from_path, size, minifier, optimizer, fingerprinted = job
+        entry = {"size": size, "hash": None}
+        if optimizer is not None:
+            with open(from_path, 'rb') as f:
+                data = f.read()
+            if use_hash:
+                entry["hash"] = hash_bytes(data)
+            data = optimizer.optimize(data)
+            if fingerprinted:
+                entry["output"] = fingerprint_path(rel_path, hash_bytes(data))
+            entry["output_size"] = len(data)
+            method = "optimize"
+            write_transformed(from_path, os.path.join(dest_dir_path, output_rel_path(rel_path, entry)), data)
+        elif minifier is None:
+            # The hash is recorded for the next build's comparison, and names a fingerprinted copy
+            if use_hash or fingerprinted:
+                entry["hash"] = hash_file(from_path)
+            if fingerprinted:
+                entry["output"] = fingerprint_path(rel_path, entry["hash"])
+            method = copy_file(from_path, os.path.join(dest_dir_path, output_rel_path(rel_path, entry)), link)
         else:
-            copy_files_recursive(from_path, dest_path)
+            data = transform_file(from_path, (minifier,))
+            if use_hash:
+                entry["hash"] = hash_file(from_path)
+            if fingerprinted:
+                entry["output"] = fingerprint_path(rel_path, hash_bytes(data))
+            entry["output_size"] = len(data)
+            method = "minify"
+            write_transformed(from_path, os.path.join(dest_dir_path, output_rel_path(rel_path, entry)), data)
+        return rel_path, from_path, entry, method
+
+    def add_copied(rel_path, from_path, entry, method):
+        dest_path = os.path.join(dest_dir_path, output_rel_path(rel_path, entry))
+        print(f" * {from_path} -> {dest_path} ({method})")
+        if on_written is not None:
+            on_written(dest_path)
+        new_files[rel_path] = entry
+        if method == "minify":
+            saved = entry["size"] - entry["output_size"]
+            add_savings(stats["minify_saved"], os.path.splitext(rel_path)[1].lower(), saved)
+        stats["copied"] += 1
+        stats["bytes_copied"] += entry["size"]
+
+    # Copies are I/O bound, so threads overlap them well despite the GIL
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for copied in executor.map(copy_one, to_copy):
+            add_copied(*copied)
+
+    if fingerprint:
+        assets = {
+            asset_url(rel_path): asset_url(entry["output"])
+            for rel_path, entry in new_files.items() if "output" in entry
+        }
+        def rewrite(text):
+            return rewrite_css_references(text, assets)
+
+        for rel_path, from_path, size, minifier in deferred:
+            # Small enough to transform every time: the result changes whenever an asset it names does
+            data = transform_file(from_path, (rewrite,) if minifier is None else (rewrite, minifier))
+            entry = {"size": size, "hash": None, "output": fingerprint_path(rel_path, hash_bytes(data))}
+            if minifier is not None:
+                entry["output_size"] = len(data)
+            assets[asset_url(rel_path)] = asset_url(entry["output"])
+            dest_path = os.path.join(dest_dir_path, entry["output"])
+            old_entry = old_files.get(rel_path)
+            if old_entry is not None and old_entry.get("output") == entry["output"] and os.path.isfile(dest_path):
+                # Same name, so the same content
+                new_files[rel_path] = entry
+                stats["skipped"] += 1
+                stats["bytes_avoided"] += size
+                continue
+            write_transformed(from_path, dest_path, data)
+            add_copied(rel_path, from_path, entry, "fingerprint" if minifier is None else "minify")
+        stats["assets"] = assets
+        save_asset_manifest(dest_dir_path, assets)
+    elif os.path.exists(os.path.join(dest_dir_path, ASSET_MANIFEST_FILENAME)):
+        os.remove(os.path.join(dest_dir_path, ASSET_MANIFEST_FILENAME))
+
+    stats["removed"] = remove_stale_outputs(
+        dest_dir_path,
+        {output_rel_path(rel_path, entry) for rel_path, entry in old_files.items()},
+        {output_rel_path(rel_path, entry) for rel_path, entry in new_files.items()},
+    )
+    save_static_manifest(dest_dir_path, new_files)
+    if png_optimizer is not None:
+        stats["images"] = {
+            "optimized": png_optimizer.optimized,
+            "cache_hits": png_optimizer.cache_hits,
+            "bytes_saved": png_optimizer.bytes_saved,
+        }
+
+    print(f"Static sync: copied {stats['copied']} files ({stats['bytes_copied']} bytes), "
+          f"skipped {stats['skipped']} unchanged ({stats['bytes_avoided']} bytes avoided), "
+          f"removed {stats['removed']} stale")
+    if stats["minify_saved"]:
+        print(f"Minified: {format_savings(stats['minify_saved'])}")
+    if stats["images"] is not None:
+        print(f"PNG optimizer: {stats['images']['optimized']} optimized, "
+              f"{stats['images']['cache_hits']} from cache, {stats['images']['bytes_saved']} bytes saved")
+    return stats
@@ -0,0 +1,211 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import time
+
+from copystatic import sync_static_files
+from generate_content import collect_pages, generate_pages_recursive
+from manifest import hash_file, load_manifest
+from parse_cache import MemoryParseCache
+from png_optimize import PNGOptimizer
+from precompress import DEFAULT_LEVEL, DEFAULT_MIN_SIZE, Precompressor, remove_precompressed
+from template import configure_assets, template_cache
+
+# Next to the on-disk parse cache, so main.py and client.py agree on it without configuration
+DEFAULT_SOCKET_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "build.sock"
+)
+
+
+class SiteState:
+    # Everything a build would otherwise rediscover from disk: the content listing, source
+    # hashes (trusted while size and mtime are unchanged) and parsed trees. Compiled templates
+    # already live in the per-process template cache.
+    def __init__(self, dir_path_content, dir_path_static, template_path, dir_path_public, basepath="/",
+                 minify=False, fingerprint=False, image_cache_dir=None, search=False,
+                 site_url=None, precompress=False, gzip_level=DEFAULT_LEVEL, gzip_min_size=DEFAULT_MIN_SIZE,
+                 parse_cache=None):
+        self.dir_path_content = os.path.abspath(dir_path_content)
+        self.dir_path_static = os.path.abspath(dir_path_static)
+        self.template_path = template_path
+        self.dir_path_public = dir_path_public
+        self.basepath = basepath
+        # Pages follow the template cache's minify setting; static files follow these
+        self.minify = minify
+        self.fingerprint = fingerprint
+        # PNGs are optimized when this is set; the cache keeps that cheap after the first build
+        self.image_cache_dir = image_cache_dir
+        self.search = search
+        self.site_url = site_url
+        # Every build refreshes the .gz siblings of what it wrote
+        self.precompress = precompress
+        self.gzip_level = gzip_level
+        self.gzip_min_size = gzip_min_size
+        self.pages = None
+        self.hashes = {}
+        # In front of the on-disk parse cache, if given, so trees parsed by earlier builds are reused
+        self.parse_cache = MemoryParseCache(backing=parse_cache)
+        self.builds = 0
+        # Whether the output is known to match the static tree, so requests can skip the full sync
+        self.synced = False
+
+    def seed(self):
+        # Take over from a build this process has just made (main.py builds before it serves):
+        # the content listing, the source hashes it recorded in the manifest (trusted while
+        # size and mtime are unchanged) and the trees it left in the on-disk parse cache, so
+        # the first request is as cheap as any other
+        self.pages = collect_pages(self.dir_path_content, self.dir_path_public)
+        entries = load_manifest(self.dir_path_public)
+        for entry_path, dest_path in self.pages:
+            entry = entries.get(os.path.relpath(dest_path, self.dir_path_public))
+            if entry is None or entry["source"] != os.path.relpath(entry_path, self.dir_path_content):
+                continue
+            stat = os.stat(entry_path)
+            self.hashes[entry_path] = (stat.st_size, stat.st_mtime_ns, entry["source_hash"])
+            if self.parse_cache.backing is not None:
+                self.parse_cache.load(self.parse_cache.key(entry["source_hash"], template_cache.minify))
+        self.synced = True
+
+    def hash_source(self, path):
+        stat = os.stat(path)
+        cached = self.hashes.get(path)
+        if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2]
+        digest = hash_file(path)
+        self.hashes[path] = (stat.st_size, stat.st_mtime_ns, digest)
+        return digest
+
+    def invalidate(self, changed_paths):
+        # Forget what changed paths may have made stale. Returns whether static files changed.
+        static_changed = False
+        known_sources = {entry_path for entry_path, _ in self.pages or ()}
+        for path in changed_paths:
+            path = os.path.abspath(path)
+            self.hashes.pop(path, None)
+            if path == self.dir_path_static or path.startswith(self.dir_path_static + os.sep):
+                static_changed = True
+            elif path.startswith(self.dir_path_content + os.sep) or path == self.dir_path_content:
+                # Anything but an edit to a page we already know about may change the listing
+                if path not in known_sources or not os.path.isfile(path):
+                    self.pages = None
+        return static_changed
+
+    def build(self, changed_paths=None, basepath=None, explain=False):
+        # With changed_paths, only what they can affect is looked at again; without, every
+        # source is checked (cheaply, by size and mtime). Returns a summary of the build.
+        if basepath is not None:
+            self.basepath = basepath
+        if changed_paths is None or not self.synced:
+            self.pages = None
+            sync_static = True
+        else:
+            sync_static = self.invalidate(changed_paths)
+
+        summary = {"static": None}
+        precompressor = None
+        on_written = None
+        if self.precompress:
+            precompressor = Precompressor(self.gzip_level, self.gzip_min_size)
+            on_written = precompressor.submit
+        if sync_static:
+            png_optimizer = PNGOptimizer(self.image_cache_dir) if self.image_cache_dir is not None else None
+            summary["static"] = sync_static_files(
+                self.dir_path_static, self.dir_path_public, minify=self.minify, fingerprint=self.fingerprint,
+                png_optimizer=png_optimizer, on_written=on_written,
+            )
+            configure_assets(summary["static"]["assets"])
+            self.synced = True
+        if self.pages is None:
+            self.pages = collect_pages(self.dir_path_content, self.dir_path_public)
+        summary["pages"] = generate_pages_recursive(
+            self.dir_path_content, self.template_path, self.dir_path_public, self.basepath,
+            incremental=True, parse_cache=self.parse_cache, explain=explain,
+            pages=self.pages, hash_source=self.hash_source, search=self.search,
+            site_url=self.site_url, on_written=on_written,
+        )
+        if precompressor is not None:
+            # Also drops the .gz of pages and files that were removed
+            precompressor.submit_tree(self.dir_path_public)
+            summary["precompress"] = precompressor.finish()
+        else:
+            remove_precompressed(self.dir_path_public)
+        self.builds += 1
+        return summary
+
+    def handle(self, request):
+        # One request from a client; build output is captured and sent back with the result
+        command = request.get("command", "build")
+        if command == "status":
+            return {"ok": True, "builds": self.builds, "pages": len(self.pages or ()),
+                    "parsed_trees": len(self.parse_cache.entries), "basepath": self.basepath}
+        if command != "build":
+            return {"ok": False, "error": f"unknown command: {command}"}
+
+        log = io.StringIO()
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(log):
+                summary = self.build(request.get("changed"), request.get("basepath"), request.get("explain", False))
+        except Exception as e:
+            # The daemon keeps serving; the next build starts from a clean listing
+            self.pages = None
+            return {"ok": False, "error": str(e), "log": log.getvalue()}
+        summary.update({"ok": True, "seconds": time.perf_counter() - start, "log": log.getvalue()})
+        return summary
+
+
+class BuildServer(socketserver.UnixStreamServer):
+    # Requests are served one at a time, so two builds never write the output at once
+    def __init__(self, socket_path, state):
+        self.state = state
+        super().__init__(socket_path, BuildRequestHandler)
+
+
+class BuildRequestHandler(socketserver.StreamRequestHandler):
+    # The protocol is one JSON object per line each way
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line)
+        except ValueError:
+            response = {"ok": False, "error": "invalid request"}
+        else:
+            if request.get("command") == "shutdown":
+                response = {"ok": True}
+                self.server.shutdown_requested = True
+            else:
+                response = self.server.state.handle(request)
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+def remove_stale_socket(socket_path):
+    # A socket file nobody answers on was left by a daemon that didn't exit cleanly
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            os.remove(socket_path)
+            return
+    raise RuntimeError(f"a build daemon is already listening on {socket_path}")
+
+
+def serve(state, socket_path=DEFAULT_SOCKET_PATH):
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    remove_stale_socket(socket_path)
+    server = BuildServer(socket_path, state)
+    server.shutdown_requested = False
+    print(f"Build daemon listening on {socket_path}")
+    try:
+        while not server.shutdown_requested:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -0,0 +1,170 @@
+import posixpath
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from search_index import tokenize
+from textnode import TextType
+
+# The collector that inline parsing reports links, images and words to, or None when nobody is listening
+_collector = None
+# Words are only collected for builds that index them, since tokenizing slows parsing down noticeably
+_collect_words = False
+
+
+class ReferenceCollector:
+    def __init__(self):
+        # ("link" or "image", url) in document order. Around a whole document, each block's
+        # references are passed on with the line they are on: ("link" or "image", url, line).
+        self.references = []
+        # The words of the text, for the search index, or None when words aren't collected
+        self.words = [] if _collect_words else None
+
+    def add_text_nodes(self, text_nodes):
+        if self.words is not None:
+            self.words += tokenize(" ".join([node.text for node in text_nodes]))
+        for node in text_nodes:
+            if node.text_type == TextType.LINK:
+                self.references.append(("link", node.url))
+            elif node.text_type == TextType.IMAGE:
+                self.references.append(("image", node.url))
+
+
+def configure_word_collection(enabled):
+    global _collect_words
+    _collect_words = enabled
+
+
+def collects_words():
+    return _collect_words
+
+
+def get_reference_collector():
+    return _collector
+
+
+@contextmanager
+def collect_references():
+    # Collect the references parsed inside the with block; collectors nest, and an inner
+    # one's references and words are not seen by the outer one unless passed on with
+    # record_references and record_words
+    global _collector
+    outer = _collector
+    _collector = ReferenceCollector()
+    try:
+        yield _collector
+    finally:
+        _collector = outer
+
+
+def record_references(references):
+    # Report references that were parsed earlier, e.g. those of a memoized block
+    if _collector is not None:
+        _collector.references.extend(references)
+
+
+def record_words(words):
+    # Report words collected earlier; words is None if they weren't collected
+    if _collector is not None and _collector.words is not None and words is not None:
+        _collector.words.extend(words)
+
+
+def locate_references(references, block_lines, start_line):
+    # Number the (kind, url) references parsed from a block that starts on start_line. They
+    # are in document order, so each is found by searching for its URL past the previous one.
+    located = []
+    offset = column = 0
+    for kind, url in references:
+        for i in range(offset, len(block_lines)):
+            found = block_lines[i].find(url, column if i == offset else 0)
+            if found != -1:
+                offset, column = i, found + len(url)
+                break
+        located.append((kind, url, start_line + offset))
+    return located
+
+
+def link_target(url, page_dest_rel_path):
+    # The output path (relative to the output root) an internal link points at, or None for
+    # external links and in-page anchors. Directory URLs resolve to their index.html.
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    if parts.path.startswith("/"):
+        path = parts.path
+    else:
+        page_dir = posixpath.dirname("/" + page_dest_rel_path.replace("\\", "/"))
+        path = posixpath.join(page_dir, parts.path)
+    directory_url = path.endswith("/")
+    path = posixpath.normpath(path).lstrip("/")
+    if directory_url or not path:
+        return posixpath.join(path, "index.html")
+    if posixpath.splitext(path)[1]:
+        return path
+    return posixpath.join(path, "index.html")
+
+
+def output_index(pages, static_files):
+    # Every path a link can point at, with / separators: the pages (a build manifest's entries),
+    # and the static files (a static manifest's) under both their source and fingerprinted names
+    outputs = {dest_rel_path.replace("\\", "/") for dest_rel_path in pages}
+    for rel_path, entry in static_files.items():
+        outputs.add(rel_path.replace("\\", "/"))
+        if "output" in entry:
+            outputs.add(entry["output"].replace("\\", "/"))
+    return outputs
+
+
+class DependencyGraph:
+    # What each output page was built from: its template files, and the images and
+    # internal pages it references. Keyed by the page's output path relative to the output root.
+    # Internal references also keep their URL and source line, to report them if broken.
+    def __init__(self, pages=None):
+        self.pages = pages if pages is not None else {}
+
+    def set_page(self, dest_rel_path, source_rel_path, templates, references):
+        images = set()
+        links = set()
+        internal = []
+        for kind, url, line in references:
+            target = link_target(url, dest_rel_path)
+            if target is not None:
+                internal.append([kind, url, line])
+            if kind == "image":
+                images.add(url)
+            elif target is not None:
+                links.add(target)
+        self.pages[dest_rel_path] = {
+            "source": source_rel_path,
+            "templates": sorted(templates),
+            "images": sorted(images),
+            "links": sorted(links),
+            "references": internal,
+        }
+
+    def keep_only(self, dest_rel_paths):
+        self.pages = {key: value for key, value in self.pages.items() if key in dest_rel_paths}
+
+    def pages_linking_to(self, targets):
+        # Map each page that links to one of targets to the first such target
+        linking = {}
+        for dest_rel_path, node in self.pages.items():
+            for target in node["links"]:
+                if target in targets:
+                    linking[dest_rel_path] = target
+                    break
+        return linking
+
+    def broken_references(self, outputs):
+        # (source, line, kind, url) for every internal link or image whose target isn't in
+        # outputs, a set of every output path (with / separators) the site has
+        broken = []
+        for dest_rel_path, node in self.pages.items():
+            # Pages recorded before references were kept have nothing to check until rebuilt
+            for kind, url, line in node.get("references", ()):
+                if link_target(url, dest_rel_path) not in outputs:
+                    broken.append((node["source"], line, kind, url))
+        return sorted(broken)
+
+    def pages_using(self, kind, value):
+        # kind is "templates", "images" or "links"
+        return sorted(dest_rel_path for dest_rel_path, node in self.pages.items() if value in node[kind])
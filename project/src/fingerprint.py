@@ -0,0 +1,42 @@
+import os
+import re
+
+FINGERPRINT_LENGTH = 8
+# Only assets that pages and stylesheets link to get fingerprinted names; files fetched by
+# well-known names (robots.txt, favicon.ico, CNAME, dotfiles) keep theirs
+FINGERPRINTED_EXTENSIONS = frozenset((
+    ".css", ".js", ".mjs", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".svg",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot", ".mp3", ".mp4", ".webm",
+))
+# Types whose content references other assets; they are written after everything else
+REFERENCING_EXTENSIONS = frozenset((".css",))
+
+# Root-relative URLs in href/src attributes, up to any query or fragment
+ASSET_REFERENCE = re.compile(r'((?:href|src)=")(/[^"?#]*)')
+# Root-relative url() references in CSS, quoted or not
+CSS_URL_REFERENCE = re.compile(r"""(url\(\s*["']?)(/[^"')?#\s]*)""", re.I)
+
+
+def is_fingerprinted(rel_path):
+    filename = os.path.basename(rel_path)
+    return not filename.startswith(".") and os.path.splitext(filename)[1].lower() in FINGERPRINTED_EXTENSIONS
+
+
+def fingerprint_path(rel_path, digest):
+    # index.css -> index.3f9a1c2b.css, from the hex digest of the file's content
+    root, extension = os.path.splitext(rel_path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{extension}"
+
+
+def asset_url(rel_path):
+    return "/" + rel_path.replace(os.sep, "/")
+
+
+def rewrite_asset_references(text, assets):
+    # Point root-relative href/src attributes at the fingerprinted names in assets,
+    # a map from original to fingerprinted URL
+    return ASSET_REFERENCE.sub(lambda match: match.group(1) + assets.get(match.group(2), match.group(2)), text)
+
+
+def rewrite_css_references(text, assets):
+    return CSS_URL_REFERENCE.sub(lambda match: match.group(1) + assets.get(match.group(2), match.group(2)), text)
@@ -1,5 +1,35 @@
+import io
+import itertools
 import os
-from block_markdown_converter import markdown_to_html_node
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from block_markdown_converter import markdown_lines_to_html_node, read_lines
+from block_memo import block_memo, configure_block_memo
+from dependencies import DependencyGraph, collect_references, collects_words, configure_word_collection, output_index
+from manifest import (
+    explain_rebuild,
+    hash_bytes,
+    hash_file,
+    load_dependency_graph,
+    load_manifest,
+    load_static_manifest,
+    make_entry,
+    remove_stale_outputs,
+    save_dependency_graph,
+    save_manifest,
+)
+from minify import add_savings, format_savings
+from pipeline import run_pipeline
+from profiling import disable_profiling, enable_profiling, get_profiler
+from search_index import SearchIndex, page_url, remove_search_index
+from sitemap import FRONT_MATTER_KEYS, Sitemap, page_dates, remove_sitemap
+from template import configure_assets, configure_minify, find_layout, load_template, template_cache
+from walk import walk_files
+
+# Threads per I/O stage and items allowed to wait between stages in pipelined builds
+PIPELINE_IO_THREADS = 4
+PIPELINE_QUEUE_SIZE = 16
+
 
 def extract_title(markdown):
     lines = markdown.splitlines()
@@ -13,71 +43,550 @@ def extract_title(markdown):
     raise Exception("No header found")
 
 
-def generate_page(from_path, template_path, dest_path, basepath):
+def split_front_matter_lines(lines):
+    # Optional front matter is a block of "key: value" lines fenced by --- at the top of the file.
+    # Takes an iterator of lines and returns the variables, an iterator over the body lines
+    # and the line number the body starts on.
+    variables = {}
+    first_line = next(lines, None)
+    if first_line is None:
+        return variables, iter(()), 1
+    if first_line != "---":
+        return variables, itertools.chain((first_line,), lines), 1
+
+    front_matter = []
+    for line in lines:
+        if line.startswith("---"):
+            break
+        front_matter.append(line)
+    else:
+        # No closing fence, so this was never front matter
+        return variables, itertools.chain((first_line,), front_matter), 1
+
+    for line in front_matter:
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        if ":" not in line:
+            raise ValueError(f"invalid front matter line: {line}")
+        key, value = line.split(":", 1)
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        variables[key.strip()] = value
+    # Past both fences
+    return variables, lines, len(front_matter) + 3
+
+
+def track_title(lines, titles):
+    # Pass lines through unchanged, noting the first "# " heading the way extract_title would
+    for line in lines:
+        if not titles and line.startswith("# "):
+            titles.append(line[2:].strip())
+        yield line
+
+
+def parse_page(lines, minify=False):
+    # Front matter, first "# " heading (or None), node tree, the ("link" or "image", url, line)
+    # references and the word counts (None unless words are collected) of a page given as lines.
+    # Blocks go through the process's block memo unless it has been turned off; minify
+    # says whether the memo holds them minified.
+    titles = []
+    variables, body, first_line = split_front_matter_lines(lines)
+    memo = block_memo if block_memo.enabled else None
+    with collect_references() as collector:
+        html_node = markdown_lines_to_html_node(track_title(body, titles), memo, minify, first_line)
+    words = dict(Counter(collector.words)) if collector.words is not None else None
+    return variables, titles[0] if titles else None, html_node, collector.references, words
+
+
+def parse_page_cached(source_hash, open_source, parse_cache, minify=False):
+    # parse_page through the parse cache, for a source whose content hash is source_hash.
+    # open_source opens the source as text; it is only called on a miss, which parses the
+    # source line by line like an uncached build. Returns the parse_page result and "hit" or "miss".
+    key = parse_cache.key(source_hash, minify)
+    cached = parse_cache.load(key)
+    # An entry stored while words weren't collected doesn't have them
+    if cached is not None and (cached[4] is not None or not collects_words()):
+        return cached, "hit"
+    with open_source() as f:
+        parsed = parse_page(read_lines(f), minify)
+    parse_cache.store(key, *parsed)
+    return parsed, "miss"
+
+
+def open_source_bytes(source):
+    # Decode the way open() in text mode would, newline translation included
+    return io.TextIOWrapper(io.BytesIO(source))
+
+
+def parse_source(source, parse_cache=None, minify=False, source_hash=None):
+    # parse_page for the raw bytes of a source, through the parse cache if there is one.
+    # source_hash saves hashing the source again when the caller already has it.
+    # Returns the parse_page result and "hit", "miss" or None.
+    if parse_cache is not None:
+        if source_hash is None:
+            source_hash = hash_bytes(source)
+        return parse_page_cached(source_hash, lambda: open_source_bytes(source), parse_cache, minify)
+    with open_source_bytes(source) as f:
+        return parse_page(read_lines(f), minify), None
+
+
+def set_title(variables, title):
+    # Use the first "# " heading as the title, unless the front matter already sets one
+    if "Title" not in variables:
+        if title is None:
+            raise Exception("No header found")
+        variables["Title"] = title
+
+
+def page_result(from_path, cache_result, references, minifier=None, variables=None, words=None):
+    # What generate_page reports back about a page, also across process boundaries
+    variables = variables or {}
+    return {
+        "from_path": from_path,
+        "parse_cache": cache_result,
+        "references": list(references),
+        "minify_saved": minifier.saved if minifier is not None else None,
+        "title": variables.get("Title"),
+        "front_matter": {key: variables[key] for key in FRONT_MATTER_KEYS if key in variables},
+        "words": words,
+    }
+
+
+def render_page(from_path, source, template_path, basepath, parse_cache=None, source_hash=None):
+    # Everything between reading a source and writing its page, for callers that
+    # do their own I/O. Returns the page text and the per-page results.
+    template = load_template(template_path, basepath)
+    (variables, title, html_node, references, words), cache_result = parse_source(
+        source, parse_cache, template.minify, source_hash
+    )
+    set_title(variables, title)
+    variables["Content"] = html_node
+    minifier = template.make_minifier()
+    text = template.render(variables, minifier)
+    return text, page_result(from_path, cache_result, references, minifier, variables, words)
+
+
+def write_page(dest_path, text):
+    # Write to a temporary file, then move it into place so a failure never leaves a truncated page
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = dest_path + ".tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def add_block_memo_counts(result, memo_hits, memo_misses):
+    # Record the block memo lookups made since the counts were memo_hits and memo_misses
+    result["block_memo_hits"] = block_memo.hits - memo_hits
+    result["block_memo_misses"] = block_memo.misses - memo_misses
+    result["block_memo_bytes"] = block_memo.size
+    return result
+
+
+def generate_page(from_path, template_path, dest_path, basepath, parse_cache=None, source_hash=None):
+    # Returns a dict of per-page results for the build stats. source_hash, the source's
+    # content hash from the build manifest, is the parse cache key; without it the source is
+    # hashed when there is a parse cache.
+    memo_hits, memo_misses = block_memo.hits, block_memo.misses
+    profiler = get_profiler()
+    if profiler is not None:
+        with profiler.page(from_path):
+            result = generate_page_profiled(
+                profiler, from_path, template_path, dest_path, basepath, parse_cache, source_hash
+            )
+    else:
+        result = generate_page_streamed(from_path, template_path, dest_path, basepath, parse_cache, source_hash)
+    return add_block_memo_counts(result, memo_hits, memo_misses)
+
+
+def generate_page_streamed(from_path, template_path, dest_path, basepath, parse_cache=None, source_hash=None):
     # 1. Print a message
     print(f"Generating page from {from_path} to {dest_path} using {template_path}")
     
-    # 2. Read the markdown file
-    with open(from_path, 'r') as f:
-        markdown_content = f.read()
-    
-    # 3. Read the template file
-    with open(template_path, 'r') as f:
-        template_content = f.read()
-    
-    # 4. Convert markdown to HTML
-    html_node = markdown_to_html_node(markdown_content)
-    html_content = html_node.to_html()
-    
-    # 5. Extract the title
-    title = extract_title(markdown_content)
+    # 2. Load the compiled template (parsed once and reused until the file changes)
+    template = load_template(template_path, basepath)
+
+    # 3. Read the markdown file line by line: front matter first, then blocks are
+    # parsed as their lines arrive, so the source is never held in memory whole.
+    # A parse cache hit, found by the source's content hash, doesn't read it at all.
+    if parse_cache is None:
+        with open(from_path, 'r') as f:
+            variables, title, html_node, references, words = parse_page(read_lines(f), template.minify)
+        cache_result = None
+    else:
+        if source_hash is None:
+            source_hash = hash_file(from_path)
+        (variables, title, html_node, references, words), cache_result = parse_page_cached(
+            source_hash, lambda: open(from_path, 'r'), parse_cache, template.minify
+        )
     
-    # 6. Replace placeholders in the template
-    final_html = template_content.replace("{{ Title }}", title).replace("{{ Content }}", html_content)
-    final_html = final_html.replace('href="/', f'href="{basepath}')
-    final_html = final_html.replace('src="/', f'src="{basepath}')
+    # 4. Use the first "# " heading as the title, unless the front matter already sets one
+    set_title(variables, title)
+    # The node itself goes in, so the template streams it instead of building one big string
+    variables["Content"] = html_node
     
-    # 7. Create destination directory if it doesn't exist
+    # 5. Create destination directory if it doesn't exist
     os.makedirs(os.path.dirname(dest_path), exist_ok=True)
     
-    # 8. Write the final HTML to the destination
-    with open(dest_path, 'w') as f:
-        f.write(final_html)
-        
+    # 6. Stream the filled template to a temporary file, then move it into place
+    # so a failed render never leaves a truncated page behind
+    minifier = template.make_minifier()
+    tmp_path = dest_path + ".tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            template.write(f, variables, minifier=minifier)
+        os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return page_result(from_path, cache_result, references, minifier, variables, words)
+
+
+def generate_page_profiled(profiler, from_path, template_path, dest_path, basepath, parse_cache=None,
+                           source_hash=None):
+    # Same output as generate_page, but with each stage run to completion on its own
+    # so it can be timed: the streaming path interleaves reading, parsing and writing
+    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    template = load_template(template_path, basepath)
+
+    with profiler.stage("read"):
+        with open(from_path, 'rb') as f:
+            source = f.read()
+
+    # Inline parsing happens inside block parsing and reports its own time, so take it back out.
+    # A parse cache hit shows up as a short block_parse and no inline_parse at all.
+    with profiler.stage("block_parse"):
+        (variables, title, html_node, references, words), cache_result = parse_source(
+            source, parse_cache, template.minify, source_hash
+        )
+    stages = profiler.pages[from_path]
+    stages["block_parse"] -= stages["inline_parse"]
+    set_title(variables, title)
+
+    minifier = template.make_minifier()
+    with profiler.stage("render"):
+        if minifier is None:
+            variables["Content"] = html_node.to_html()
+        else:
+            variables["Content"] = html_node.to_minified_html(minifier)
+
+    with profiler.stage("template"):
+        page = template.render(variables, minifier)
+
+    with profiler.stage("write"):
+        write_page(dest_path, page)
+    return page_result(from_path, cache_result, references, minifier, variables, words)
+
+
+def build_page(from_path, template_path, dest_path, basepath, parse_cache=None, source_hash=None):
+    # Wrap generate_page so a failure always names the page that caused it,
+    # including when it happens inside a worker process
+    try:
+        return generate_page(from_path, template_path, dest_path, basepath, parse_cache, source_hash)
+    except Exception as e:
+        raise RuntimeError(f"Failed to generate page {from_path}: {e}") from e
+
+
+def build_page_profiled(from_path, template_path, dest_path, basepath, parse_cache=None, source_hash=None):
+    # Worker side of a profiled parallel build: profile this page with a fresh profiler
+    # and hand what it recorded back to the parent process
+    enable_profiling()
+    try:
+        result = build_page(from_path, template_path, dest_path, basepath, parse_cache, source_hash)
+    finally:
+        profiler = disable_profiling()
+    return result, profiler.events, profiler.pages
+
+
+def worker_settings():
+    # The process-wide build settings, for init_worker. Forked workers would inherit them,
+    # but spawned and forkserver workers start from a fresh import.
+    return (template_cache.minify, template_cache.assets, block_memo.max_bytes, collects_words())
+
+
+def init_worker(minify, assets, block_memo_bytes, collect_words):
+    configure_minify(minify)
+    configure_assets(assets)
+    configure_block_memo(block_memo_bytes)
+    configure_word_collection(collect_words)
+
+
+def generate_pages_parallel(pages, basepath, jobs, parse_cache=None, on_written=None, mp_context=None,
+                            source_hashes=None):
+    # Returns the generate_page result of every page, in completion order.
+    # mp_context is the multiprocessing context to start workers with (default: the platform's).
+    # source_hashes maps sources to their content hash, for the parse cache.
+    # Schedule the largest sources first so a single big page doesn't hold up the end of the build
+    pages = sorted(pages, key=lambda page: os.path.getsize(page[0]), reverse=True)
+
+    profiler = get_profiler()
+    worker = build_page if profiler is None else build_page_profiled
+
+    results = []
+    page_destinations = {from_path: dest_path for from_path, _, dest_path in pages}
+    executor = ProcessPoolExecutor(
+        max_workers=jobs, mp_context=mp_context, initializer=init_worker, initargs=worker_settings(),
+    )
+    try:
+        futures = [
+            executor.submit(
+                worker, from_path, template_path, dest_path, basepath, parse_cache,
+                source_hashes.get(from_path) if source_hashes else None,
+            )
+            for from_path, template_path, dest_path in pages
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            if profiler is not None:
+                result, events, page_stages = result
+                profiler.merge(events, page_stages)
+            results.append(result)
+            if on_written is not None:
+                on_written(page_destinations[result["from_path"]])
+    finally:
+        # On failure don't wait for pages that haven't started yet
+        executor.shutdown(wait=True, cancel_futures=True)
+    return results
+
+
+def generate_pages_pipelined(pages, basepath, parse_cache=None, io_threads=PIPELINE_IO_THREADS, on_written=None,
+                             source_hashes=None):
+    # Overlap I/O with parsing: reader threads prefetch sources, this thread parses and
+    # renders them, and writer threads flush the finished pages. Returns the per-page results
+    # and the utilization of each stage.
+    def read(page):
+        with open(page[0], 'rb') as f:
+            return f.read()
+
+    def process(page, source):
+        from_path, template_path, dest_path = page
+        print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+        memo_hits, memo_misses = block_memo.hits, block_memo.misses
+        try:
+            text, result = render_page(
+                from_path, source, template_path, basepath, parse_cache,
+                source_hashes.get(from_path) if source_hashes else None,
+            )
+        except Exception as e:
+            raise RuntimeError(f"Failed to generate page {from_path}: {e}") from e
+        return text, add_block_memo_counts(result, memo_hits, memo_misses)
+
+    def write(page, text):
+        try:
+            write_page(page[2], text)
+        except Exception as e:
+            raise RuntimeError(f"Failed to write page {page[2]}: {e}") from e
+        if on_written is not None:
+            on_written(page[2])
+
+    return run_pipeline(
+        pages, read, process, write,
+        readers=io_threads, writers=io_threads, queue_size=PIPELINE_QUEUE_SIZE,
+    )
+
+
+def page_dest_path(entry_path, dir_path_content, dest_dir_path):
+    # Where a single markdown source ends up, matching collect_pages
+    rel_path = os.path.relpath(entry_path, dir_path_content)
+    return os.path.join(dest_dir_path, os.path.splitext(rel_path)[0] + '.html')
+
+
+def collect_pages(dir_path_content, dest_dir_path):
+    # Walk the content tree and return every (markdown source, html destination) pair,
+    # in the same order on every run
+    pages = []
+    for rel_path, entry in walk_files(dir_path_content, include=("*.md",)):
+        # Create destination path with .html extension
+        dest_path = os.path.join(dest_dir_path, os.path.splitext(rel_path)[0] + '.html')
+        pages.append((entry.path, dest_path))
+    return pages
+
+
+def report_broken_links(broken_links):
+    for source, line, kind, url in broken_links:
+        print(f"Broken {kind} in {source}:{line}: {url}")
+    if broken_links:
+        print(f"Found {len(broken_links)} broken internal links")
+
+
+def generate_pages_recursive(
+    dir_path_content, template_path, dest_dir_path, basepath, incremental=False, jobs=1, parse_cache=None,
+    pipeline=False, explain=False, pages=None, hash_source=hash_file, on_written=None, search=False, partial=False,
+    site_url=None,
+):
+    # pages and hash_source let a long-running caller supply the (source, destination) list
+    # and source hashes it already knows, instead of walking and hashing the content tree.
+    # on_written, if given, is called with each page's output path once it has been written.
+    # search keeps a client-side search index of the site's words under search/.
+    # site_url (the deployed site's origin, such as https://example.org) adds sitemap.xml and
+    # a feed per section.
+    # partial says pages is only part of the site (one shard of a sharded build): then broken
+    # links aren't reported and the search index and sitemap are only recorded, to be written
+    # once merged.
+    stats = {"rebuilt": 0, "skipped": 0, "removed": 0, "reasons": {}, "minify_saved": {}}
+    if parse_cache is not None:
+        stats.update({"parse_cache_hits": 0, "parse_cache_misses": 0, "parse_cache_evicted": 0})
+    if block_memo.enabled:
+        stats.update({"block_memo_hits": 0, "block_memo_misses": 0, "block_memo_bytes": 0})
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
     # Check if the content directory exists
     if not os.path.exists(dir_path_content):
         print(f"Warning: Content directory {dir_path_content} does not exist")
-        return
-    
-    # List all entries in the content directory
-    entries = os.listdir(dir_path_content)
-    
-    # Process each entry
-    for entry in entries:
-        # Create full path for the current entry
-        entry_path = os.path.join(dir_path_content, entry)
-        
-        # Check if it's a file or directory
-        if os.path.isfile(entry_path):
-            # Only process markdown files
-            if entry_path.endswith('.md'):
-                # Calculate relative path from content root
-                rel_path = os.path.relpath(entry_path, dir_path_content)
-                
-                # Create destination path with .html extension
-                dest_path = os.path.join(dest_dir_path, 
-                                        os.path.splitext(rel_path)[0] + '.html')
-                
-                # Generate the page
-                print(f"Processing {rel_path} -> {os.path.relpath(dest_path, dest_dir_path)}")
-                generate_page(entry_path, template_path, dest_path, basepath)
-        elif os.path.isdir(entry_path):
-            # It's a directory, recursively process it
-            new_content_dir = entry_path
-            new_dest_dir = os.path.join(dest_dir_path, entry)
-            # Ensure the destination directory exists
-            os.makedirs(new_dest_dir, exist_ok=True)
-            # Recursively process the subdirectory
-            generate_pages_recursive(new_content_dir, template_path, new_dest_dir, basepath)
\ No newline at end of file
+        return stats
+
+    # The previous manifest tells us which pages are already up to date,
+    # and the previous dependency graph which pages link to which
+    old_pages = load_manifest(dest_dir_path) if incremental else {}
+    graph = DependencyGraph(load_dependency_graph(dest_dir_path) if incremental else {})
+    search_index = SearchIndex(dest_dir_path) if search else None
+    sitemap = Sitemap(dest_dir_path) if site_url else None
+    # Set before any pool workers are started, so init_worker hands it to them
+    configure_word_collection(search)
+    new_pages = {}
+    source_hashes = {}
+    layouts = {}
+    page_paths = {}
+    reasons = stats["reasons"]
+
+    if pages is None:
+        pages = collect_pages(dir_path_content, dest_dir_path)
+    for entry_path, dest_path in pages:
+        # Calculate relative paths from content and output roots
+        rel_path = os.path.relpath(entry_path, dir_path_content)
+        dest_rel_path = os.path.relpath(dest_path, dest_dir_path)
+
+        # Pages pick up the nearest per-directory layout; its fingerprint covers any includes
+        page_template_path = find_layout(entry_path, dir_path_content, template_path, layouts)
+        template_hash = load_template(page_template_path, basepath).fingerprint
+
+        entry = make_entry(rel_path, hash_source(entry_path), template_hash, basepath)
+        new_pages[dest_rel_path] = entry
+        # Also the parse cache's key, so pages aren't read and hashed again to look them up
+        source_hashes[entry_path] = entry["source_hash"]
+        page_paths[dest_rel_path] = (entry_path, page_template_path, dest_path)
+        reason = explain_rebuild(old_pages.get(dest_rel_path), entry, dest_path) if incremental else "full build"
+        if reason is None and search_index is not None and dest_rel_path not in search_index:
+            # Its words are only known from parsing it
+            reason = "not in search index"
+        if reason is None and sitemap is not None and dest_rel_path not in sitemap:
+            # Its dates may come from front matter
+            reason = "not in sitemap"
+        if reason is not None:
+            reasons[dest_rel_path] = reason
+
+    # A page that appeared or disappeared also rebuilds the pages linking to it,
+    # even though their own inputs are unchanged
+    added_or_removed = new_pages.keys() ^ old_pages.keys()
+    for dest_rel_path, target in graph.pages_linking_to(added_or_removed).items():
+        if dest_rel_path in new_pages and dest_rel_path not in reasons:
+            change = "added" if target in new_pages else "removed"
+            reasons[dest_rel_path] = f"links to {change} page {target}"
+
+    to_build = []
+    for dest_rel_path, (entry_path, page_template_path, dest_path) in page_paths.items():
+        if dest_rel_path not in reasons:
+            stats["skipped"] += 1
+            continue
+        rel_path = new_pages[dest_rel_path]["source"]
+        if explain:
+            print(f"Processing {rel_path} -> {dest_rel_path} ({reasons[dest_rel_path]})")
+        else:
+            print(f"Processing {rel_path} -> {dest_rel_path}")
+        to_build.append((entry_path, page_template_path, dest_path))
+
+    # Generate the pages, on a process pool when more than one job is requested
+    if jobs > 1 and len(to_build) > 1:
+        results = generate_pages_parallel(to_build, basepath, jobs, parse_cache, on_written,
+                                          source_hashes=source_hashes)
+    elif pipeline:
+        results, stats["pipeline_utilization"] = generate_pages_pipelined(
+            to_build, basepath, parse_cache, on_written=on_written, source_hashes=source_hashes,
+        )
+    else:
+        results = []
+        for entry_path, page_template_path, dest_path in to_build:
+            results.append(build_page(
+                entry_path, page_template_path, dest_path, basepath, parse_cache, source_hashes[entry_path]
+            ))
+            if on_written is not None:
+                on_written(dest_path)
+    stats["rebuilt"] = len(to_build)
+    dest_rel_paths = {page[0]: os.path.relpath(page[2], dest_dir_path) for page in to_build}
+    documents = {}
+    sitemap_entries = {}
+    for result in results:
+        dest_rel_path = dest_rel_paths[result["from_path"]]
+        _, page_template_path, _ = page_paths[dest_rel_path]
+        graph.set_page(
+            dest_rel_path,
+            new_pages[dest_rel_path]["source"],
+            load_template(page_template_path, basepath).dependencies,
+            result["references"],
+        )
+        documents[dest_rel_path] = {
+            "url": page_url(dest_rel_path, basepath), "title": result["title"], "words": result["words"],
+        }
+        if sitemap is not None:
+            published, updated = page_dates(result["front_matter"], result["from_path"])
+            sitemap_entries[dest_rel_path] = {
+                "url": page_url(dest_rel_path, basepath), "title": result["title"],
+                "published": published, "updated": updated, "author": result["front_matter"].get("Author"),
+            }
+        if result["minify_saved"] is not None:
+            add_savings(stats["minify_saved"], ".html", result["minify_saved"])
+        if result["parse_cache"] == "hit":
+            stats["parse_cache_hits"] += 1
+        elif result["parse_cache"] == "miss":
+            stats["parse_cache_misses"] += 1
+        if block_memo.enabled:
+            stats["block_memo_hits"] += result["block_memo_hits"]
+            stats["block_memo_misses"] += result["block_memo_misses"]
+            # Each pool worker has a memo of its own; report the largest
+            stats["block_memo_bytes"] = max(stats["block_memo_bytes"], result["block_memo_bytes"])
+
+    # Pages whose source disappeared since the last build are deleted from the output
+    stats["removed"] = remove_stale_outputs(dest_dir_path, old_pages, new_pages)
+    save_manifest(dest_dir_path, new_pages)
+    graph.keep_only(new_pages)
+    save_dependency_graph(dest_dir_path, graph.pages)
+    if not partial:
+        # Every page's references are in the graph already, so this needs no parsing
+        stats["broken_links"] = graph.broken_references(output_index(new_pages, load_static_manifest(dest_dir_path)))
+        report_broken_links(stats["broken_links"])
+    if search_index is not None:
+        stats["search"] = search_index.update(new_pages, documents, write_files=not partial)
+    else:
+        remove_search_index(dest_dir_path)
+    if sitemap is not None:
+        stats["sitemap"] = sitemap.update(new_pages, sitemap_entries, site_url, basepath, write_files=not partial)
+    else:
+        remove_sitemap(dest_dir_path)
+
+    print(f"Rebuilt {stats['rebuilt']} pages, skipped {stats['skipped']} unchanged, removed {stats['removed']} stale")
+    if stats["minify_saved"]:
+        print(f"Minified: {format_savings(stats['minify_saved'])}")
+    if "search" in stats:
+        print(f"Search index: {stats['search']['documents']} documents, "
+              f"{stats['search']['shards_written']} shards written, {stats['search']['shards_removed']} removed")
+    if "sitemap" in stats:
+        print(f"Sitemap and feeds: {stats['sitemap']['urls']} URLs, {stats['sitemap']['written']} files written, "
+              f"{stats['sitemap']['unchanged']} unchanged, {stats['sitemap']['removed']} removed")
+    if "pipeline_utilization" in stats:
+        print("Pipeline utilization: " + ", ".join(
+            f"{stage} {share:.0%}" for stage, share in stats["pipeline_utilization"].items()
+        ))
+    if parse_cache is not None:
+        stats["parse_cache_evicted"] = parse_cache.prune()
+        print(f"Parse cache: {stats['parse_cache_hits']} hits, {stats['parse_cache_misses']} misses, "
+              f"evicted {stats['parse_cache_evicted']} entries")
+    if block_memo.enabled:
+        lookups = stats["block_memo_hits"] + stats["block_memo_misses"]
+        stats["block_memo_hit_rate"] = stats["block_memo_hits"] / lookups if lookups else 0.0
+        print(f"Block memo: {stats['block_memo_hits']} hits, {stats['block_memo_misses']} misses "
+              f"({stats['block_memo_hit_rate']:.0%} hit rate), {stats['block_memo_bytes']} bytes cached")
+    return stats
@@ -1,4 +1,42 @@
+from types import MappingProxyType
+
+from minify import PRESERVED_ELEMENTS
+
+# Shared, read-only stand-in for "no attributes", so leaves don't each allocate an empty dict
+EMPTY_PROPS = MappingProxyType({})
+
+# Fragments are joined and written out in batches of this many
+WRITE_BATCH_SIZE = 4096
+
+# Elements that never have content; minified output leaves out their end tag
+VOID_ELEMENTS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr",
+))
+
+
+class HTMLWriter:
+    # Collects serialized fragments and writes them to a stream in batches, so a page
+    # never has to exist in memory as one string. transform, if given, is applied to each batch.
+    def __init__(self, stream, batch_size=WRITE_BATCH_SIZE, transform=None):
+        self.stream = stream
+        self.batch = []
+        self.batch_size = batch_size
+        self.transform = transform
+
+    def flush(self):
+        if not self.batch:
+            return
+        text = "".join(self.batch)
+        self.batch.clear()
+        if self.transform is not None:
+            text = self.transform(text)
+        self.stream.write(text)
+
+
 class HTMLNode:
+    # Slots instead of a per-instance __dict__: whole-site trees hold a lot of nodes
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -8,6 +46,22 @@ class HTMLNode:
     def to_html(self):
         raise NotImplementedError("to_html method not implemented")
 
+    def iter_html(self):
+        # Nodes that only implement to_html still stream, as a single fragment
+        yield self.to_html()
+
+    def to_minified_html(self, minifier):
+        # Compact HTML with the savings counted on minifier; nodes that don't know how stay as they are
+        return self.to_html()
+
+    def write_html(self, stream, batch_size=WRITE_BATCH_SIZE, transform=None, minifier=None):
+        writer = HTMLWriter(stream, batch_size, transform)
+        if minifier is None:
+            writer.batch.extend(self.iter_html())
+        else:
+            writer.batch.append(self.to_minified_html(minifier))
+        writer.flush()
+
     def props_to_html(self):
         if self.props is None:
             return ""
@@ -21,6 +75,8 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
 
@@ -31,24 +87,131 @@ class LeafNode(HTMLNode):
             return self.value
         return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
 
+    def iter_html(self):
+        yield self.to_html()
+
+    def to_minified_html(self, minifier):
+        if self.value is None:
+            raise ValueError("invalid HTML: no value")
+        tag = self.tag
+        if tag is None:
+            return minifier.text(self.value)
+        open_tag = f"<{tag}{self.props_to_html()}>" if self.props else f"<{tag}>"
+        if tag in VOID_ELEMENTS and not self.value:
+            minifier.saved += len(tag) + 3
+            return open_tag
+        value = self.value if tag in PRESERVED_ELEMENTS else minifier.text(self.value)
+        return f"{open_tag}{value}</{tag}>"
+
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
 
 
+class RawHTML(LeafNode):
+    # Markup that was serialized earlier, such as a memoized block, written out as it is.
+    # saved is what minifying it saved, if it was minified, so the savings still add up.
+    __slots__ = ("saved",)
+
+    def __init__(self, value, saved=0):
+        super().__init__(None, value)
+        self.saved = saved
+
+    def to_minified_html(self, minifier):
+        minifier.saved += self.saved
+        return self.value
+
+    def __repr__(self):
+        return f"RawHTML({self.value})"
+
+
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
     def to_html(self):
+        fragments = []
+        self.serialize(fragments)
+        return "".join(fragments)
+
+    def open_tag(self):
         if self.tag is None:
             raise ValueError("invalid HTML: no tag")
         if self.children is None:
             raise ValueError("invalid HTML: no children")
+        return f"<{self.tag}{self.props_to_html()}>"
 
-        children_html = ""
+    def serialize(self, fragments, writer=None):
+        # Append the fragments of this subtree to a list instead of concatenating strings
+        # at every level. With a writer (whose batch is fragments), full batches are flushed
+        # between child elements, so memory is bounded by the batch size and the tree depth.
+        # Tags are built inline rather than through open_tag/to_html: this is the hot loop.
+        tag = self.tag
+        if tag is None:
+            raise ValueError("invalid HTML: no tag")
+        if self.children is None:
+            raise ValueError("invalid HTML: no children")
+        append = fragments.append
+        append(f"<{tag}{self.props_to_html()}>" if self.props else f"<{tag}>")
         for child in self.children:
-            children_html += child.to_html()
-        return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
+            if type(child) is LeafNode:
+                if child.value is None:
+                    raise ValueError("invalid HTML: no value")
+                if child.tag is None:
+                    append(child.value)
+                elif child.props:
+                    append(f"<{child.tag}{child.props_to_html()}>{child.value}</{child.tag}>")
+                else:
+                    append(f"<{child.tag}>{child.value}</{child.tag}>")
+            elif isinstance(child, ParentNode):
+                child.serialize(fragments, writer)
+                if writer is not None and len(fragments) >= writer.batch_size:
+                    writer.flush()
+            else:
+                fragments.extend(child.iter_html())
+        append(f"</{tag}>")
+
+    def serialize_minified(self, fragments, minifier, writer=None):
+        # serialize in minify mode: runs of whitespace in text become one space and void
+        # elements lose their end tag. <pre> and the like are serialized exactly as they are.
+        tag = self.tag
+        if tag in PRESERVED_ELEMENTS:
+            self.serialize(fragments, writer)
+            return
+        if tag is None:
+            raise ValueError("invalid HTML: no tag")
+        if self.children is None:
+            raise ValueError("invalid HTML: no children")
+        append = fragments.append
+        append(f"<{tag}{self.props_to_html()}>" if self.props else f"<{tag}>")
+        for child in self.children:
+            if isinstance(child, ParentNode):
+                child.serialize_minified(fragments, minifier, writer)
+                if writer is not None and len(fragments) >= writer.batch_size:
+                    writer.flush()
+            else:
+                append(child.to_minified_html(minifier))
+        append(f"</{tag}>")
+
+    def to_minified_html(self, minifier):
+        fragments = []
+        self.serialize_minified(fragments, minifier)
+        return "".join(fragments)
+
+    def iter_html(self):
+        yield self.open_tag()
+        for child in self.children:
+            yield from child.iter_html()
+        yield f"</{self.tag}>"
+
+    def write_html(self, stream, batch_size=WRITE_BATCH_SIZE, transform=None, minifier=None):
+        writer = HTMLWriter(stream, batch_size, transform)
+        if minifier is None:
+            self.serialize(writer.batch, writer)
+        else:
+            self.serialize_minified(writer.batch, minifier, writer)
+        writer.flush()
 
     def __repr__(self):
         return f"ParentNode({self.tag}, children: {self.children}, {self.props})"
@@ -1,6 +1,27 @@
+import os
 import re
 from textnode import TextNode, TextType
 
+# One alternation for every inline token: group 1/2 is an image, group 3/4 a link, group 5 a delimiter.
+# The lookahead lets the regex engine skip plain text quickly. The link branch needs no (?<!!)
+# lookbehind: if an image failed to match at the "!", the same link can't match one character later.
+INLINE_TOKEN_PATTERN = re.compile(
+    r"(?=[!\[*_`])(?:"
+    r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
+    r"|\[([^\[\]]*)\]\(([^\(\)]*)\)"
+    r"|(\*\*|_|`))"
+)
+
+# Delimiters rank in the order the legacy passes applied them; a lower rank takes precedence
+INLINE_DELIMITERS = {
+    "**": (0, TextType.BOLD),
+    "_": (1, TextType.ITALIC),
+    "`": (2, TextType.CODE),
+}
+
+# "single" (default), "legacy" for the five-pass pipeline, or "compare" to run both and check they agree
+INLINE_PARSER = os.environ.get("SSG_INLINE_PARSER", "single")
+
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
@@ -78,6 +99,14 @@ def split_nodes_link(old_nodes):
 
 
 def text_to_textnodes(text):
+    if INLINE_PARSER == "legacy":
+        return text_to_textnodes_legacy(text)
+    if INLINE_PARSER == "compare":
+        return compare_inline_parsers(text)
+    return tokenize_inline(text)
+
+
+def text_to_textnodes_legacy(text):
     nodes = [TextNode(text, TextType.TEXT)]
     nodes = split_nodes_image(nodes)
     nodes = split_nodes_link(nodes)
@@ -86,6 +115,71 @@ def text_to_textnodes(text):
     nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
     return nodes
 
+
+def tokenize_inline(text):
+    # Single left-to-right scan producing the same nodes as the legacy passes:
+    # images and links are extracted first, so formatting never spans them, and an
+    # open span must be closed before any higher-precedence delimiter appears
+    nodes = []
+    open_rank = None
+    open_type = None
+    span_start = 0
+    for match in INLINE_TOKEN_PATTERN.finditer(text):
+        delimiter = match.group(5)
+        if delimiter is not None:
+            rank, text_type = INLINE_DELIMITERS[delimiter]
+            if open_rank is not None and rank != open_rank:
+                if rank < open_rank:
+                    raise ValueError("invalid markdown, formatted section not closed")
+                # Lower-precedence delimiters are literal text inside the open span
+                continue
+            if match.start() > span_start:
+                nodes.append(TextNode(text[span_start:match.start()], open_type or TextType.TEXT))
+            if open_rank is None:
+                open_rank, open_type = rank, text_type
+            else:
+                open_rank, open_type = None, None
+            span_start = match.end()
+            continue
+
+        if open_rank is not None:
+            raise ValueError("invalid markdown, formatted section not closed")
+        if match.start() > span_start:
+            nodes.append(TextNode(text[span_start:match.start()], TextType.TEXT))
+        image_alt, image_url, link_text, link_url = match.group(1, 2, 3, 4)
+        if image_url is not None:
+            nodes.append(TextNode(image_alt, TextType.IMAGE, image_url))
+        else:
+            nodes.append(TextNode(link_text, TextType.LINK, link_url))
+        span_start = match.end()
+
+    if open_rank is not None:
+        raise ValueError("invalid markdown, formatted section not closed")
+    if len(text) > span_start:
+        nodes.append(TextNode(text[span_start:], TextType.TEXT))
+    return nodes
+
+
+def compare_inline_parsers(text):
+    # Run both parsers and insist on the same nodes, or the same error
+    try:
+        legacy = text_to_textnodes_legacy(text)
+    except ValueError as e:
+        legacy = e
+    try:
+        single = tokenize_inline(text)
+    except ValueError as e:
+        single = e
+    if isinstance(legacy, ValueError) or isinstance(single, ValueError):
+        if type(legacy) is not type(single):
+            raise AssertionError(f"inline parsers disagree on {text!r}: {legacy!r} != {single!r}")
+        if isinstance(single, ValueError):
+            raise single
+    elif legacy != single:
+        raise AssertionError(f"inline parsers disagree on {text!r}: {legacy!r} != {single!r}")
+    return single
+
+
 def extract_markdown_images(text):
     pattern = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
     matches = re.findall(pattern, text)
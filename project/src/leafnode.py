@@ -1,13 +1,14 @@
-from htmlnode import HTMLNode
+from htmlnode import EMPTY_PROPS, HTMLNode
 
 class LeafNode(HTMLNode):
+	__slots__ = ()
 
-	def __init__(self, tag, value, props=None):  # Default props to an empty dictionary
+	def __init__(self, tag, value, props=None):  # Default props to the shared empty mapping
 		if value is None:
 			raise ValueError('All leaf nodes must have a value.')
-		if props is None:  # Ensure props is at least an empty dictionary
-			props = {}
-		super().__init__(tag, value, props)
+		if props is None:  # Ensure props is at least an empty mapping, without allocating one per leaf
+			props = EMPTY_PROPS
+		super().__init__(tag, value, None, props)
 	
 	def to_html(self):
 		# Prepare props string if any props exist
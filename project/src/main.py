@@ -1,9 +1,20 @@
+import argparse
+import cProfile
+import contextlib
 import os
 import shutil
 import sys
 
-from copystatic import copy_files_recursive
-from generate_content import generate_pages_recursive
+from copystatic import sync_static_files
+from block_memo import DEFAULT_MAX_BYTES as DEFAULT_BLOCK_MEMO_BYTES, configure_block_memo
+from generate_content import collect_pages, generate_pages_recursive
+from manifest import save_shard_record
+from parse_cache import DEFAULT_MAX_BYTES, ParseCache
+from png_optimize import PNGOptimizer
+from precompress import DEFAULT_LEVEL, DEFAULT_MIN_SIZE, Precompressor, remove_precompressed
+from profiling import disable_profiling, enable_profiling
+from shard import DEFAULT_SHARD_ROOT, STATIC_SHARD, make_shard_record, parse_shard, shard_pages
+from template import configure_assets, configure_minify
 
 
 import os
@@ -23,28 +34,233 @@ template_path = os.path.join(project_dir, "template.html")
 # Set docs path to repository root's docs directory
 dir_path_public = os.path.join(repo_root, "docs")
 
-basepath = "/" if len(sys.argv) < 2 else sys.argv[1]
+# Parsed pages survive between builds here, outside the output directory that gets wiped
+dir_path_parse_cache = os.path.join(project_dir, ".cache", "parse")
+# Optimized images, by hash of the original, so each one is only optimized once
+dir_path_image_cache = os.path.join(project_dir, ".cache", "images")
+
 # dir_path_static = "./static"
 # dir_path_public = "./docs"  # Change this line   #"./public"
 # dir_path_content = "./content"
 # template_path = "./template.html"
 # basepath = "/" if len(sys.argv) < 2 else sys.argv[1]
 
+def shard_argument(text):
+    try:
+        return parse_shard(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the static site into docs/")
+    parser.add_argument("basepath", nargs="?", default="/",
+                        help="URL prefix for absolute links (default: /)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="keep the existing output and only rebuild pages whose inputs changed")
+    parser.add_argument("--minify", action="store_true",
+                        help="write compact HTML and minified CSS (pre/code content is kept as it is)")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="name assets after a hash of their content (index.3f9a1c2b.css), write "
+                             "asset-manifest.json and point pages at the new names")
+    parser.add_argument("--optimize-images", action="store_true",
+                        help="losslessly recompress PNGs and drop their metadata chunks (cached in project/.cache/images)")
+    parser.add_argument("--precompress", action="store_true",
+                        help="write a .gz next to every HTML, CSS and other text file in the output")
+    parser.add_argument("--gzip-level", type=int, default=DEFAULT_LEVEL, choices=range(1, 10), metavar="1-9",
+                        help=f"compression level for --precompress (default: {DEFAULT_LEVEL})")
+    parser.add_argument("--gzip-min-size", type=int, default=DEFAULT_MIN_SIZE,
+                        help=f"don't precompress files smaller than this many bytes (default: {DEFAULT_MIN_SIZE})")
+    parser.add_argument("--shard", type=shard_argument, metavar="INDEX/COUNT",
+                        help="build only the pages that hash to shard INDEX of COUNT (static files go to "
+                             "shard 0) into project/.cache/shards/INDEX; combine the shards with merge.py")
+    parser.add_argument("--output", default=None,
+                        help="directory to build into (default: docs/, or the shard's directory with --shard)")
+    parser.add_argument("--search", action="store_true",
+                        help="write a client-side search index under search/, sharded by term prefix")
+    parser.add_argument("--site-url", metavar="URL",
+                        help="the deployed site's origin (e.g. https://user.github.io); writes sitemap.xml "
+                             "and an Atom feed.xml for each top-level section")
+    parser.add_argument("--strict-links", action="store_true",
+                        help="exit with status 1 if a page links to a page or image the site doesn't have")
+    parser.add_argument("--explain", action="store_true",
+                        help="say why each page is rebuilt (source, template or basepath change, new page, "
+                             "or a link to a page that was added or removed)")
+    parser.add_argument("--static-hash", action="store_true",
+                        help="compare static files by content hash when their mtime differs")
+    parser.add_argument("--static-link", action="store_true",
+                        help="hardlink static files into the output instead of copying them")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of worker processes used to generate pages (default: 1)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap reading, parsing and writing pages on one process (ignored with -j; not with --profile)")
+    parser.add_argument("--watch", action="store_true",
+                        help="after building, rebuild on changes and serve the site with live reload")
+    parser.add_argument("--daemon", action="store_true",
+                        help="after building, stay resident and rebuild on requests from client.py")
+    parser.add_argument("--socket", default=None,
+                        help="Unix socket for --daemon (default: project/.cache/build.sock)")
+    parser.add_argument("--port", type=int, default=8888,
+                        help="port for the --watch dev server (default: 8888)")
+    parser.add_argument("--no-parse-cache", action="store_true",
+                        help="always parse markdown instead of reusing trees cached by earlier builds")
+    parser.add_argument("--parse-cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="evict the least recently used parsed pages beyond this many MiB (default: 64)")
+    parser.add_argument("--block-memo-size", type=int, default=DEFAULT_BLOCK_MEMO_BYTES // (1024 * 1024),
+                        help="MiB of rendered blocks to reuse across pages, 0 to turn it off (default: 16)")
+    parser.add_argument("--profile", action="store_true",
+                        help="time every page and build stage, print the slowest pages and write a trace")
+    parser.add_argument("--profile-trace", default="build-trace.json",
+                        help="where --profile writes its Chrome trace-event JSON (default: build-trace.json)")
+    parser.add_argument("--profile-pages", type=int, default=10,
+                        help="how many of the slowest pages --profile prints (default: 10)")
+    parser.add_argument("--cprofile", metavar="PATH",
+                        help="also run the build under cProfile and dump its stats to PATH")
+    args = parser.parse_args(argv)
+    if args.shard is not None:
+        if args.watch or args.daemon:
+            parser.error("--shard builds once; it can't be combined with --watch or --daemon")
+        if args.fingerprint:
+            # Pages in every shard would need the asset names only the static shard knows
+            parser.error("--shard can't be combined with --fingerprint")
+    if args.profile and args.pipeline:
+        # The pipeline's stages run interleaved on several threads, so its pages can't be timed
+        # stage by stage like generate_page_profiled does
+        parser.error("--profile can't be combined with --pipeline")
+    if args.output is None:
+        args.output = dir_path_public if args.shard is None else os.path.join(DEFAULT_SHARD_ROOT, str(args.shard[0]))
+    return args
+
+
 def main():
-    print("Deleting public directory..")
-    if os.path.exists(dir_path_public):
-        shutil.rmtree(dir_path_public)
+    args = parse_args(sys.argv[1:])
+    basepath = args.basepath
+
+    profiler = enable_profiling() if args.profile else None
+    configure_block_memo(args.block_memo_size * 1024 * 1024)
+    configure_minify(args.minify)
+    if args.cprofile:
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+
+    page_stats = build(args, basepath, profiler)
+
+    if args.cprofile:
+        cprofiler.disable()
+        cprofiler.dump_stats(args.cprofile)
+        print(f"cProfile stats written to {args.cprofile}")
+    if profiler is not None:
+        print(profiler.report(args.profile_pages))
+        profiler.write_chrome_trace(args.profile_trace)
+        print(f"Trace written to {args.profile_trace}")
+        disable_profiling()
+
+    if args.strict_links and page_stats.get("broken_links"):
+        sys.exit(1)
+    if args.watch:
+        # Imported here so a plain build doesn't pay for the server and watcher modules
+        from watch import watch
+        watch(dir_path_content, dir_path_static, template_path, args.output, basepath, args.port,
+              minify=args.minify, fingerprint=args.fingerprint,
+              image_cache_dir=dir_path_image_cache if args.optimize_images else None, search=args.search,
+              site_url=args.site_url, precompress=args.precompress, gzip_level=args.gzip_level, gzip_min_size=args.gzip_min_size)
+    elif args.daemon:
+        from daemon import DEFAULT_SOCKET_PATH, SiteState, serve
+        state = SiteState(dir_path_content, dir_path_static, template_path, args.output, basepath,
+                          minify=args.minify, fingerprint=args.fingerprint,
+                          image_cache_dir=dir_path_image_cache if args.optimize_images else None,
+                          search=args.search, site_url=args.site_url, precompress=args.precompress,
+                          gzip_level=args.gzip_level, gzip_min_size=args.gzip_min_size,
+                          parse_cache=make_parse_cache(args))
+        # The build above is the daemon's first; requests start from it
+        state.seed()
+        serve(state, args.socket or DEFAULT_SOCKET_PATH)
+
 
-    print("Copying static files to public directory...")
-    copy_files_recursive(dir_path_static, dir_path_public)
+def make_parse_cache(args):
+    if args.no_parse_cache:
+        return None
+    return ParseCache(dir_path_parse_cache, args.parse_cache_size * 1024 * 1024)
+
+
+def build(args, basepath, profiler=None):
+    def phase(name):
+        return profiler.span(name) if profiler is not None else contextlib.nullcontext()
+
+    if args.incremental:
+        print("Incremental build: keeping public directory..")
+    else:
+        print("Deleting public directory..")
+        if os.path.exists(args.output):
+            shutil.rmtree(args.output)
+
+    # Files are compressed in the background as soon as they are written
+    precompressor = None
+    on_written = None
+    if args.precompress:
+        precompressor = Precompressor(args.gzip_level, args.gzip_min_size)
+        on_written = precompressor.submit
+
+    if args.shard is None or args.shard[0] == STATIC_SHARD:
+        print("Syncing static files to public directory...")
+        with phase("static_copy"):
+            static_stats = sync_static_files(
+                dir_path_static,
+                args.output,
+                use_hash=args.static_hash,
+                link=args.static_link,
+                on_written=on_written,
+                minify=args.minify,
+                fingerprint=args.fingerprint,
+                png_optimizer=PNGOptimizer(dir_path_image_cache) if args.optimize_images else None,
+            )
+        # Pages link to whatever names the assets were just given
+        configure_assets(static_stats["assets"])
+
+    # A shard builds the pages whose source path hashes to it
+    all_pages = pages = None
+    if args.shard is not None:
+        all_pages = collect_pages(dir_path_content, args.output)
+        pages = shard_pages(all_pages, dir_path_content, *args.shard)
+        print(f"Shard {args.shard[0]} of {args.shard[1]}: {len(pages)} of {len(all_pages)} pages")
+
+    parse_cache = make_parse_cache(args)
 
     print("Generating pages recursively...")
-    generate_pages_recursive(
-        dir_path_content,  # The content directory to crawl
-        template_path,     # The template to use
-        dir_path_public,   # The destination directory
-        basepath           #
-    )
-
-main()
+    with phase("pages"):
+        page_stats = generate_pages_recursive(
+            dir_path_content,  # The content directory to crawl
+            template_path,     # The template to use
+            args.output,       # The destination directory
+            basepath,          # URL prefix for absolute links
+            incremental=args.incremental,
+            jobs=args.jobs,
+            parse_cache=parse_cache,
+            pipeline=args.pipeline,
+            explain=args.explain,
+            pages=pages,
+            on_written=on_written,
+            search=args.search,
+            site_url=args.site_url,
+            # A shard only knows its own pages; links are checked and the search index and
+            # sitemap are written once the shards are merged
+            partial=args.shard is not None,
+        )
+    if args.shard is not None:
+        save_shard_record(
+            args.output, make_shard_record(*args.shard, all_pages, pages, dir_path_content, args.output)
+        )
+
+    if precompressor is not None:
+        with phase("precompress"):
+            precompressor.submit_tree(args.output)
+            precompressor.finish()
+    else:
+        # An incremental build keeps the .gz files of an earlier --precompress build, now stale
+        remove_precompressed(args.output)
+    return page_stats
+
+
+if __name__ == "__main__":
+    main()
 
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+
+MANIFEST_FILENAME = ".build-manifest.json"
+STATIC_MANIFEST_FILENAME = ".static-manifest.json"
+DEPENDENCY_GRAPH_FILENAME = ".dependency-graph.json"
+# What one shard of a sharded build covered, for the merge to check
+SHARD_RECORD_FILENAME = ".shard.json"
+# Every page's words, so the search index can be updated from the pages that changed
+SEARCH_MANIFEST_FILENAME = ".search-manifest.json"
+# Every page's dates and the sitemap and feed files written from them
+SITEMAP_MANIFEST_FILENAME = ".sitemap-manifest.json"
+# The .gz siblings written by --precompress, so a build without it can remove them
+PRECOMPRESS_MANIFEST_FILENAME = ".precompress-manifest.json"
+# Published with the site (no leading dot), for servers and deploy tools that need the names
+ASSET_MANIFEST_FILENAME = "asset-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    # Hash in chunks so large sources don't have to be held in memory twice
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(dest_dir_path):
+    return _read_manifest(os.path.join(dest_dir_path, MANIFEST_FILENAME), "pages")
+
+
+def save_manifest(dest_dir_path, pages):
+    _write_manifest(os.path.join(dest_dir_path, MANIFEST_FILENAME), "pages", pages)
+
+
+def load_static_manifest(dest_dir_path):
+    return _read_manifest(os.path.join(dest_dir_path, STATIC_MANIFEST_FILENAME), "files")
+
+
+def save_static_manifest(dest_dir_path, files):
+    _write_manifest(os.path.join(dest_dir_path, STATIC_MANIFEST_FILENAME), "files", files)
+
+
+def load_dependency_graph(dest_dir_path):
+    return _read_manifest(os.path.join(dest_dir_path, DEPENDENCY_GRAPH_FILENAME), "pages")
+
+
+def save_dependency_graph(dest_dir_path, pages):
+    _write_manifest(os.path.join(dest_dir_path, DEPENDENCY_GRAPH_FILENAME), "pages", pages)
+
+
+def load_asset_manifest(dest_dir_path):
+    return _read_manifest(os.path.join(dest_dir_path, ASSET_MANIFEST_FILENAME), "assets")
+
+
+def save_asset_manifest(dest_dir_path, assets):
+    _write_manifest(os.path.join(dest_dir_path, ASSET_MANIFEST_FILENAME), "assets", assets)
+
+
+def load_shard_record(dest_dir_path):
+    return _read_manifest(os.path.join(dest_dir_path, SHARD_RECORD_FILENAME), "shard")
+
+
+def save_shard_record(dest_dir_path, record):
+    _write_manifest(os.path.join(dest_dir_path, SHARD_RECORD_FILENAME), "shard", record)
+
+
+def load_search_manifest(dest_dir_path):
+    return _read_manifest(os.path.join(dest_dir_path, SEARCH_MANIFEST_FILENAME), "pages")
+
+
+def save_search_manifest(dest_dir_path, pages):
+    _write_manifest(os.path.join(dest_dir_path, SEARCH_MANIFEST_FILENAME), "pages", pages)
+
+
+def load_sitemap_manifest(dest_dir_path):
+    return _read_manifest(os.path.join(dest_dir_path, SITEMAP_MANIFEST_FILENAME), "sitemap")
+
+
+def save_sitemap_manifest(dest_dir_path, sitemap):
+    _write_manifest(os.path.join(dest_dir_path, SITEMAP_MANIFEST_FILENAME), "sitemap", sitemap)
+
+
+def load_precompress_manifest(dest_dir_path):
+    return _read_manifest(os.path.join(dest_dir_path, PRECOMPRESS_MANIFEST_FILENAME), "files")
+
+
+def save_precompress_manifest(dest_dir_path, files):
+    _write_manifest(os.path.join(dest_dir_path, PRECOMPRESS_MANIFEST_FILENAME), "files", files)
+
+
+def _read_manifest(manifest_path, key):
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        # A corrupt manifest just means a full rebuild
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get(key, {})
+
+
+def _write_manifest(manifest_path, key, entries):
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    # Write to a temporary file first so an interrupted build never leaves a half-written manifest
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"version": MANIFEST_VERSION, key: entries}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def make_entry(source_rel_path, source_hash, template_hash, basepath):
+    return {
+        "source": source_rel_path,
+        "source_hash": source_hash,
+        "template_hash": template_hash,
+        "basepath": basepath,
+    }
+
+
+def explain_rebuild(old_entry, new_entry, dest_path):
+    # Why a page has to be rebuilt, or None if it is current: a page can be skipped only if
+    # all of its inputs match and the output is still on disk
+    if old_entry is None:
+        return "new page"
+    if old_entry.get("source") != new_entry["source"]:
+        return "source moved"
+    if old_entry.get("source_hash") != new_entry["source_hash"]:
+        return "source changed"
+    if old_entry.get("template_hash") != new_entry["template_hash"]:
+        return "template changed"
+    if old_entry.get("basepath") != new_entry["basepath"]:
+        return "basepath changed"
+    if old_entry != new_entry:
+        return "build settings changed"
+    if not os.path.exists(dest_path):
+        return "output missing"
+    return None
+
+
+def remove_stale_outputs(dest_dir_path, old_outputs, current_outputs):
+    # Delete outputs recorded by the previous build that this build no longer produces
+    removed = 0
+    for dest_rel_path in old_outputs:
+        if dest_rel_path in current_outputs:
+            continue
+        dest_path = os.path.join(dest_dir_path, dest_rel_path)
+        if os.path.exists(dest_path):
+            print(f"Removing stale output {dest_rel_path}")
+            os.remove(dest_path)
+            removed += 1
+        # Prune directories that became empty, but never the output root itself
+        parent = os.path.dirname(dest_path)
+        while os.path.abspath(parent) != os.path.abspath(dest_dir_path):
+            if not os.path.isdir(parent) or os.listdir(parent):
+                break
+            os.rmdir(parent)
+            parent = os.path.dirname(parent)
+    return removed
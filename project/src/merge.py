@@ -0,0 +1,39 @@
+import argparse
+import os
+import sys
+
+from shard import DEFAULT_SHARD_ROOT, merge_shards
+
+# The site's output directory, as in main.py
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "docs")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Combine the outputs of a sharded build (main.py --shard) into docs/")
+    parser.add_argument("shards", nargs="*",
+                        help="shard output directories (default: every directory in project/.cache/shards)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT,
+                        help="directory to merge into (default: docs/)")
+    parser.add_argument("--strict-links", action="store_true",
+                        help="exit with status 1 if a page links to a page or image the site doesn't have")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    shard_dirs = args.shards
+    if not shard_dirs and os.path.isdir(DEFAULT_SHARD_ROOT):
+        shard_dirs = [
+            os.path.join(DEFAULT_SHARD_ROOT, name) for name in sorted(os.listdir(DEFAULT_SHARD_ROOT))
+            if os.path.isdir(os.path.join(DEFAULT_SHARD_ROOT, name))
+        ]
+    try:
+        stats = merge_shards(shard_dirs, args.output)
+    except ValueError as e:
+        print(f"Merge failed: {e}", file=sys.stderr)
+        return 1
+    return 1 if args.strict_links and stats["broken_links"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
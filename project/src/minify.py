@@ -0,0 +1,124 @@
+import re
+
+# HTML's own whitespace; other Unicode spaces (such as &nbsp; typed literally) are content
+WHITESPACE_RUN = re.compile(r"[ \t\n\r\f]{2,}|[\t\n\r\f]")
+MARKUP_TOKEN = re.compile(r"<!--.*?-->|<[^<>]*>|<[^<>]*$|[^<]+|<", re.S)
+TAG_NAME = re.compile(r"</?([^\s/>]+)")
+
+# Whitespace next to these tags never renders, so the minifier drops it instead of keeping a space
+BLOCK_ELEMENTS = frozenset((
+    "!doctype", "html", "head", "body", "title", "meta", "link", "base", "script", "style", "noscript",
+    "article", "aside", "footer", "header", "main", "nav", "section", "div", "p", "blockquote", "pre",
+    "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "dl", "dt", "dd", "figure", "figcaption",
+    "table", "caption", "thead", "tbody", "tfoot", "tr", "th", "td", "form", "fieldset", "hr", "br",
+    "address", "details", "summary",
+))
+# Content of these elements is written exactly as it is
+PRESERVED_ELEMENTS = frozenset(("pre", "textarea", "script", "style"))
+
+CSS_TOKEN = re.compile(
+    r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\''
+    r"|/\*.*?\*/"
+    r"|url\([^)]*\)"
+    r"|[ \t\n\r\f]+"
+    r"|[{};,:>()!]"
+    r"|[^\"'/ \t\n\r\f{};,:>()!]+"
+    r"|.",
+    re.S | re.I,
+)
+# No space is needed after or before these in CSS
+CSS_NO_SPACE_AFTER = frozenset("{};,:>(")
+CSS_NO_SPACE_BEFORE = frozenset("{};,>)!")
+
+
+def collapse_whitespace(text):
+    return WHITESPACE_RUN.sub(" ", text)
+
+
+class Minifier:
+    # Handed to the serializer in minify mode: compacts text as it is written and
+    # counts the characters that saved (whitespace and tags are ASCII, so also bytes)
+    __slots__ = ("saved",)
+
+    def __init__(self):
+        self.saved = 0
+
+    def text(self, text):
+        compact = WHITESPACE_RUN.sub(" ", text)
+        self.saved += len(text) - len(compact)
+        return compact
+
+
+def tag_name(tag):
+    match = TAG_NAME.match(tag)
+    return match.group(1).lower() if match else None
+
+
+def minify_markup(text):
+    # Compact hand-written HTML, such as a template's static text: whitespace next to block-level
+    # tags goes, other runs of whitespace become one space, and tags, comments and the content
+    # of pre, textarea, script and style are kept as they are. Runs once per compiled template.
+    tokens = [match.group(0) for match in MARKUP_TOKEN.finditer(text)]
+    output = []
+    preserved = None
+    for i, token in enumerate(tokens):
+        if token.startswith("<"):
+            name = tag_name(token)
+            if preserved is None and name in PRESERVED_ELEMENTS:
+                preserved = name
+            elif preserved is not None and token.startswith("</") and name == preserved:
+                preserved = None
+            output.append(token)
+            continue
+        if preserved is not None:
+            output.append(token)
+            continue
+        before = tag_name(tokens[i - 1]) if i > 0 else None
+        after = tag_name(tokens[i + 1]) if i + 1 < len(tokens) else None
+        token = collapse_whitespace(token)
+        if before in BLOCK_ELEMENTS:
+            token = token.lstrip(" ")
+        if after in BLOCK_ELEMENTS:
+            token = token.rstrip(" ")
+        output.append(token)
+    return "".join(output)
+
+
+def minify_css(text):
+    # Drop comments (except /*! ones, which usually carry a license) and every space CSS
+    # doesn't need. Strings and url() are kept as they are.
+    output = []
+    pending_space = False
+    for match in CSS_TOKEN.finditer(text):
+        token = match.group(0)
+        if token.isspace() or (token.startswith("/*") and not token.startswith("/*!")):
+            pending_space = True
+            continue
+        if pending_space:
+            pending_space = False
+            previous = output[-1] if output else ""
+            if (previous and previous[-1] not in CSS_NO_SPACE_AFTER and not previous.endswith("*/")
+                    and token[0] not in CSS_NO_SPACE_BEFORE):
+                output.append(" ")
+        if token == "}" and output and output[-1] == ";":
+            # The last declaration in a block needs no semicolon
+            output.pop()
+        output.append(token)
+    return "".join(output)
+
+
+# Minifiers for static files, by extension
+STATIC_MINIFIERS = {".css": minify_css}
+
+
+def add_savings(savings, file_type, saved):
+    entry = savings.setdefault(file_type, {"files": 0, "bytes_saved": 0})
+    entry["files"] += 1
+    entry["bytes_saved"] += saved
+
+
+def format_savings(savings):
+    return ", ".join(
+        f"{file_type} saved {entry['bytes_saved']} bytes in {entry['files']} files"
+        for file_type, entry in sorted(savings.items())
+    )
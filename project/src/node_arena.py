@@ -0,0 +1,91 @@
+from array import array
+
+from htmlnode import LeafNode, ParentNode
+
+# first_child value marking a leaf
+NO_CHILDREN = -1
+
+
+class NodeArena:
+    # A flat, array-backed HTML tree for holding many parsed pages at once: one entry per
+    # node in parallel lists instead of one object per node. Nodes are stored breadth first,
+    # so the children of a node are the child_count entries starting at first_child.
+    def __init__(self):
+        self.tags = []
+        self.values = []
+        self.props = []
+        self.first_child = array("i")
+        self.child_count = array("i")
+
+    def __len__(self):
+        return len(self.tags)
+
+    def add(self, node):
+        # Append node's whole subtree and return the index of its root
+        root = len(self.tags)
+        self._append(node)
+        position = root
+        pending = [node]
+        while position < len(self.tags):
+            current = pending[position - root]
+            if isinstance(current, ParentNode):
+                if current.children is None:
+                    raise ValueError("invalid HTML: no children")
+                self.first_child[position] = len(self.tags)
+                self.child_count[position] = len(current.children)
+                for child in current.children:
+                    self._append(child)
+                    pending.append(child)
+            position += 1
+        return root
+
+    def _append(self, node):
+        if not isinstance(node, (LeafNode, ParentNode)):
+            raise ValueError(f"invalid node for arena: {node!r}")
+        self.tags.append(node.tag)
+        self.values.append(node.value)
+        # Most nodes have no attributes; keep None rather than an empty dict
+        self.props.append(dict(node.props) if node.props else None)
+        self.first_child.append(NO_CHILDREN)
+        self.child_count.append(0)
+
+    def children(self, index):
+        start = self.first_child[index]
+        if start == NO_CHILDREN:
+            return range(0)
+        return range(start, start + self.child_count[index])
+
+    def is_leaf(self, index):
+        return self.first_child[index] == NO_CHILDREN
+
+    def to_html(self, index=0):
+        fragments = []
+        self._serialize(index, fragments)
+        return "".join(fragments)
+
+    def _serialize(self, index, fragments):
+        # Mirrors ParentNode.serialize, so an arena renders exactly like the tree it came from
+        tag = self.tags[index]
+        props = self.props[index]
+        props_html = "".join(f' {key}="{value}"' for key, value in props.items()) if props else ""
+        if self.is_leaf(index):
+            value = self.values[index]
+            if value is None:
+                raise ValueError("invalid HTML: no value")
+            if tag is None:
+                fragments.append(value)
+            else:
+                fragments.append(f"<{tag}{props_html}>{value}</{tag}>")
+            return
+        fragments.append(f"<{tag}{props_html}>")
+        for child in self.children(index):
+            self._serialize(child, fragments)
+        fragments.append(f"</{tag}>")
+
+    def to_html_node(self, index=0):
+        # Rebuild an ordinary node tree, e.g. to hand a page back to the template
+        props = self.props[index]
+        if self.is_leaf(index):
+            return LeafNode(self.tags[index], self.values[index], props)
+        children = [self.to_html_node(child) for child in self.children(index)]
+        return ParentNode(self.tags[index], children, props)
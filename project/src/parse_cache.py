@@ -0,0 +1,162 @@
+import marshal
+import os
+import sys
+from collections import OrderedDict
+
+from htmlnode import LeafNode, ParentNode, RawHTML
+from manifest import hash_bytes
+
+# Bump whenever parsing changes what tree or references a given source produces, so stale entries are never loaded.
+# marshal's format can change between Python versions, so that is part of the key too.
+PARSER_VERSION = 5
+CACHE_KEY_PREFIX = f"parser-{PARSER_VERSION}-py{sys.version_info[0]}.{sys.version_info[1]}:".encode()
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+ENTRY_SUFFIX = ".ast"
+MINIFIED_KEY_PREFIX = b"minified:"
+
+
+def encode_tree(node):
+    # Nested tuples that marshal can store: (tag, value, props) for a leaf, (value, saved)
+    # for raw HTML, and (tag, props, children) inside a 1-tuple wrapper for a parent
+    if isinstance(node, ParentNode):
+        return ((node.tag, dict(node.props) if node.props else None,
+                 tuple(encode_tree(child) for child in node.children)),)
+    if isinstance(node, RawHTML):
+        return (node.value, node.saved)
+    if isinstance(node, LeafNode):
+        return (node.tag, node.value, dict(node.props) if node.props else None)
+    raise ValueError(f"invalid node for parse cache: {node!r}")
+
+
+def decode_tree(data):
+    if len(data) == 1:
+        tag, props, children = data[0]
+        return ParentNode(tag, [decode_tree(child) for child in children], props)
+    if len(data) == 2:
+        return RawHTML(*data)
+    tag, value, props = data
+    return LeafNode(tag, value, props)
+
+
+def cache_key(source_hash, minify=False):
+    # Keyed on the source's content hash (the build manifest's source_hash), so a lookup
+    # never has to read or hash the source again. Memoized blocks are stored in the tree
+    # already serialized, so minified and plain builds can't share entries.
+    return hash_bytes(CACHE_KEY_PREFIX + (MINIFIED_KEY_PREFIX if minify else b"") + source_hash.encode())
+
+
+class ParseCache:
+    # Parsed pages on disk, one file per source content hash. Only the path and the size
+    # limit are state, so the cache can be handed to pool workers as an argument.
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def key(self, source_hash, minify=False):
+        return cache_key(source_hash, minify)
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+    def load(self, key):
+        # Returns (variables, title, html_node, references, words), or None on a miss
+        path = self.entry_path(key)
+        try:
+            # marshal.load on a file object reads in tiny pieces; loading from bytes is much faster
+            with open(path, 'rb') as f:
+                variables, title, tree, references, words = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            # Missing, truncated or written by something else: parse again
+            return None
+        # Refresh the mtime so eviction drops the least recently used entries first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return variables, title, decode_tree(tree), list(references), words
+
+    def store(self, key, variables, title, html_node, references, words):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.entry_path(key)
+        # Written under a per-process name and renamed, since pool workers may store the same entry
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                marshal.dump((variables, title, encode_tree(html_node), tuple(references), words), f)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def prune(self):
+        # Evict least recently used entries until the cache fits in max_bytes; returns how many
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        entries = []
+        total = 0
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            evicted += 1
+        return evicted
+
+
+class MemoryParseCache:
+    # Same interface as ParseCache, for a long-running process: trees stay in memory as they are.
+    # Holds at most max_entries pages, dropping the least recently used. With a backing
+    # ParseCache, misses are looked up there and new entries written through to it, so the
+    # process starts from what earlier builds parsed and leaves its trees for later ones.
+    def __init__(self, max_entries=10000, backing=None):
+        self.max_entries = max_entries
+        self.backing = backing
+        self.entries = OrderedDict()
+
+    def key(self, source_hash, minify=False):
+        return cache_key(source_hash, minify)
+
+    def load(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            if self.backing is None:
+                return None
+            loaded = self.backing.load(key)
+            if loaded is None:
+                return None
+            self.remember(key, *loaded)
+            return loaded
+        self.entries.move_to_end(key)
+        variables, title, html_node, references, words = entry
+        # Callers add to the variables, so they get a copy; the tree itself is never modified
+        return dict(variables), title, html_node, list(references), words
+
+    def remember(self, key, variables, title, html_node, references, words):
+        self.entries[key] = (dict(variables), title, html_node, tuple(references), words)
+        self.entries.move_to_end(key)
+
+    def store(self, key, variables, title, html_node, references, words):
+        self.remember(key, variables, title, html_node, references, words)
+        if self.backing is not None:
+            self.backing.store(key, variables, title, html_node, references, words)
+
+    def prune(self):
+        evicted = 0
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            evicted += 1
+        if self.backing is not None:
+            evicted += self.backing.prune()
+        return evicted
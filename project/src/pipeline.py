@@ -0,0 +1,114 @@
+import queue
+import threading
+import time
+
+# Marks the end of a stage's input
+DONE = object()
+
+
+class StageClock:
+    # Busy time per stage, summed over all of the stage's threads
+    def __init__(self, stages):
+        self.busy = dict.fromkeys(stages, 0.0)
+        self.lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self.lock:
+            self.busy[stage] += seconds
+
+
+def run_pipeline(items, read, process, write, readers=2, writers=2, queue_size=8):
+    # Three stages joined by bounded queues, so at most queue_size items wait between two stages:
+    #   read(item) -> data          on `readers` threads, e.g. loading a file
+    #   process(item, data) -> (output, result)   on the calling thread
+    #   write(item, output)         on `writers` threads
+    # Returns the results in processing order and the utilization of each stage, i.e. the
+    # fraction of the wall time its threads spent working rather than waiting.
+    # The first exception raised by any stage is re-raised once the pipeline has drained.
+    work = queue.Queue()
+    for item in items:
+        work.put(item)
+    read_queue = queue.Queue(queue_size)
+    write_queue = queue.Queue(queue_size)
+    clock = StageClock(("read", "process", "write"))
+    errors = []
+    failed = threading.Event()
+
+    def reader():
+        while not failed.is_set():
+            try:
+                item = work.get_nowait()
+            except queue.Empty:
+                break
+            start = time.perf_counter()
+            try:
+                data = read(item)
+            except Exception as e:
+                errors.append(e)
+                failed.set()
+                break
+            finally:
+                clock.add("read", time.perf_counter() - start)
+            read_queue.put((item, data))
+        read_queue.put(DONE)
+
+    def writer():
+        while True:
+            entry = write_queue.get()
+            if entry is DONE:
+                return
+            if failed.is_set():
+                # Keep draining so the processing thread never blocks on a full queue
+                continue
+            item, output = entry
+            start = time.perf_counter()
+            try:
+                write(item, output)
+            except Exception as e:
+                errors.append(e)
+                failed.set()
+            finally:
+                clock.add("write", time.perf_counter() - start)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=reader, daemon=True) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, daemon=True) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+
+    results = []
+    readers_done = 0
+    while readers_done < readers:
+        entry = read_queue.get()
+        if entry is DONE:
+            readers_done += 1
+            continue
+        if failed.is_set():
+            continue
+        item, data = entry
+        start = time.perf_counter()
+        try:
+            output, result = process(item, data)
+        except Exception as e:
+            errors.append(e)
+            failed.set()
+            continue
+        finally:
+            clock.add("process", time.perf_counter() - start)
+        results.append(result)
+        write_queue.put((item, output))
+
+    for _ in range(writers):
+        write_queue.put(DONE)
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    if errors:
+        raise errors[0]
+    thread_counts = {"read": readers, "process": 1, "write": writers}
+    utilization = {
+        stage: busy / (wall * thread_counts[stage]) if wall else 0.0
+        for stage, busy in clock.busy.items()
+    }
+    return results, utilization
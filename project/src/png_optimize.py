@@ -0,0 +1,275 @@
+import os
+import struct
+import threading
+import zlib
+
+from manifest import hash_bytes
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Bump whenever optimize_png can produce different output for the same input
+OPTIMIZER_VERSION = 1
+# Ancillary chunks that change how the image looks are kept. Everything else that isn't
+# critical (text, EXIF, timestamps, physical size, editors' private chunks) is dropped.
+KEPT_ANCILLARY_CHUNKS = frozenset((b"tRNS", b"gAMA", b"cHRM", b"sRGB", b"iCCP", b"sBIT", b"cICP"))
+# Animated PNGs keep their frames in chunks of their own; they are left alone
+ANIMATION_CHUNKS = frozenset((b"acTL", b"fcTL", b"fdAT"))
+CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+# zlib's largest window and memory settings, for the best ratio rather than speed
+ZLIB_LEVEL = 9
+ZLIB_MEM_LEVEL = 9
+ZLIB_STRATEGIES = (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED)
+IDAT_CHUNK_SIZE = 1 << 20
+# |x| for a filtered byte read as a signed value, for the minimum sum of absolute differences heuristic
+SIGNED_ABS = bytes(min(value, 256 - value) for value in range(256))
+
+
+def read_chunks(data):
+    # Returns [(type, body)], checking the signature, lengths and CRCs
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("not a PNG file")
+    chunks = []
+    position = len(PNG_SIGNATURE)
+    while position < len(data):
+        if position + 12 > len(data):
+            raise ValueError("truncated PNG chunk")
+        length, chunk_type = struct.unpack(">I4s", data[position:position + 8])
+        body = data[position + 8:position + 8 + length]
+        if len(body) != length or position + 12 + length > len(data):
+            raise ValueError("truncated PNG chunk")
+        (crc,) = struct.unpack(">I", data[position + 8 + length:position + 12 + length])
+        if zlib.crc32(chunk_type + body) != crc:
+            raise ValueError(f"bad CRC in {chunk_type!r} chunk")
+        chunks.append((chunk_type, body))
+        position += 12 + length
+        if chunk_type == b"IEND":
+            break
+    if not chunks or chunks[0][0] != b"IHDR" or chunks[-1][0] != b"IEND":
+        raise ValueError("PNG must start with IHDR and end with IEND")
+    return chunks
+
+
+def chunk_bytes(chunk_type, body):
+    return struct.pack(">I4s", len(body), chunk_type) + body + struct.pack(">I", zlib.crc32(chunk_type + body))
+
+
+# Byte-wise arithmetic on whole rows: a row is read as one big integer and the high bit of
+# every byte is handled apart, so no carry crosses into the neighbouring byte
+
+def row_masks(row_length):
+    return int.from_bytes(b"\x80" * row_length, "big"), int.from_bytes(b"\x7f" * row_length, "big")
+
+
+def add_bytes(a, b, high, low):
+    return ((a & low) + (b & low)) ^ ((a ^ b) & high)
+
+
+def subtract_bytes(a, b, high, low):
+    return ((a | high) - (b & low)) ^ ((a ^ b ^ high) & high)
+
+
+def average_bytes(a, b, low):
+    return (a & b) + (((a ^ b) >> 1) & low)
+
+
+def unfilter_rows(filtered, row_length, height, bpp):
+    # Undo the per-row filters of a non-interlaced image; returns the raw rows
+    high, low = row_masks(row_length)
+    rows = []
+    previous = bytes(row_length)
+    position = 0
+    for _ in range(height):
+        filter_type = filtered[position]
+        line = filtered[position + 1:position + 1 + row_length]
+        position += 1 + row_length
+        if len(line) != row_length:
+            raise ValueError("truncated image data")
+        if filter_type == 0:
+            row = bytes(line)
+        elif filter_type == 1:
+            # A prefix sum over pixels, done in log2(row_length) whole-row additions
+            value = int.from_bytes(line, "big")
+            step = bpp
+            while step < row_length:
+                value = add_bytes(value, value >> (8 * step), high, low)
+                step *= 2
+            row = value.to_bytes(row_length, "big")
+        elif filter_type == 2:
+            row = add_bytes(int.from_bytes(line, "big"), int.from_bytes(previous, "big"), high, low).to_bytes(
+                row_length, "big"
+            )
+        elif filter_type == 3:
+            out = bytearray(line)
+            for i in range(row_length):
+                left = out[i - bpp] if i >= bpp else 0
+                out[i] = (out[i] + ((left + previous[i]) >> 1)) & 0xff
+            row = bytes(out)
+        elif filter_type == 4:
+            out = bytearray(line)
+            for i in range(row_length):
+                if i >= bpp:
+                    a = out[i - bpp]
+                    c = previous[i - bpp]
+                else:
+                    a = c = 0
+                b = previous[i]
+                p = a + b - c
+                pa = abs(p - a)
+                pb = abs(p - b)
+                pc = abs(p - c)
+                if pa <= pb and pa <= pc:
+                    predictor = a
+                elif pb <= pc:
+                    predictor = b
+                else:
+                    predictor = c
+                out[i] = (out[i] + predictor) & 0xff
+            row = bytes(out)
+        else:
+            raise ValueError(f"invalid filter type {filter_type}")
+        rows.append(row)
+        previous = row
+    return rows
+
+
+def paeth_filter(row, previous, bpp):
+    out = bytearray(len(row))
+    for i in range(len(row)):
+        if i >= bpp:
+            a = row[i - bpp]
+            c = previous[i - bpp]
+        else:
+            a = c = 0
+        b = previous[i]
+        p = a + b - c
+        pa = abs(p - a)
+        pb = abs(p - b)
+        pc = abs(p - c)
+        if pa <= pb and pa <= pc:
+            predictor = a
+        elif pb <= pc:
+            predictor = b
+        else:
+            predictor = c
+        out[i] = (row[i] - predictor) & 0xff
+    return bytes(out)
+
+
+def filter_candidates(row, previous, bpp, high, low):
+    # The row under each of the five filter types
+    row_length = len(row)
+    value = int.from_bytes(row, "big")
+    above = int.from_bytes(previous, "big")
+    left = value >> (8 * bpp)
+    return (
+        row,
+        subtract_bytes(value, left, high, low).to_bytes(row_length, "big"),
+        subtract_bytes(value, above, high, low).to_bytes(row_length, "big"),
+        subtract_bytes(value, average_bytes(left, above, low), high, low).to_bytes(row_length, "big"),
+        paeth_filter(row, previous, bpp),
+    )
+
+
+def filter_rows(rows, bpp):
+    # Filtered streams to try: each filter type used for every row, and the usual adaptive
+    # choice of the filter with the smallest sum of absolute values per row
+    row_length = len(rows[0])
+    high, low = row_masks(row_length)
+    streams = [bytearray() for _ in range(6)]
+    previous = bytes(row_length)
+    for row in rows:
+        candidates = filter_candidates(row, previous, bpp, high, low)
+        for filter_type, line in enumerate(candidates):
+            streams[filter_type].append(filter_type)
+            streams[filter_type] += line
+        scores = [sum(line.translate(SIGNED_ABS)) for line in candidates]
+        best = scores.index(min(scores))
+        streams[5].append(best)
+        streams[5] += candidates[best]
+        previous = row
+    return [bytes(stream) for stream in streams]
+
+
+def compress(data, strategy):
+    compressor = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, 15, ZLIB_MEM_LEVEL, strategy)
+    return compressor.compress(data) + compressor.flush()
+
+
+def optimize_png(data):
+    # A losslessly smaller version of the PNG data, or data itself if nothing smaller was found
+    chunks = read_chunks(data)
+    if any(chunk_type in ANIMATION_CHUNKS for chunk_type, _ in chunks):
+        return data
+    header = chunks[0][1]
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", header)
+    if color_type not in CHANNELS:
+        raise ValueError(f"invalid PNG color type {color_type}")
+    filtered = zlib.decompress(b"".join(body for chunk_type, body in chunks if chunk_type == b"IDAT"))
+
+    candidates = [filtered]
+    if interlace == 0 and width and height:
+        # Refiltering an interlaced image would mean splitting it into its seven passes;
+        # those only get their existing filters recompressed
+        bits_per_pixel = CHANNELS[color_type] * bit_depth
+        bpp = max(1, bits_per_pixel // 8)
+        row_length = (width * bits_per_pixel + 7) // 8
+        rows = unfilter_rows(filtered, row_length, height, bpp)
+        candidates.extend(filter_rows(rows, bpp))
+    best = min(
+        (compress(candidate, strategy) for candidate in candidates for strategy in ZLIB_STRATEGIES),
+        key=len,
+    )
+
+    output = [PNG_SIGNATURE]
+    idat_written = False
+    for chunk_type, body in chunks:
+        if chunk_type == b"IDAT":
+            if not idat_written:
+                for start in range(0, len(best), IDAT_CHUNK_SIZE):
+                    output.append(chunk_bytes(b"IDAT", best[start:start + IDAT_CHUNK_SIZE]))
+                idat_written = True
+        elif chunk_type in (b"IHDR", b"PLTE", b"IEND") or chunk_type in KEPT_ANCILLARY_CHUNKS:
+            output.append(chunk_bytes(chunk_type, body))
+    optimized = b"".join(output)
+    return optimized if len(optimized) < len(data) else data
+
+
+class PNGOptimizer:
+    # optimize_png with its results kept on disk by source hash, so an image is only ever
+    # optimized once. An empty entry records that nothing smaller was found.
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.optimized = 0
+        self.cache_hits = 0
+        self.bytes_saved = 0
+        # optimize is called from the static copy's threads
+        self.lock = threading.Lock()
+
+    def entry_path(self, data):
+        key = hash_bytes(f"png-optimizer-{OPTIMIZER_VERSION}:".encode() + data)
+        return os.path.join(self.cache_dir, key + ".png")
+
+    def optimize(self, data):
+        path = self.entry_path(data)
+        try:
+            with open(path, 'rb') as f:
+                result = f.read() or data
+            with self.lock:
+                self.cache_hits += 1
+        except OSError:
+            try:
+                result = optimize_png(data)
+            except (ValueError, zlib.error) as e:
+                # Not something we can read: ship it as it is
+                print(f"Not optimizing PNG: {e}")
+                result = data
+            with self.lock:
+                self.optimized += 1
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Per thread: copy threads can optimize identical images at the same time
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(result if result is not data else b"")
+            os.replace(tmp_path, path)
+        with self.lock:
+            self.bytes_saved += len(data) - len(result)
+        return result
@@ -0,0 +1,128 @@
+import gzip
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from manifest import PRECOMPRESS_MANIFEST_FILENAME, load_precompress_manifest, save_precompress_manifest
+
+COMPRESSIBLE_EXTENSIONS = {".html", ".htm", ".css", ".js", ".mjs", ".json", ".xml", ".svg", ".txt", ".map"}
+DEFAULT_LEVEL = 9
+DEFAULT_MIN_SIZE = 1024
+GZ_SUFFIX = ".gz"
+
+
+def is_compressible(path):
+    # Text assets only, and never our own dotfiles such as the build manifests
+    filename = os.path.basename(path)
+    if filename.startswith("."):
+        return False
+    return os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def compress_file(path, level=DEFAULT_LEVEL, min_size=DEFAULT_MIN_SIZE):
+    # Write path + ".gz" unless it is already current; returns (outcome, bytes in, bytes out, CPU seconds)
+    # where outcome is "compressed", "small" or "current". A sibling is current when its mtime
+    # matches the file's, which compress_file sets after writing it.
+    gz_path = path + GZ_SUFFIX
+    stat = os.stat(path)
+    if stat.st_size < min_size:
+        # Too small to be worth it; a sibling from when the file was bigger would be stale
+        if os.path.exists(gz_path):
+            os.remove(gz_path)
+        return "small", 0, 0, 0.0
+    try:
+        if os.stat(gz_path).st_mtime_ns == stat.st_mtime_ns:
+            return "current", 0, 0, 0.0
+    except OSError:
+        pass
+
+    start = time.thread_time()
+    with open(path, 'rb') as f:
+        data = f.read()
+    # mtime=0 keeps the output byte-identical between builds
+    compressed = gzip.compress(data, compresslevel=level, mtime=0)
+    tmp_path = f"{gz_path}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_path, gz_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return "compressed", len(data), len(compressed), time.thread_time() - start
+
+
+class Precompressor:
+    # Compresses output files on a thread pool as they are handed over with submit().
+    # zlib releases the GIL while it compresses, so the threads really do run in parallel.
+    def __init__(self, level=DEFAULT_LEVEL, min_size=DEFAULT_MIN_SIZE, workers=None):
+        self.level = level
+        self.min_size = min_size
+        self.executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self.futures = {}
+        self.orphans_removed = 0
+        self.lock = threading.Lock()
+        # The output directory, once submit_tree has been given it
+        self.root = None
+
+    def submit(self, path):
+        # Safe to call from any thread; each path is compressed at most once
+        if not is_compressible(path):
+            return
+        with self.lock:
+            if path in self.futures:
+                return
+            self.futures[path] = self.executor.submit(compress_file, path, self.level, self.min_size)
+
+    def submit_tree(self, root):
+        # Catch everything not submitted as it was written (e.g. pages an incremental build
+        # skipped), and delete .gz files whose original is gone. finish() then records the
+        # .gz files of root in its manifest, for remove_precompressed.
+        self.root = root
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if filename.endswith(GZ_SUFFIX):
+                    original = path[:-len(GZ_SUFFIX)]
+                    if is_compressible(original) and not os.path.exists(original):
+                        os.remove(path)
+                        self.orphans_removed += 1
+                    continue
+                self.submit(path)
+
+    def finish(self):
+        # Wait for every file and return the stats
+        self.executor.shutdown(wait=True)
+        stats = {"compressed": 0, "current": 0, "small": 0, "orphans_removed": self.orphans_removed,
+                 "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0}
+        gz_files = []
+        for path, future in self.futures.items():
+            outcome, bytes_in, bytes_out, cpu_seconds = future.result()
+            if outcome != "small":
+                gz_files.append(path + GZ_SUFFIX)
+            stats[outcome] += 1
+            stats["bytes_in"] += bytes_in
+            stats["bytes_out"] += bytes_out
+            stats["cpu_seconds"] += cpu_seconds
+        stats["ratio"] = stats["bytes_out"] / stats["bytes_in"] if stats["bytes_in"] else 1.0
+        if self.root is not None:
+            save_precompress_manifest(self.root, sorted(os.path.relpath(path, self.root) for path in gz_files))
+
+        print(f"Precompressed {stats['compressed']} files ({stats['bytes_in']} -> {stats['bytes_out']} bytes, "
+              f"ratio {stats['ratio']:.2f}, {stats['cpu_seconds'] * 1000:.1f} ms CPU), "
+              f"skipped {stats['current']} up to date and {stats['small']} below {self.min_size} bytes")
+        return stats
+
+
+def remove_precompressed(root):
+    # For a build without --precompress: drop the .gz files an earlier one wrote, if it did
+    manifest_path = os.path.join(root, PRECOMPRESS_MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return
+    for rel_path in load_precompress_manifest(root):
+        path = os.path.join(root, rel_path)
+        if os.path.exists(path):
+            os.remove(path)
+    os.remove(manifest_path)
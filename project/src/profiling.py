@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PAGE_STAGES = ("read", "block_parse", "inline_parse", "render", "template", "write")
+
+# The active profiler for this process, or None when profiling is off
+_profiler = None
+
+
+def get_profiler():
+    return _profiler
+
+
+def enable_profiling():
+    global _profiler
+    _profiler = BuildProfiler()
+    return _profiler
+
+
+def disable_profiling():
+    global _profiler
+    profiler = _profiler
+    _profiler = None
+    return profiler
+
+
+class BuildProfiler:
+    def __init__(self):
+        # Trace events are (name, category, start, duration, pid, tid, args) with times in seconds
+        self.events = []
+        self.pages = {}
+        self.current_page = None
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, category="build", **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_event(name, category, start, time.perf_counter() - start, args)
+
+    @contextmanager
+    def page(self, path):
+        self.current_page = path
+        self.pages.setdefault(path, dict.fromkeys(PAGE_STAGES, 0.0))
+        try:
+            with self.span(path, "page"):
+                yield
+        finally:
+            self.current_page = None
+
+    @contextmanager
+    def stage(self, name):
+        # A stage of the current page: recorded both in the page table and as a trace event
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.add_time(name, duration)
+            self.add_event(name, "stage", start, duration, {})
+
+    def add_time(self, name, seconds):
+        if self.current_page is not None:
+            self.pages[self.current_page][name] += seconds
+
+    def add_event(self, name, category, start, duration, args):
+        with self.lock:
+            self.events.append(
+                (name, category, start, duration, os.getpid(), threading.get_ident(), args)
+            )
+
+    def merge(self, other_events, other_pages):
+        # Fold in what a worker process recorded
+        with self.lock:
+            self.events.extend(other_events)
+            self.pages.update(other_pages)
+
+    def slowest_pages(self, count=10):
+        totals = [(sum(stages.values()), path, stages) for path, stages in self.pages.items()]
+        totals.sort(key=lambda item: item[0], reverse=True)
+        return totals[:count]
+
+    def report(self, count=10):
+        lines = [f"Slowest {min(count, len(self.pages))} of {len(self.pages)} pages (ms):"]
+        header = "".join(f"{stage:>13}" for stage in PAGE_STAGES)
+        lines.append(f"{'total':>9}{header}  page")
+        for total, path, stages in self.slowest_pages(count):
+            row = "".join(f"{stages[stage] * 1000:>13.2f}" for stage in PAGE_STAGES)
+            lines.append(f"{total * 1000:>9.2f}{row}  {path}")
+        totals = dict.fromkeys(PAGE_STAGES, 0.0)
+        for stages in self.pages.values():
+            for stage in PAGE_STAGES:
+                totals[stage] += stages[stage]
+        lines.append("Totals per stage (ms): " + ", ".join(
+            f"{stage} {seconds * 1000:.1f}" for stage, seconds in totals.items()
+        ))
+        for name, category, _, duration, _, _, _ in self.events:
+            if category == "build":
+                lines.append(f"{name}: {duration * 1000:.1f} ms")
+        return "\n".join(lines)
+
+    def write_chrome_trace(self, path):
+        # Trace Event Format "complete" events, loadable in Perfetto or chrome://tracing
+        if not self.events:
+            origin = 0.0
+        else:
+            origin = min(event[2] for event in self.events)
+        trace_events = []
+        for name, category, start, duration, pid, tid, args in self.events:
+            trace_events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start - origin) * 1e6,
+                "dur": duration * 1e6,
+                "pid": pid,
+                "tid": tid,
+                "args": args,
+            })
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,178 @@
+import itertools
+import json
+import os
+import re
+import shutil
+
+from manifest import SEARCH_MANIFEST_FILENAME, load_search_manifest, save_search_manifest
+
+# Words are runs of letters and digits, lowercased; single characters are too common to be worth indexing
+WORD = re.compile(r"[^\W_]{2,}")
+
+# The index is published under search/ in the output:
+#   search/documents.json  {"version": 1, "shards": [...], "documents": [[url, title] or null, ...]}
+#   search/<shard>.json    {term: [doc gap, count, doc gap, count, ...]}
+# A term's postings are its documents in ascending ID order, each stored as the difference
+# from the previous ID (the first from 0) followed by how often the term occurs there.
+# Terms are sharded by their first two characters, so a client fetches documents.json and
+# then only the shards of the words in its query: "tolkien" is in search/to.json. Terms that
+# don't start with two ASCII letters or digits share search/_.json.
+SEARCH_DIR = "search"
+DOCUMENTS_FILENAME = "documents.json"
+SEARCH_INDEX_VERSION = 1
+SHARD_PREFIX_LENGTH = 2
+OTHER_SHARD = "_"
+
+
+def tokenize(text):
+    return WORD.findall(text.lower())
+
+
+def shard_key(term):
+    prefix = term[:SHARD_PREFIX_LENGTH]
+    return prefix if prefix.isascii() and prefix.isalnum() else OTHER_SHARD
+
+
+def page_url(dest_rel_path, basepath):
+    # blog/tom/index.html -> {basepath}blog/tom/
+    url = dest_rel_path.replace(os.sep, "/")
+    if url == "index.html" or url.endswith("/index.html"):
+        url = url[:-len("index.html")]
+    return basepath + url
+
+
+def encode_postings(postings):
+    # [(doc, count)] in ascending doc order -> [doc gap, count, doc gap, count, ...]
+    encoded = []
+    previous = 0
+    for doc, count in postings:
+        encoded += (doc - previous, count)
+        previous = doc
+    return encoded
+
+
+def decode_postings(encoded):
+    postings = []
+    doc = 0
+    for i in range(0, len(encoded), 2):
+        doc += encoded[i]
+        postings.append((doc, encoded[i + 1]))
+    return postings
+
+
+def dump_json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def write_text(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class SearchIndex:
+    # The search index of an output directory, kept as one manifest entry per page
+    # ({"doc", "url", "title", "words"}) so a build only has to supply the pages it rebuilt.
+    # Document IDs stay with their page, so shards are rewritten only when one of their
+    # terms gains, loses or changes a posting.
+    def __init__(self, dest_dir_path):
+        self.dest_dir_path = dest_dir_path
+        self.entries = load_search_manifest(dest_dir_path)
+
+    def __contains__(self, dest_rel_path):
+        return dest_rel_path in self.entries
+
+    def update(self, pages, documents, write_files=True):
+        # pages holds every page of the site, documents maps the ones rebuilt to
+        # {"url", "title", "words"}. Pages in neither are dropped. With write_files off only
+        # the manifest is saved, for a shard build whose index is written when it is merged.
+        old_entries = self.entries
+        for dest_rel_path, document in documents.items():
+            if document["words"] is None:
+                raise ValueError(f"no words were collected for {dest_rel_path}; "
+                                 "configure_word_collection must be on in the process that rendered it")
+        entries = {}
+        for dest_rel_path in pages:
+            if dest_rel_path in documents:
+                old_entry = old_entries.get(dest_rel_path)
+                entries[dest_rel_path] = dict(documents[dest_rel_path], doc=old_entry["doc"] if old_entry else None)
+            elif dest_rel_path in old_entries:
+                entries[dest_rel_path] = old_entries[dest_rel_path]
+
+        # New pages take the lowest IDs nobody holds, including those of removed pages
+        used = {entry["doc"] for entry in entries.values() if entry["doc"] is not None}
+        free_ids = (doc for doc in itertools.count() if doc not in used)
+        for dest_rel_path in sorted(entries):
+            if entries[dest_rel_path]["doc"] is None:
+                entries[dest_rel_path]["doc"] = next(free_ids)
+
+        # The shards of every term whose postings changed
+        dirty = set()
+        for dest_rel_path in old_entries.keys() | entries.keys():
+            before = old_entries.get(dest_rel_path)
+            after = entries.get(dest_rel_path)
+            if before is not None and after is not None and before["doc"] == after["doc"]:
+                before_words = before["words"]
+                after_words = after["words"]
+                dirty.update(
+                    shard_key(term) for term in before_words.keys() | after_words.keys()
+                    if before_words.get(term) != after_words.get(term)
+                )
+                continue
+            for entry in (before, after):
+                if entry is not None:
+                    dirty.update(shard_key(term) for term in entry["words"])
+
+        self.entries = entries
+        save_search_manifest(self.dest_dir_path, entries)
+        stats = {"documents": len(entries), "shards_written": 0, "shards_removed": 0}
+        if not write_files:
+            return stats
+
+        search_dir = os.path.join(self.dest_dir_path, SEARCH_DIR)
+        documents_path = os.path.join(search_dir, DOCUMENTS_FILENAME)
+        shard_keys = {shard_key(term) for entry in entries.values() for term in entry["words"]}
+        if not os.path.exists(documents_path):
+            # Nothing written yet (or it was deleted): write every shard
+            dirty |= shard_keys
+
+        shards = {key: {} for key in dirty}
+        for entry in entries.values():
+            for term, count in entry["words"].items():
+                shard = shards.get(shard_key(term))
+                if shard is not None:
+                    shard.setdefault(term, []).append((entry["doc"], count))
+        for key, terms in shards.items():
+            path = os.path.join(search_dir, key + ".json")
+            if terms:
+                write_text(path, dump_json({term: encode_postings(sorted(postings)) for term, postings in terms.items()}))
+                stats["shards_written"] += 1
+            elif os.path.exists(path):
+                os.remove(path)
+                stats["shards_removed"] += 1
+
+        listing = [None] * (max((entry["doc"] for entry in entries.values()), default=-1) + 1)
+        for entry in entries.values():
+            listing[entry["doc"]] = [entry["url"], entry["title"]]
+        text = dump_json({"version": SEARCH_INDEX_VERSION, "shards": sorted(shard_keys), "documents": listing})
+        try:
+            with open(documents_path, encoding="utf-8") as f:
+                current = f.read()
+        except OSError:
+            current = None
+        if text != current:
+            write_text(documents_path, text)
+        return stats
+
+
+def remove_search_index(dest_dir_path):
+    # For a build without search: drop what an earlier one published, if it did
+    manifest_path = os.path.join(dest_dir_path, SEARCH_MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return
+    search_dir = os.path.join(dest_dir_path, SEARCH_DIR)
+    if os.path.isdir(search_dir):
+        shutil.rmtree(search_dir)
+    os.remove(manifest_path)
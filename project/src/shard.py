@@ -0,0 +1,183 @@
+import os
+import shutil
+
+from copystatic import collect_static_files, copy_file
+from dependencies import DependencyGraph, output_index
+from generate_content import report_broken_links
+from search_index import SearchIndex
+from sitemap import Sitemap
+from manifest import (
+    DEPENDENCY_GRAPH_FILENAME,
+    MANIFEST_FILENAME,
+    PRECOMPRESS_MANIFEST_FILENAME,
+    SEARCH_MANIFEST_FILENAME,
+    SHARD_RECORD_FILENAME,
+    SITEMAP_MANIFEST_FILENAME,
+    STATIC_MANIFEST_FILENAME,
+    hash_bytes,
+    load_dependency_graph,
+    load_manifest,
+    load_precompress_manifest,
+    load_search_manifest,
+    load_shard_record,
+    load_sitemap_manifest,
+    load_static_manifest,
+    save_dependency_graph,
+    save_manifest,
+    save_precompress_manifest,
+    save_static_manifest,
+)
+
+# Each shard builds into a directory of its own under here unless told otherwise
+DEFAULT_SHARD_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "shards")
+# The shard that syncs static files; the others only build pages
+STATIC_SHARD = 0
+# Build bookkeeping that is merged rather than copied
+SHARD_BOOKKEEPING_FILES = frozenset(
+    (MANIFEST_FILENAME, STATIC_MANIFEST_FILENAME, DEPENDENCY_GRAPH_FILENAME, SHARD_RECORD_FILENAME,
+     SEARCH_MANIFEST_FILENAME, SITEMAP_MANIFEST_FILENAME, PRECOMPRESS_MANIFEST_FILENAME)
+)
+# How many problems a merge error lists before it stops
+MAX_REPORTED_PATHS = 10
+
+
+def parse_shard(text):
+    # "2/4" -> (2, 4), for the --shard option
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"invalid shard {text!r}, expected INDEX/COUNT such as 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"invalid shard {text!r}, INDEX must be between 0 and COUNT - 1")
+    return index, count
+
+
+def shard_of(rel_path, count):
+    # A stable hash of the path, so a page stays in the same shard from build to build and
+    # machine to machine (unlike hash(), which is salted per process)
+    digest = hash_bytes(rel_path.replace(os.sep, "/").encode())
+    return int(digest[:16], 16) % count
+
+
+def sources_hash(pages, dir_path_content):
+    # Identifies the content tree every shard saw, so the merge can tell they built the same one
+    rel_paths = sorted(os.path.relpath(entry_path, dir_path_content).replace(os.sep, "/") for entry_path, _ in pages)
+    return hash_bytes("\n".join(rel_paths).encode())
+
+
+def shard_pages(pages, dir_path_content, index, count):
+    # The (source, destination) pairs out of pages that belong to shard index of count
+    return [page for page in pages if shard_of(os.path.relpath(page[0], dir_path_content), count) == index]
+
+
+def make_shard_record(index, count, all_pages, built_pages, dir_path_content, dest_dir_path):
+    return {
+        "index": index,
+        "count": count,
+        "static": index == STATIC_SHARD,
+        "sources_hash": sources_hash(all_pages, dir_path_content),
+        "total_pages": len(all_pages),
+        "pages": sorted(os.path.relpath(dest_path, dest_dir_path) for _, dest_path in built_pages),
+    }
+
+
+def format_paths(paths):
+    paths = sorted(paths)
+    listed = ", ".join(paths[:MAX_REPORTED_PATHS])
+    if len(paths) > MAX_REPORTED_PATHS:
+        listed += f" and {len(paths) - MAX_REPORTED_PATHS} more"
+    return listed
+
+
+def check_shard_records(records):
+    # Raise ValueError unless records (by shard directory) are one complete set of shards
+    # built from the same content tree
+    if not records:
+        raise ValueError("no shards to merge")
+    for shard_dir, record in records.items():
+        if not record:
+            raise ValueError(f"{shard_dir} is not a shard build (no {SHARD_RECORD_FILENAME})")
+    first = next(iter(records.values()))
+    for shard_dir, record in records.items():
+        if (record["count"], record["sources_hash"]) != (first["count"], first["sources_hash"]):
+            raise ValueError(f"{shard_dir} was built from a different content tree or shard count")
+    indexes = sorted(record["index"] for record in records.values())
+    if indexes != list(range(first["count"])):
+        missing = sorted(set(range(first["count"])) - set(indexes))
+        duplicated = sorted({index for index in indexes if indexes.count(index) > 1})
+        raise ValueError(f"expected shards 0-{first['count'] - 1}: missing {missing}, duplicated {duplicated}")
+    built = sum(len(record["pages"]) for record in records.values())
+    if built != first["total_pages"]:
+        raise ValueError(f"shards built {built} pages, the content tree has {first['total_pages']}")
+
+
+def merge_shards(shard_dirs, dest_dir_path):
+    # Combine the outputs of every shard of a sharded build into dest_dir_path, which is
+    # replaced like by a full build. Nothing is written unless the shards are complete, every
+    # page they recorded exists, and no path was written by more than one shard; any of those
+    # raises ValueError. The build manifests are merged too, so later incremental builds of
+    # dest_dir_path carry on from the merged result, and broken internal links are reported.
+    records = {shard_dir: load_shard_record(shard_dir) for shard_dir in shard_dirs}
+    check_shard_records(records)
+
+    owners = {}
+    collisions = set()
+    missing = []
+    for shard_dir, record in records.items():
+        files = collect_static_files(shard_dir, exclude=SHARD_BOOKKEEPING_FILES)
+        for rel_path in files:
+            if rel_path in owners:
+                collisions.add(rel_path)
+            owners[rel_path] = shard_dir
+        present = set(files)
+        missing.extend(page for page in record["pages"] if page not in present)
+    if collisions:
+        raise ValueError(f"paths written by more than one shard: {format_paths(collisions)}")
+    if missing:
+        raise ValueError(f"pages missing from their shard's output: {format_paths(missing)}")
+
+    if os.path.exists(dest_dir_path):
+        shutil.rmtree(dest_dir_path)
+    methods = {}
+    for rel_path, shard_dir in owners.items():
+        method = copy_file(os.path.join(shard_dir, rel_path), os.path.join(dest_dir_path, rel_path))
+        methods[method] = methods.get(method, 0) + 1
+
+    pages = {}
+    graph = DependencyGraph()
+    static_files = {}
+    search_pages = {}
+    sitemap = {}
+    gz_files = []
+    for shard_dir, record in records.items():
+        pages.update(load_manifest(shard_dir))
+        gz_files.extend(load_precompress_manifest(shard_dir))
+        graph.pages.update(load_dependency_graph(shard_dir))
+        search_pages.update(load_search_manifest(shard_dir))
+        shard_sitemap = load_sitemap_manifest(shard_dir)
+        if shard_sitemap:
+            sitemap = dict(shard_sitemap, pages={**sitemap.get("pages", {}), **shard_sitemap["pages"]})
+        if record["static"]:
+            static_files = load_static_manifest(shard_dir)
+    save_manifest(dest_dir_path, pages)
+    save_dependency_graph(dest_dir_path, graph.pages)
+    save_static_manifest(dest_dir_path, static_files)
+    if gz_files:
+        save_precompress_manifest(dest_dir_path, sorted(gz_files))
+
+    stats = {"shards": len(records), "files": len(owners), "pages": len(pages), "methods": methods}
+    print(f"Merged {stats['shards']} shards: {stats['files']} files, {stats['pages']} pages ("
+          + ", ".join(f"{count} by {method}" for method, count in sorted(methods.items())) + ")")
+    # Only now is the whole site in one place to check links against
+    stats["broken_links"] = graph.broken_references(output_index(pages, static_files))
+    report_broken_links(stats["broken_links"])
+    if search_pages:
+        # Shards number their documents independently, so the index is written afresh
+        stats["search"] = SearchIndex(dest_dir_path).update(search_pages, search_pages)
+        print(f"Search index: {stats['search']['documents']} documents, {stats['search']['shards_written']} shards")
+    if sitemap:
+        stats["sitemap"] = Sitemap(dest_dir_path).update(
+            sitemap["pages"], sitemap["pages"], sitemap["site_url"], sitemap["basepath"]
+        )
+        print(f"Sitemap and feeds: {stats['sitemap']['urls']} URLs, {stats['sitemap']['written']} files")
+    return stats
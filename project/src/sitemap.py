@@ -0,0 +1,211 @@
+import filecmp
+import heapq
+import os
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+from xml.sax.saxutils import escape, quoteattr
+
+from manifest import SITEMAP_MANIFEST_FILENAME, load_sitemap_manifest, save_sitemap_manifest
+
+# With a site URL the build publishes:
+#   sitemap.xml           every page and its lastmod, or, past MAX_SITEMAP_URLS pages, a sitemap
+#                         index pointing at sitemap-1.xml, sitemap-2.xml, ... of that many URLs each
+#   <section>/feed.xml    an Atom feed of the newest pages under each top-level directory
+#                         (blog/tom/index.html is in the blog feed; blog/index.html is not)
+# Front matter can set Date (published), Updated (lastmod) and Author; pages without them
+# use their source's modification time.
+SITEMAP_FILENAME = "sitemap.xml"
+SITEMAP_SHARD_FILENAME = "sitemap-{}.xml"
+FEED_FILENAME = "feed.xml"
+# The sitemaps.org limit per file
+MAX_SITEMAP_URLS = 50000
+MAX_FEED_ENTRIES = 20
+FRONT_MATTER_KEYS = ("Date", "Updated", "Author")
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+ATOM_NS = "http://www.w3.org/2005/Atom"
+
+
+def format_time(moment):
+    # One form for every timestamp, valid both as a sitemap lastmod and an Atom date
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_date(value, key):
+    # "2024-05-01", "2024-05-01 12:30" or "2024-05-01T12:30:00+02:00"; times without a zone are UTC
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"invalid {key} in front matter: {value!r}")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return format_time(moment)
+
+
+def page_dates(front_matter, from_path):
+    # (published, updated) of a page: front matter where it has them, else the source's mtime
+    published = front_matter.get("Date")
+    updated = front_matter.get("Updated", published)
+    if updated is None:
+        modified = format_time(datetime.fromtimestamp(os.stat(from_path).st_mtime, timezone.utc))
+        return modified, modified
+    try:
+        updated = parse_date(updated, "Updated" if "Updated" in front_matter else "Date")
+        return (parse_date(published, "Date") if published is not None else updated), updated
+    except ValueError as e:
+        raise ValueError(f"{from_path}: {e}") from e
+
+
+def page_section(dest_rel_path):
+    # The top-level directory whose feed the page belongs to, or None
+    parts = dest_rel_path.replace(os.sep, "/").split("/")
+    if len(parts) < 2 or parts[1:] == ["index.html"]:
+        return None
+    return parts[0]
+
+
+def write_if_changed(path, chunks):
+    # Stream chunks to a temporary file and only move it into place if it differs, so an
+    # unchanged file keeps its mtime (and deploy tools don't upload it again)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding="utf-8") as f:
+        f.writelines(chunks)
+    if os.path.exists(path) and filecmp.cmp(tmp_path, path, shallow=False):
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+
+def urlset_chunks(site_url, entries):
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'
+    for entry in entries:
+        yield f"<url><loc>{escape(site_url + quote(entry['url']))}</loc><lastmod>{entry['updated']}</lastmod></url>\n"
+    yield "</urlset>\n"
+
+
+def sitemap_index_chunks(site_url, basepath, shards):
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n'
+    for filename, lastmod in shards:
+        yield f"<sitemap><loc>{escape(site_url + quote(basepath + filename))}</loc><lastmod>{lastmod}</lastmod></sitemap>\n"
+    yield "</sitemapindex>\n"
+
+
+def feed_chunks(site_url, section_url, title, updated, author, entries):
+    yield (
+        f'<?xml version="1.0" encoding="utf-8"?>\n<feed xmlns="{ATOM_NS}">\n'
+        f"<id>{escape(site_url + section_url)}</id>\n<title>{escape(title)}</title>\n"
+        f'<link rel="self" href={quoteattr(site_url + section_url + FEED_FILENAME)}/>\n'
+        f"<link href={quoteattr(site_url + section_url)}/>\n"
+        f"<updated>{updated}</updated>\n<author><name>{escape(author)}</name></author>\n"
+    )
+    for entry in entries:
+        url = site_url + quote(entry["url"])
+        yield (
+            f"<entry><id>{escape(url)}</id><title>{escape(entry['title'])}</title><link href={quoteattr(url)}/>"
+            f"<published>{entry['published']}</published><updated>{entry['updated']}</updated>"
+        )
+        if entry["author"] is not None:
+            yield f"<author><name>{escape(entry['author'])}</name></author>"
+        yield "</entry>\n"
+    yield "</feed>\n"
+
+
+class Sitemap:
+    # The sitemap and feeds of an output directory, kept as one manifest entry per page
+    # ({"url", "title", "published", "updated", "author"}) so a build only has to supply
+    # the pages it rebuilt, like SearchIndex
+    def __init__(self, dest_dir_path):
+        self.dest_dir_path = dest_dir_path
+        manifest = load_sitemap_manifest(dest_dir_path)
+        self.entries = manifest.get("pages", {})
+        self.files = manifest.get("files", [])
+
+    def __contains__(self, dest_rel_path):
+        return dest_rel_path in self.entries
+
+    def update(self, pages, documents, site_url, basepath, write_files=True, max_urls=MAX_SITEMAP_URLS):
+        # pages holds every page of the site, documents maps the ones rebuilt to their entry.
+        # With write_files off only the manifest is saved, for a shard build.
+        site_url = site_url.rstrip("/")
+        entries = {}
+        for dest_rel_path in pages:
+            if dest_rel_path in documents:
+                entries[dest_rel_path] = documents[dest_rel_path]
+            elif dest_rel_path in self.entries:
+                entries[dest_rel_path] = self.entries[dest_rel_path]
+        self.entries = entries
+        stats = {"urls": len(entries), "written": 0, "unchanged": 0, "removed": 0}
+        if write_files:
+            files = self.write_sitemaps(site_url, basepath, stats, max_urls) + self.write_feeds(site_url, basepath, stats)
+            for rel_path in set(self.files) - set(files):
+                path = os.path.join(self.dest_dir_path, rel_path)
+                if os.path.exists(path):
+                    os.remove(path)
+                    stats["removed"] += 1
+            self.files = sorted(files)
+        save_sitemap_manifest(self.dest_dir_path, {
+            "site_url": site_url, "basepath": basepath, "pages": entries, "files": self.files,
+        })
+        return stats
+
+    def write(self, rel_path, chunks, stats):
+        if write_if_changed(os.path.join(self.dest_dir_path, rel_path), chunks):
+            stats["written"] += 1
+        else:
+            stats["unchanged"] += 1
+        return rel_path
+
+    def write_sitemaps(self, site_url, basepath, stats, max_urls):
+        ordered = sorted(self.entries.values(), key=lambda entry: entry["url"])
+        if len(ordered) <= max_urls:
+            return [self.write(SITEMAP_FILENAME, urlset_chunks(site_url, ordered), stats)]
+        files = []
+        shards = []
+        for start in range(0, len(ordered), max_urls):
+            shard = ordered[start:start + max_urls]
+            filename = SITEMAP_SHARD_FILENAME.format(len(shards) + 1)
+            files.append(self.write(filename, urlset_chunks(site_url, shard), stats))
+            shards.append((filename, max(entry["updated"] for entry in shard)))
+        files.append(self.write(SITEMAP_FILENAME, sitemap_index_chunks(site_url, basepath, shards), stats))
+        return files
+
+    def write_feeds(self, site_url, basepath, stats):
+        # One pass over the pages keeps only the newest MAX_FEED_ENTRIES of each section
+        newest = {}
+        updated = {}
+        for dest_rel_path, entry in self.entries.items():
+            section = page_section(dest_rel_path)
+            if section is None:
+                continue
+            item = (entry["published"], entry["url"], dest_rel_path)
+            heap = newest.setdefault(section, [])
+            if len(heap) < MAX_FEED_ENTRIES:
+                heapq.heappush(heap, item)
+            else:
+                heapq.heappushpop(heap, item)
+            updated[section] = max(updated.get(section, ""), entry["updated"])
+
+        author = urlsplit(site_url).hostname or site_url
+        files = []
+        for section, heap in sorted(newest.items()):
+            entries = [self.entries[dest_rel_path] for _, _, dest_rel_path in sorted(heap, reverse=True)]
+            index = self.entries.get(os.path.join(section, "index.html"))
+            title = index["title"] if index is not None else section
+            section_url = quote(f"{basepath}{section}/")
+            chunks = feed_chunks(site_url, section_url, title, updated[section], author, entries)
+            files.append(self.write(os.path.join(section, FEED_FILENAME), chunks, stats))
+        return files
+
+
+def remove_sitemap(dest_dir_path):
+    # For a build without a site URL: drop what an earlier one published, if it did
+    manifest_path = os.path.join(dest_dir_path, SITEMAP_MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return
+    for rel_path in load_sitemap_manifest(dest_dir_path).get("files", []):
+        path = os.path.join(dest_dir_path, rel_path)
+        if os.path.exists(path):
+            os.remove(path)
+    os.remove(manifest_path)
@@ -0,0 +1,240 @@
+import os
+import re
+
+from fingerprint import rewrite_asset_references
+from htmlnode import WRITE_BATCH_SIZE, HTMLNode
+from manifest import hash_bytes
+from minify import Minifier, minify_markup
+
+LAYOUT_FILENAME = "layout.html"
+
+# {{ Name }} marks a slot, {% include "partial.html" %} pulls in another file at compile time
+TAG_PATTERN = re.compile(
+    r"\{\{\s*(\w+)\s*\}\}"
+    r"|\{%\s*include\s+[\"']?([^\"'\s%]+)[\"']?\s*%\}"
+)
+URL_ATTRIBUTES = ('href="', 'src="')
+
+
+def rewrite_basepath(text, basepath):
+    # Point root-relative href/src attributes at the site's basepath
+    text = text.replace('href="/', f'href="{basepath}')
+    text = text.replace('src="/', f'src="{basepath}')
+    return text
+
+
+def rewrite_urls(text, basepath, assets=None):
+    # rewrite_basepath, after pointing references to fingerprinted assets at their current names
+    if assets:
+        text = rewrite_asset_references(text, assets)
+    return rewrite_basepath(text, basepath)
+
+
+def assets_key(assets):
+    # Changes whenever any asset's fingerprinted name does
+    if not assets:
+        return None
+    return hash_bytes("\n".join(f"{url}:{target}" for url, target in sorted(assets.items())).encode())
+
+
+class Template:
+    def __init__(self, parts, slots, dependencies, basepath, minify=False, minify_saved=0, assets=None):
+        # parts holds the static text with a placeholder entry for every slot;
+        # slots lists (index into parts, variable name, original tag, follows an href/src attribute).
+        # A minified template has compact static text (minify_saved characters shorter) and
+        # serializes HTMLNode variables minified. assets maps asset URLs to fingerprinted ones.
+        self.parts = parts
+        self.slots = slots
+        self.dependencies = dependencies
+        self.basepath = basepath
+        self.minify = minify
+        self.minify_saved = minify_saved
+        self.assets = assets or {}
+        # Minifying and asset names change every page, so they are part of what the manifest compares
+        key = assets_key(assets)
+        self.fingerprint = hash_bytes(
+            "\n".join(f"{path}:{digest}" for path, (_, digest) in sorted(dependencies.items())).encode()
+            + (b"\nminify" if minify else b"")
+            + (f"\nassets:{key}".encode() if key else b"")
+        )
+
+    def is_stale(self):
+        for path, (mtime_ns, _) in self.dependencies.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime_ns:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def render_value(self, value, in_url_attribute, minifier=None):
+        if isinstance(value, HTMLNode):
+            value = value.to_html() if minifier is None else value.to_minified_html(minifier)
+        value = rewrite_urls(str(value), self.basepath, self.assets)
+        if in_url_attribute and value.startswith("/"):
+            value = self.basepath + self.assets.get(value, value)[1:]
+        return value
+
+    def make_minifier(self):
+        # What render and write count a page's minify savings on, or None for a plain template
+        if not self.minify:
+            return None
+        minifier = Minifier()
+        minifier.saved = self.minify_saved
+        return minifier
+
+    def render(self, variables, minifier=None):
+        # With a minified template, pass make_minifier() to learn what minifying saved
+        if minifier is None:
+            minifier = self.make_minifier()
+        parts = self.parts.copy()
+        for index, name, tag, in_url_attribute in self.slots:
+            if name not in variables:
+                # Unknown slots are left exactly as written in the template
+                parts[index] = tag
+            else:
+                parts[index] = self.render_value(variables[name], in_url_attribute, minifier)
+        return "".join(parts)
+
+    def write(self, stream, variables, batch_size=WRITE_BATCH_SIZE, minifier=None):
+        # Like render, but written to a stream: HTMLNode variables are serialized straight
+        # to it in batches, with the basepath rewrite applied to each batch
+        if minifier is None:
+            minifier = self.make_minifier()
+        slots = iter(self.slots)
+        next_slot = next(slots, None)
+        for index, part in enumerate(self.parts):
+            if next_slot is None or next_slot[0] != index:
+                if part:
+                    stream.write(part)
+                continue
+            _, name, tag, in_url_attribute = next_slot
+            next_slot = next(slots, None)
+            if name not in variables:
+                stream.write(tag)
+            elif isinstance(variables[name], HTMLNode):
+                variables[name].write_html(
+                    stream, batch_size, lambda text: rewrite_urls(text, self.basepath, self.assets), minifier
+                )
+            else:
+                stream.write(self.render_value(variables[name], in_url_attribute, minifier))
+
+    def __repr__(self):
+        return f"Template({len(self.parts)} parts, {len(self.slots)} slots)"
+
+
+def compile_template(template_path, basepath="/", minify=False, assets=None):
+    parts = []
+    slots = []
+    dependencies = {}
+    _compile_file(template_path, basepath, parts, slots, dependencies, (), assets)
+    minify_saved = 0
+    if minify:
+        # The static text is minified once here, so rendering a page never has to
+        original_length = sum(len(part) for part in parts)
+        parts = [minify_markup(part) for part in parts]
+        minify_saved = original_length - sum(len(part) for part in parts)
+    return Template(parts, slots, dependencies, basepath, minify, minify_saved, assets)
+
+
+def _compile_file(path, basepath, parts, slots, dependencies, include_stack, assets=None):
+    path = os.path.abspath(path)
+    if path in include_stack:
+        raise ValueError(f"invalid template: include cycle through {path}")
+
+    mtime_ns = os.stat(path).st_mtime_ns
+    with open(path, 'rb') as f:
+        raw = f.read()
+    dependencies[path] = (mtime_ns, hash_bytes(raw))
+    text = raw.decode()
+
+    position = 0
+    for match in TAG_PATTERN.finditer(text):
+        _append_static(parts, rewrite_urls(text[position:match.start()], basepath, assets))
+        name, include = match.groups()
+        if include is not None:
+            # Includes are resolved relative to the including file and inlined once
+            include_path = os.path.join(os.path.dirname(path), include)
+            _compile_file(include_path, basepath, parts, slots, dependencies, include_stack + (path,), assets)
+        else:
+            preceding = parts[-1] if parts else ""
+            in_url_attribute = preceding.endswith(URL_ATTRIBUTES)
+            slots.append((len(parts), name, match.group(0), in_url_attribute))
+            parts.append("")
+            # Keep an empty static part after every slot so adjacent static text is never merged across it
+            parts.append("")
+        position = match.end()
+    _append_static(parts, rewrite_urls(text[position:], basepath, assets))
+
+
+def _append_static(parts, text):
+    # The last part is always static text, since every slot is followed by an empty static part
+    if not text:
+        return
+    if parts:
+        parts[-1] += text
+    else:
+        parts.append(text)
+
+
+class TemplateCache:
+    def __init__(self):
+        self.templates = {}
+        # Whether templates are compiled minified, and the fingerprinted asset names they link to;
+        # one setting for every page a process builds
+        self.minify = False
+        self.assets = None
+        self.assets_key = None
+
+    def get(self, template_path, basepath="/"):
+        key = (os.path.abspath(template_path), basepath, self.minify, self.assets_key)
+        template = self.templates.get(key)
+        if template is None or template.is_stale():
+            template = compile_template(template_path, basepath, self.minify, self.assets)
+            self.templates[key] = template
+        return template
+
+    def clear(self):
+        self.templates.clear()
+
+
+def find_layout(from_path, dir_path_content, template_path, layouts):
+    # The nearest layout.html between the page's directory and the content root wins,
+    # falling back to the site template. layouts memoizes the answer per directory.
+    content_root = os.path.abspath(dir_path_content)
+    directory = os.path.dirname(os.path.abspath(from_path))
+    checked = []
+    layout = template_path
+    while True:
+        if directory in layouts:
+            layout = layouts[directory]
+            break
+        checked.append(directory)
+        candidate = os.path.join(directory, LAYOUT_FILENAME)
+        if os.path.isfile(candidate):
+            layout = candidate
+            break
+        if directory == content_root or os.path.dirname(directory) == directory:
+            break
+        directory = os.path.dirname(directory)
+    for checked_directory in checked:
+        layouts[checked_directory] = layout
+    return layout
+
+
+# Shared per process, so each build (or pool worker) compiles a template once
+template_cache = TemplateCache()
+
+
+def load_template(template_path, basepath="/"):
+    return template_cache.get(template_path, basepath)
+
+
+def configure_minify(enabled):
+    template_cache.minify = enabled
+
+
+def configure_assets(assets):
+    # assets maps asset URLs to fingerprinted ones (see sync_static_files), or None for fixed names
+    template_cache.assets = assets
+    template_cache.assets_key = assets_key(assets)
@@ -1,8 +1,12 @@
+import io
 import unittest
 from block_markdown_converter import (
     markdown_to_html_node,
     markdown_to_blocks,
+    markdown_lines_to_html_node,
     block_to_block_type,
+    iter_block_lines,
+    read_lines,
     BlockType,
 )
 
@@ -103,6 +107,28 @@ This is another paragraph with _italic_ text and `code` here
         "<div><p>This is <b>bolded</b> paragraph text in a p tag here</p><p>This is another paragraph with <i>italic</i> text and <code>code</code> here</p></div>",
     )
 
+class TestBlockLines(unittest.TestCase):
+    def test_blank_lines(self):
+        md = "\n\n\n  first\n\n\n\nsecond  \n  \n\n \n\n- a\n- b\n"
+        self.assertEqual(
+            list(iter_block_lines(md.split("\n"))),
+            [["first"], ["second"], ["- a", "- b"]],
+        )
+        self.assertEqual(markdown_to_blocks(md), ["first", "second", "- a\n- b"])
+
+    def test_whitespace_line_inside_block(self):
+        self.assertEqual(markdown_to_blocks("a\n  \nb"), ["a\n  \nb"])
+
+    def test_trailing_list_marker_stripped(self):
+        self.assertEqual(block_to_block_type("- a\n-"), BlockType.PARAGRAPH)
+        self.assertEqual(markdown_to_blocks("- a\n- \n"), ["- a\n-"])
+
+    def test_read_lines_from_file(self):
+        md = "# Title\n\n- one\n- two\n\n```\ncode\n```"
+        node = markdown_lines_to_html_node(read_lines(io.StringIO(md)))
+        self.assertEqual(node.to_html(), markdown_to_html_node(md).to_html())
+
+
 def test_codeblock(self):
     md = """
 ```
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from block_markdown_converter import markdown_lines_to_html_node, markdown_to_html_node
+from block_memo import BlockMemo, block_memo, configure_block_memo, DEFAULT_MAX_BYTES
+from generate_content import generate_pages_recursive
+
+
+class TestBlockMemo(unittest.TestCase):
+    def test_lru_eviction(self):
+        memo = BlockMemo(max_bytes=10)
+        memo.put("a", "1111")
+        memo.put("b", "2222")
+        self.assertEqual(memo.get("a"), ("1111", (), 0, None))
+        memo.put("c", "3333")
+        # "b" was least recently used
+        self.assertIsNone(memo.get("b"))
+        self.assertEqual(memo.get("a"), ("1111", (), 0, None))
+        self.assertEqual(memo.get("c"), ("3333", (), 0, None))
+        self.assertEqual(memo.size, 10)
+        self.assertEqual(memo.stats()["evictions"], 1)
+
+    def test_oversized_entry_is_not_stored(self):
+        memo = BlockMemo(max_bytes=4)
+        memo.put("a", "too long")
+        self.assertEqual(memo.stats()["entries"], 0)
+
+    def test_resize_to_zero_turns_it_off(self):
+        memo = BlockMemo()
+        memo.put("a", "1")
+        memo.resize(0)
+        self.assertFalse(memo.enabled)
+        self.assertEqual(memo.size, 0)
+
+    def test_memoized_tree_renders_the_same(self):
+        md = "# Title\n\nSome **bold** text\n\n- one\n- two\n\nSome **bold** text"
+        memo = BlockMemo()
+        node = markdown_lines_to_html_node(md.split("\n"), memo)
+        self.assertEqual(node.to_html(), markdown_to_html_node(md).to_html())
+        self.assertEqual(memo.stats()["hits"], 1)
+        self.assertEqual(memo.stats()["misses"], 3)
+
+
+class TestBlockMemoStats(unittest.TestCase):
+    def tearDown(self):
+        configure_block_memo(DEFAULT_MAX_BYTES)
+
+    def build(self, tmp, memo_bytes):
+        configure_block_memo(memo_bytes)
+        content = os.path.join(tmp, "content")
+        template = os.path.join(tmp, "template.html")
+        with open(template, 'w') as f:
+            f.write("{{ Content }}")
+        for name in ("one", "two", "three"):
+            os.makedirs(os.path.join(content, name), exist_ok=True)
+            with open(os.path.join(content, name, "index.md"), 'w') as f:
+                f.write(f"# {name}\n\nThis page is licensed under **CC BY**.")
+        return generate_pages_recursive(content, template, os.path.join(tmp, "public"), "/")
+
+    def test_shared_blocks_hit(self):
+        block_memo.clear()
+        with tempfile.TemporaryDirectory() as tmp:
+            stats = self.build(tmp, DEFAULT_MAX_BYTES)
+        self.assertEqual(stats["block_memo_hits"], 2)
+        self.assertEqual(stats["block_memo_misses"], 4)
+        self.assertGreater(stats["block_memo_bytes"], 0)
+        self.assertAlmostEqual(stats["block_memo_hit_rate"], 2 / 6)
+
+    def test_turned_off(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            stats = self.build(tmp, 0)
+        self.assertNotIn("block_memo_hits", stats)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import os
+import tempfile
+import unittest
+
+from copystatic import copy_file, sync_static_files
+from manifest import load_asset_manifest
+from png_optimize import PNGOptimizer
+from test_png_optimize import gradient, make_png
+from testutil import read_file, write_file
+
+
+class TestSyncStaticFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "a.png"), "png data")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_first_sync_copies_everything(self):
+        stats = sync_static_files(self.static, self.public)
+        self.assertEqual(stats["copied"], 2)
+        self.assertEqual(stats["bytes_copied"], len("body {}") + len("png data"))
+        self.assertEqual(read_file(os.path.join(self.public, "images", "a.png")), "png data")
+
+    def test_second_sync_skips_unchanged(self):
+        sync_static_files(self.static, self.public)
+        stats = sync_static_files(self.static, self.public)
+        self.assertEqual(stats["copied"], 0)
+        self.assertEqual(stats["skipped"], 2)
+        self.assertEqual(stats["bytes_avoided"], len("body {}") + len("png data"))
+
+    def test_minify(self):
+        write_file(os.path.join(self.static, "index.css"), "body {\n  margin: 0;\n}\n")
+        stats = sync_static_files(self.static, self.public, minify=True)
+        self.assertEqual(read_file(os.path.join(self.public, "index.css")), "body{margin:0}")
+        self.assertEqual(stats["minify_saved"], {".css": {"files": 1, "bytes_saved": 8}})
+        self.assertEqual(read_file(os.path.join(self.public, "images", "a.png")), "png data")
+
+        stats = sync_static_files(self.static, self.public, minify=True)
+        self.assertEqual(stats["skipped"], 2)
+        # Turning minify off copies the original again
+        stats = sync_static_files(self.static, self.public)
+        self.assertEqual(stats["copied"], 1)
+        self.assertEqual(read_file(os.path.join(self.public, "index.css")), "body {\n  margin: 0;\n}\n")
+
+    def test_fingerprint(self):
+        write_file(os.path.join(self.static, "index.css"), "a { background: url(/images/a.png) }")
+        write_file(os.path.join(self.static, "robots.txt"), "User-agent: *")
+        stats = sync_static_files(self.static, self.public, fingerprint=True)
+        assets = stats["assets"]
+        self.assertEqual(sorted(assets), ["/images/a.png", "/index.css"])
+        self.assertRegex(assets["/images/a.png"], r"^/images/a\.[0-9a-f]{8}\.png$")
+        self.assertEqual(load_asset_manifest(self.public), assets)
+        self.assertEqual(read_file(os.path.join(self.public, assets["/images/a.png"][1:])), "png data")
+        self.assertEqual(
+            read_file(os.path.join(self.public, assets["/index.css"][1:])),
+            f"a {{ background: url({assets['/images/a.png']}) }}",
+        )
+        self.assertTrue(os.path.exists(os.path.join(self.public, "robots.txt")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.css")))
+
+        # Unchanged files keep their names and aren't written again
+        stats = sync_static_files(self.static, self.public, fingerprint=True)
+        self.assertEqual(stats["assets"], assets)
+        self.assertEqual(stats["copied"], 0)
+
+        # A changed image gets a new name, and so does the stylesheet that names it
+        write_file(os.path.join(self.static, "images", "a.png"), "new png data")
+        stats = sync_static_files(self.static, self.public, fingerprint=True)
+        self.assertNotEqual(stats["assets"]["/images/a.png"], assets["/images/a.png"])
+        self.assertNotEqual(stats["assets"]["/index.css"], assets["/index.css"])
+        self.assertEqual(stats["removed"], 2)
+
+        # Without fingerprints the original names come back
+        stats = sync_static_files(self.static, self.public)
+        self.assertIsNone(stats["assets"])
+        self.assertEqual(sorted(os.listdir(self.public)), [".static-manifest.json", "images", "index.css", "robots.txt"])
+        self.assertEqual(os.listdir(os.path.join(self.public, "images")), ["a.png"])
+
+    def test_optimize_images(self):
+        png = make_png(gradient(30, 30))
+        with open(os.path.join(self.static, "images", "a.png"), 'wb') as f:
+            f.write(png)
+        optimizer = PNGOptimizer(os.path.join(self.tmp.name, "cache"))
+        stats = sync_static_files(self.static, self.public, png_optimizer=optimizer)
+        optimized_size = os.path.getsize(os.path.join(self.public, "images", "a.png"))
+        self.assertLess(optimized_size, len(png))
+        self.assertEqual(stats["images"], {"optimized": 1, "cache_hits": 0, "bytes_saved": len(png) - optimized_size})
+        self.assertEqual(read_file(os.path.join(self.public, "index.css")), "body {}")
+
+        stats = sync_static_files(self.static, self.public, png_optimizer=PNGOptimizer(optimizer.cache_dir))
+        self.assertEqual(stats["skipped"], 2)
+        # Without the optimizer the original is copied again
+        stats = sync_static_files(self.static, self.public)
+        self.assertEqual(stats["copied"], 1)
+        self.assertEqual(os.path.getsize(os.path.join(self.public, "images", "a.png")), len(png))
+
+    def test_changed_file_is_copied(self):
+        sync_static_files(self.static, self.public)
+        css = os.path.join(self.static, "index.css")
+        write_file(css, "body { margin: 0 }")
+        stats = sync_static_files(self.static, self.public)
+        self.assertEqual(stats["copied"], 1)
+        self.assertEqual(read_file(os.path.join(self.public, "index.css")), "body { margin: 0 }")
+
+    def test_touched_file_skipped_with_hash(self):
+        sync_static_files(self.static, self.public, use_hash=True)
+        css = os.path.join(self.static, "index.css")
+        os.utime(css, (0, 0))
+        stats = sync_static_files(self.static, self.public, use_hash=True)
+        self.assertEqual(stats["copied"], 0)
+        self.assertEqual(os.stat(os.path.join(self.public, "index.css")).st_mtime, 0)
+
+    def test_stale_file_removed_but_pages_kept(self):
+        sync_static_files(self.static, self.public)
+        write_file(os.path.join(self.public, "index.html"), "<html></html>")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        stats = sync_static_files(self.static, self.public)
+        self.assertEqual(stats["removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_hardlink_is_replaced_not_written_through(self):
+        sync_static_files(self.static, self.public, link=True)
+        dest = os.path.join(self.public, "index.css")
+        copy_file(os.path.join(self.static, "images", "a.png"), dest)
+        self.assertEqual(read_file(os.path.join(self.static, "index.css")), "body {}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import gzip
+import os
+import tempfile
+import threading
+import unittest
+
+from client import build_request, parse_args, send_request
+from daemon import SiteState, serve
+from generate_content import generate_pages_recursive
+from parse_cache import ParseCache
+from testutil import write_file
+
+
+class TestSiteState(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.public = os.path.join(root, "public")
+        template = os.path.join(root, "template.html")
+        write_file(template, "{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "about", "index.md"), "# About")
+        write_file(os.path.join(self.static, "style.css"), "body {}")
+        self.state = SiteState(self.content, self.static, template, self.public)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_repeat_builds(self):
+        first = self.state.build()
+        self.assertEqual(first["pages"]["rebuilt"], 2)
+        self.assertEqual(first["static"]["copied"], 1)
+
+        second = self.state.build()
+        self.assertEqual(second["pages"]["rebuilt"], 0)
+
+        page = os.path.join(self.content, "about", "index.md")
+        write_file(page, "# About us")
+        third = self.state.build([page])
+        self.assertEqual(third["pages"]["rebuilt"], 1)
+        # Only static changes re-sync the static tree
+        self.assertIsNone(third["static"])
+
+    def test_new_page_refreshes_listing(self):
+        self.state.build()
+        page = os.path.join(self.content, "new", "index.md")
+        write_file(page, "# New")
+        result = self.state.build([os.path.dirname(page)])
+        self.assertEqual(result["pages"]["reasons"], {os.path.join("new", "index.html"): "new page"})
+        self.assertTrue(os.path.exists(os.path.join(self.public, "new", "index.html")))
+
+    def test_unchanged_source_keeps_its_hash(self):
+        self.state.build()
+        page = os.path.join(self.content, "index.md")
+        self.assertIn(page, self.state.hashes)
+        self.state.invalidate([page])
+        self.assertNotIn(page, self.state.hashes)
+
+    def test_precompress(self):
+        state = SiteState(self.content, self.static, self.state.template_path, self.public,
+                          precompress=True, gzip_min_size=0)
+        state.build()
+        page = os.path.join(self.content, "about", "index.md")
+        write_file(page, "# About us")
+        result = state.build([page])
+        self.assertEqual(result["precompress"]["compressed"], 1)
+        with gzip.open(os.path.join(self.public, "about", "index.html.gz"), 'rt') as f:
+            self.assertIn("About us", f.read())
+
+    def test_seed_from_initial_build(self):
+        # As main.py does for --daemon: a build, then a state that starts from it
+        disk_cache = ParseCache(os.path.join(self.tmp.name, "cache"))
+        generate_pages_recursive(self.content, self.state.template_path, self.public, "/",
+                                 incremental=True, parse_cache=disk_cache)
+        state = SiteState(self.content, self.static, self.state.template_path, self.public, parse_cache=disk_cache)
+        state.seed()
+        status = state.handle({"command": "status"})
+        self.assertEqual((status["pages"], status["parsed_trees"]), (2, 2))
+
+        page = os.path.join(self.content, "about", "index.md")
+        write_file(page, "# About us")
+        result = state.build([page])
+        self.assertIsNone(result["static"])
+        self.assertEqual(result["pages"]["rebuilt"], 1)
+
+    def test_failed_build_is_reported(self):
+        self.state.build()
+        page = os.path.join(self.content, "index.md")
+        write_file(page, "no title")
+        response = self.state.handle({"command": "build", "changed": [page]})
+        self.assertFalse(response["ok"])
+        self.assertIn("No header found", response["error"])
+
+
+class TestDaemonSocket(unittest.TestCase):
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, "content")
+            template = os.path.join(root, "template.html")
+            write_file(template, "{{ Content }}")
+            write_file(os.path.join(content, "index.md"), "# Home")
+            os.makedirs(os.path.join(root, "static"))
+            state = SiteState(content, os.path.join(root, "static"), template, os.path.join(root, "public"))
+            socket_path = os.path.join(root, "build.sock")
+
+            thread = threading.Thread(target=serve, args=(state, socket_path), daemon=True)
+            thread.start()
+            for _ in range(100):
+                if os.path.exists(socket_path):
+                    break
+                thread.join(0.01)
+
+            response = send_request({"command": "build"}, socket_path)
+            self.assertTrue(response["ok"])
+            self.assertEqual(response["pages"]["rebuilt"], 1)
+            self.assertIn("Generating page", response["log"])
+            self.assertEqual(send_request({"command": "status"}, socket_path)["builds"], 1)
+            self.assertFalse(send_request({"command": "nope"}, socket_path)["ok"])
+
+            # A client in another directory names a new page relative to where it runs
+            write_file(os.path.join(content, "new", "index.md"), "# New")
+            cwd = os.getcwd()
+            os.chdir(content)
+            try:
+                request = build_request(parse_args(["new"]))
+            finally:
+                os.chdir(cwd)
+            response = send_request(request, socket_path)
+            self.assertTrue(response["ok"])
+            self.assertEqual(response["pages"]["rebuilt"], 1)
+            self.assertTrue(os.path.exists(os.path.join(root, "public", "new", "index.html")))
+
+            send_request({"command": "shutdown"}, socket_path)
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+            self.assertFalse(os.path.exists(socket_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from block_markdown_converter import markdown_lines_to_html_node
+from block_memo import BlockMemo
+from dependencies import DependencyGraph, collect_references, link_target, locate_references, output_index
+from generate_content import generate_pages_recursive, parse_source
+from parse_cache import ParseCache
+from testutil import write_file
+
+
+class TestLinkTarget(unittest.TestCase):
+    def test_targets(self):
+        self.assertEqual(link_target("/contact", "index.html"), "contact/index.html")
+        self.assertEqual(link_target("/blog/tom/", "index.html"), "blog/tom/index.html")
+        self.assertEqual(link_target("/", "blog/tom/index.html"), "index.html")
+        self.assertEqual(link_target("/about.html#team", "index.html"), "about.html")
+        self.assertEqual(link_target("../majesty", "blog/tom/index.html"), "blog/majesty/index.html")
+        self.assertEqual(link_target("other", "blog/tom/index.html"), "blog/tom/other/index.html")
+
+    def test_external_and_anchors(self):
+        self.assertIsNone(link_target("https://example.com/x", "index.html"))
+        self.assertIsNone(link_target("//cdn.example.com/x", "index.html"))
+        self.assertIsNone(link_target("mailto:someone@example.com", "index.html"))
+        self.assertIsNone(link_target("#section", "index.html"))
+
+
+class TestReferenceCollection(unittest.TestCase):
+    md = "[home](/) and ![pic](/images/a.png)\n\n- [about](/about)"
+    expected = [("link", "/", 1), ("image", "/images/a.png", 1), ("link", "/about", 3)]
+
+    def test_collected_while_parsing(self):
+        with collect_references() as collector:
+            markdown_lines_to_html_node(self.md.split("\n"))
+        self.assertEqual(collector.references, self.expected)
+
+    def test_memo_hits_keep_references(self):
+        memo = BlockMemo()
+        markdown_lines_to_html_node(self.md.split("\n"), memo)
+        with collect_references() as collector:
+            markdown_lines_to_html_node(self.md.split("\n"), memo)
+        self.assertEqual(memo.hits, 2)
+        self.assertEqual(collector.references, self.expected)
+
+    def test_parse_cache_keeps_references(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ParseCache(tmp)
+            source = ("# Title\n\n" + self.md).encode()
+            parse_source(source, cache)
+            parsed, result = parse_source(source, cache)
+            self.assertEqual(result, "hit")
+            self.assertEqual(parsed[3], [(kind, url, line + 2) for kind, url, line in self.expected])
+
+    def test_lines_count_front_matter(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = "---\ntitle: x\n---\n\n- a\n- [b](/b)\n\n[b](/b) [c](/c)\nthen [b](/b)".encode()
+            parsed, _ = parse_source(source, ParseCache(tmp))
+        self.assertEqual(parsed[3], [("link", "/b", 6), ("link", "/b", 8), ("link", "/c", 8), ("link", "/b", 9)])
+
+    def test_locate_references(self):
+        lines = ["see [a](/a)", "and ![b](/b.png)", "and [a](/a)"]
+        self.assertEqual(
+            locate_references([("link", "/a"), ("image", "/b.png"), ("link", "/a"), ("link", "/gone")], lines, 10),
+            [("link", "/a", 10), ("image", "/b.png", 11), ("link", "/a", 12), ("link", "/gone", 12)],
+        )
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def test_graph(self):
+        graph = DependencyGraph()
+        graph.set_page("index.html", "index.md", ["/t.html"],
+                       [("link", "/about", 1), ("image", "/a.png", 2), ("link", "https://x.org", 2)])
+        graph.set_page("about/index.html", "about/index.md", ["/t.html"], [("link", "/", 1)])
+        self.assertEqual(graph.pages["index.html"]["links"], ["about/index.html"])
+        self.assertEqual(graph.pages_linking_to({"about/index.html"}), {"index.html": "about/index.html"})
+        self.assertEqual(graph.pages_using("images", "/a.png"), ["index.html"])
+        self.assertEqual(graph.pages_using("templates", "/t.html"), ["about/index.html", "index.html"])
+        graph.keep_only({"index.html"})
+        self.assertEqual(list(graph.pages), ["index.html"])
+
+    def test_broken_references(self):
+        graph = DependencyGraph()
+        graph.set_page("blog/tom/index.html", "blog/tom/index.md", [],
+                       [("link", "/", 1), ("link", "../majesty", 3), ("image", "/images/tom.png", 4),
+                        ("image", "/images/gone.png", 5), ("link", "https://x.org", 6), ("link", "#top", 7)])
+        outputs = output_index(
+            {"index.html": {}},
+            {"images/tom.png": {"size": 1, "hash": None, "output": "images/tom.1234abcd.png"}},
+        )
+        self.assertEqual(outputs, {"index.html", "images/tom.png", "images/tom.1234abcd.png"})
+        self.assertEqual(graph.broken_references(outputs), [
+            ("blog/tom/index.md", 3, "link", "../majesty"),
+            ("blog/tom/index.md", 5, "image", "/images/gone.png"),
+        ])
+
+
+class TestMinimalRebuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.public = os.path.join(self.tmp.name, "public")
+        write_file(self.template, "{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n[contact](/contact)")
+        write_file(os.path.join(self.content, "contact", "index.md"), "# Contact\n\n![me](/images/me.png)")
+        write_file(os.path.join(self.content, "other", "index.md"), "# Other")
+        self.build()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self):
+        return generate_pages_recursive(self.content, self.template, self.public, "/", incremental=True)
+
+    def test_nothing_changed(self):
+        stats = self.build()
+        self.assertEqual(stats["rebuilt"], 0)
+        self.assertEqual(stats["reasons"], {})
+
+    def test_broken_links_reported_from_skipped_pages(self):
+        stats = self.build()
+        self.assertEqual(stats["broken_links"], [(os.path.join("contact", "index.md"), 3, "image", "/images/me.png")])
+
+        shutil.rmtree(os.path.join(self.content, "contact"))
+        stats = self.build()
+        self.assertEqual(stats["broken_links"], [("index.md", 3, "link", "/contact")])
+
+    def test_renamed_page_rebuilds_pages_linking_to_it(self):
+        shutil.move(os.path.join(self.content, "contact"), os.path.join(self.content, "contact-us"))
+        stats = self.build()
+        self.assertEqual(stats["reasons"], {
+            "index.html": "links to removed page contact/index.html",
+            os.path.join("contact-us", "index.html"): "new page",
+        })
+
+    def test_template_change_rebuilds_every_page(self):
+        write_file(self.template, "<main>{{ Content }}</main>")
+        stats = self.build()
+        self.assertEqual(set(stats["reasons"].values()), {"template changed"})
+        self.assertEqual(stats["rebuilt"], 3)
+
+    def test_source_change_rebuilds_only_that_page(self):
+        write_file(os.path.join(self.content, "other", "index.md"), "# Other\n\nmore")
+        stats = self.build()
+        self.assertEqual(stats["reasons"], {os.path.join("other", "index.html"): "source changed"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+
+from fingerprint import fingerprint_path, is_fingerprinted, rewrite_asset_references, rewrite_css_references
+
+ASSETS = {"/index.css": "/index.3f9a1c2b.css", "/images/a.png": "/images/a.0123abcd.png"}
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_fingerprint_path(self):
+        self.assertEqual(fingerprint_path("index.css", "3f9a1c2b" * 8), "index.3f9a1c2b.css")
+        self.assertEqual(fingerprint_path("images/a.b.png", "0123abcd99"), "images/a.b.0123abcd.png")
+
+    def test_is_fingerprinted(self):
+        self.assertTrue(is_fingerprinted("images/a.PNG"))
+        self.assertFalse(is_fingerprinted("robots.txt"))
+        self.assertFalse(is_fingerprinted("favicon.ico"))
+        self.assertFalse(is_fingerprinted(".well-known.css"))
+
+    def test_rewrite_asset_references(self):
+        html = '<link href="/index.css?v=2" /><img src="/images/a.png"><a href="/images/b.png">b</a>'
+        self.assertEqual(
+            rewrite_asset_references(html, ASSETS),
+            '<link href="/index.3f9a1c2b.css?v=2" /><img src="/images/a.0123abcd.png"><a href="/images/b.png">b</a>',
+        )
+
+    def test_rewrite_css_references(self):
+        css = "a{background:url(/images/a.png)}b{background:url( '/images/a.png' )}c{background:url(a.png)}"
+        self.assertEqual(
+            rewrite_css_references(css, ASSETS),
+            "a{background:url(/images/a.0123abcd.png)}b{background:url( '/images/a.0123abcd.png' )}"
+            "c{background:url(a.png)}",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,19 @@
+import multiprocessing
+import os
+import tempfile
 import unittest
 
-from generate_content import extract_title
+from dependencies import configure_word_collection
+from generate_content import (
+    collect_pages,
+    extract_title,
+    generate_page,
+    generate_pages_parallel,
+    generate_pages_recursive,
+    split_front_matter_lines,
+)
+from template import configure_assets, configure_minify
+from testutil import write_file
 
 
 class TestExtractTitle(unittest.TestCase):
@@ -46,5 +59,180 @@ no title
             pass
 
 
+def split_front_matter(markdown):
+    variables, lines, _ = split_front_matter_lines(iter(markdown.split("\n")))
+    return variables, "\n".join(lines)
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_no_front_matter(self):
+        self.assertEqual(split_front_matter("# Title"), ({}, "# Title"))
+
+    def test_front_matter(self):
+        variables, body = split_front_matter(
+            '---\nauthor: Tolkien\nsubtitle: "A: B"\n---\n# Title\n'
+        )
+        self.assertEqual(variables, {"author": "Tolkien", "subtitle": "A: B"})
+        self.assertEqual(body, "# Title\n")
+
+    def test_unclosed_front_matter(self):
+        markdown = "---\nauthor: Tolkien\n# Title"
+        self.assertEqual(split_front_matter(markdown), ({}, markdown))
+
+    def test_invalid_line(self):
+        with self.assertRaises(ValueError):
+            split_front_matter("---\nnot a pair\n---\n# Title")
+
+
+class TestGeneratePagesIncremental(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "blog", "post", "index.md"), "# Post")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, basepath="/"):
+        return generate_pages_recursive(
+            self.content, self.template, self.public, basepath, incremental=True
+        )
+
+    def test_skips_unchanged(self):
+        self.assertEqual(self.build()["rebuilt"], 2)
+        stats = self.build()
+        self.assertEqual(stats["rebuilt"], 0)
+        self.assertEqual(stats["skipped"], 2)
+
+    def test_rebuilds_changed_source(self):
+        self.build()
+        write_file(os.path.join(self.content, "index.md"), "# Home again")
+        stats = self.build()
+        self.assertEqual(stats["rebuilt"], 1)
+        self.assertEqual(stats["skipped"], 1)
+
+    def test_rebuilds_on_template_or_basepath_change(self):
+        self.build()
+        self.assertEqual(self.build("/site/")["rebuilt"], 2)
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.build("/site/")["rebuilt"], 2)
+
+    def test_layout_change_rebuilds_its_pages(self):
+        layout = os.path.join(self.content, "blog", "layout.html")
+        write_file(layout, "<main>{{ Content }}</main>")
+        self.build()
+        write_file(layout, "<section>{{ Content }}</section>")
+        os.utime(layout, (0, 0))
+        stats = self.build()
+        self.assertEqual(stats["rebuilt"], 1)
+        with open(os.path.join(self.public, "blog", "post", "index.html")) as f:
+            self.assertTrue(f.read().startswith("<section>"))
+
+    def test_removes_deleted_source(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        stats = self.build()
+        self.assertEqual(stats["removed"], 1)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.public, "blog", "post", "index.html"))
+        )
+
+
+class TestGeneratePage(unittest.TestCase):
+    def test_front_matter_variables(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "index.md")
+            template = os.path.join(tmp, "template.html")
+            dest = os.path.join(tmp, "out", "index.html")
+            write_file(source, "---\nauthor: Tolkien\n---\n# Home\n\nHello")
+            write_file(template, "<title>{{ Title }}</title><p>{{ author }}</p>{{ Content }}")
+            generate_page(source, template, dest, "/")
+            with open(dest) as f:
+                self.assertEqual(
+                    f.read(),
+                    "<title>Home</title><p>Tolkien</p><div><h1>Home</h1><p>Hello</p></div>",
+                )
+
+
+class TestGeneratePagesParallel(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        write_file(self.template, '<title>{{ Title }}</title><a href="/x">{{ Content }}</a>')
+        for i in range(6):
+            write_file(
+                os.path.join(self.content, f"page{i}", "index.md"),
+                f"# Page {i}\n\n" + "Some **bold** and _italic_ text.\n\n" * (i + 1),
+            )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_tree(self, root):
+        result = {}
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(".html"):
+                    path = os.path.join(dirpath, filename)
+                    with open(path, 'rb') as f:
+                        result[os.path.relpath(path, root)] = f.read()
+        return result
+
+    def test_matches_serial_output(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        parallel = os.path.join(self.tmp.name, "parallel")
+        generate_pages_recursive(self.content, self.template, serial, "/site/")
+        stats = generate_pages_recursive(self.content, self.template, parallel, "/site/", jobs=3)
+        self.assertEqual(stats["rebuilt"], 6)
+        self.assertEqual(self.read_tree(serial), self.read_tree(parallel))
+
+    def build_spawned(self, dest):
+        # Spawned workers start from a fresh import, so they only see the settings handed to them
+        pages = [(source, self.template, dest_path) for source, dest_path in collect_pages(self.content, dest)]
+        return generate_pages_parallel(pages, "/", 2, mp_context=multiprocessing.get_context("spawn"))
+
+    def test_spawned_workers_minify(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        spawned = os.path.join(self.tmp.name, "spawned")
+        write_file(self.template, "<html>\n  <title>{{ Title }}</title>\n  <main>\n    {{ Content }}\n  </main>\n</html>")
+        configure_minify(True)
+        self.addCleanup(configure_minify, False)
+        generate_pages_recursive(self.content, self.template, serial, "/")
+        self.build_spawned(spawned)
+        self.assertEqual(self.read_tree(serial), self.read_tree(spawned))
+
+    def test_spawned_workers_link_fingerprinted_assets(self):
+        write_file(self.template, '<link href="/index.css">{{ Content }}')
+        serial = os.path.join(self.tmp.name, "serial")
+        spawned = os.path.join(self.tmp.name, "spawned")
+        configure_assets({"/index.css": "/index.0123abcd.css"})
+        self.addCleanup(configure_assets, None)
+        generate_pages_recursive(self.content, self.template, serial, "/")
+        self.build_spawned(spawned)
+        self.assertEqual(self.read_tree(serial), self.read_tree(spawned))
+        self.assertIn(b"/index.0123abcd.css", self.read_tree(spawned)[os.path.join("page0", "index.html")])
+
+    def test_spawned_workers_collect_words(self):
+        configure_word_collection(True)
+        self.addCleanup(configure_word_collection, False)
+        results = self.build_spawned(os.path.join(self.tmp.name, "spawned"))
+        self.assertTrue(results)
+        for result in results:
+            self.assertIsNotNone(result["words"], result["from_path"])
+
+    def test_error_names_page(self):
+        bad_page = os.path.join(self.content, "bad", "index.md")
+        write_file(bad_page, "no title here")
+        public = os.path.join(self.tmp.name, "public")
+        with self.assertRaises(RuntimeError) as cm:
+            generate_pages_recursive(self.content, self.template, public, "/", jobs=2)
+        self.assertIn(bad_page, str(cm.exception))
+
+
 if __name__ == "__main__":
     unittest.main()
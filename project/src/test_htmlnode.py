@@ -1,5 +1,7 @@
+import io
 import unittest
-from htmlnode import LeafNode, ParentNode, HTMLNode
+from htmlnode import LeafNode, ParentNode, HTMLNode, RawHTML
+from minify import Minifier
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -110,5 +112,75 @@ class TestHTMLNode(unittest.TestCase):
         )
 
 
+class TestStreamingHTML(unittest.TestCase):
+    def make_tree(self):
+        return ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode("b", "Bold"), LeafNode(None, " text")]),
+                ParentNode("ul", [ParentNode("li", [LeafNode("a", "x", {"href": "/x"})])]),
+            ],
+            {"class": "page"},
+        )
+
+    def test_iter_html_matches_to_html(self):
+        node = self.make_tree()
+        self.assertEqual(
+            "".join(node.iter_html()),
+            '<div class="page"><p><b>Bold</b> text</p><ul><li><a href="/x">x</a></li></ul></div>',
+        )
+        self.assertEqual("".join(node.iter_html()), node.to_html())
+
+    def test_write_html(self):
+        node = self.make_tree()
+        for buffer_size in (1, 8, 1 << 16):
+            stream = io.StringIO()
+            node.write_html(stream, buffer_size)
+            self.assertEqual(stream.getvalue(), node.to_html())
+
+    def test_nested_tree(self):
+        node = LeafNode(None, "x")
+        for _ in range(100):
+            node = ParentNode("span", [node])
+        self.assertEqual(node.to_html(), "<span>" * 100 + "x" + "</span>" * 100)
+
+    def test_nested_missing_children(self):
+        node = ParentNode("div", [ParentNode("p", None)])
+        with self.assertRaises(ValueError):
+            node.to_html()
+
+
+class TestMinifiedHTML(unittest.TestCase):
+    def test_whitespace_and_void_elements(self):
+        node = ParentNode("p", [
+            LeafNode(None, "Some  text\n"),
+            LeafNode("b", "bold  words"),
+            LeafNode("img", "", {"src": "/a.png", "alt": "a"}),
+        ])
+        minifier = Minifier()
+        self.assertEqual(
+            node.to_minified_html(minifier),
+            '<p>Some text <b>bold words</b><img src="/a.png" alt="a"></p>',
+        )
+        self.assertEqual(minifier.saved, len(node.to_html()) - len(node.to_minified_html(Minifier())))
+
+    def test_pre_kept(self):
+        node = ParentNode("div", [ParentNode("pre", [LeafNode("code", "a  =  1\n\n  b")])])
+        self.assertEqual(node.to_minified_html(Minifier()), node.to_html())
+
+    def test_raw_html_written_as_is(self):
+        node = ParentNode("div", [RawHTML("<pre><code>a\n  b</code></pre>", 7), LeafNode(None, "x  y")])
+        minifier = Minifier()
+        self.assertEqual(node.to_minified_html(minifier), "<div><pre><code>a\n  b</code></pre>x y</div>")
+        self.assertEqual(minifier.saved, 8)
+
+    def test_write_html_minified(self):
+        node = ParentNode("div", [ParentNode("p", [LeafNode(None, "a  b")]) for _ in range(10)])
+        for buffer_size in (1, 8, 1 << 16):
+            stream = io.StringIO()
+            node.write_html(stream, buffer_size, minifier=Minifier())
+            self.assertEqual(stream.getvalue(), node.to_minified_html(Minifier()))
+
+
 if __name__ == "__main__":
     unittest.main()
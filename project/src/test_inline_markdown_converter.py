@@ -6,6 +6,8 @@ from inline_markdown_converter import (
     extract_markdown_links,
     extract_markdown_images,
     text_to_textnodes,
+    text_to_textnodes_legacy,
+    tokenize_inline,
 )
 
 from textnode import TextNode, TextType
@@ -185,5 +187,41 @@ class TestTextToTextNodes(unittest.TestCase):
         expected = [TextNode("Link text", TextType.LINK, "link_url")]
         self.assertEqual(text_to_textnodes(text), expected)
 
+
+class TestTokenizeInline(unittest.TestCase):
+    def assertMatchesLegacy(self, text):
+        self.assertListEqual(tokenize_inline(text), text_to_textnodes_legacy(text))
+
+    def test_everything(self):
+        self.assertMatchesLegacy(
+            "This is **text** with an _italic_ word and a `code block` and an "
+            "![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
+        )
+
+    def test_url_not_formatted(self):
+        self.assertListEqual(
+            tokenize_inline("see [a_b](/c_d) _now_"),
+            [
+                TextNode("see ", TextType.TEXT),
+                TextNode("a_b", TextType.LINK, "/c_d"),
+                TextNode(" ", TextType.TEXT),
+                TextNode("now", TextType.ITALIC),
+            ],
+        )
+
+    def test_precedence(self):
+        self.assertMatchesLegacy("**bold with _underscore** and `x`")
+        self.assertMatchesLegacy("_italic with `tick_ and **bold**")
+        self.assertMatchesLegacy("***triple*** and ****")
+        self.assertMatchesLegacy("")
+
+    def test_unclosed(self):
+        for text in ["**open", "_open", "`open", "_a **b** c_", "`a _b` c_", "**a [l](u) b**"]:
+            with self.assertRaises(ValueError):
+                tokenize_inline(text)
+            with self.assertRaises(ValueError):
+                text_to_textnodes_legacy(text)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
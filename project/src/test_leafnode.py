@@ -7,6 +7,17 @@ class TestLeafNode(unittest.TestCase):
         node = LeafNode("p", "Hello, world!")
         self.assertEqual(node.to_html(), "<p>Hello, world!</p>")
 
+    def test_empty_props_are_shared(self):
+        first = LeafNode("p", "one")
+        second = LeafNode("p", "two")
+        self.assertIs(first.props, second.props)
+        with self.assertRaises(TypeError):
+            first.props["class"] = "x"
+
+    def test_props(self):
+        node = LeafNode("a", "here", {"href": "/x"})
+        self.assertEqual(node.to_html(), '<a href="/x">here</a>')
+
     # def test_with_tag_no_props(self):
     #     node = LeafNode("p", "Hello, world!", {})
     #     self.assertEqual(node.to_html(),'<p>Hello, world!</p>')
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+
+from manifest import (
+    explain_rebuild,
+    load_manifest,
+    make_entry,
+    remove_stale_outputs,
+    save_manifest,
+)
+
+
+class TestManifest(unittest.TestCase):
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pages = {"index.html": make_entry("index.md", "abc", "def", "/")}
+            save_manifest(tmp, pages)
+            self.assertEqual(load_manifest(tmp), pages)
+
+    def test_missing_manifest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(load_manifest(tmp), {})
+
+    def test_corrupt_manifest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, ".build-manifest.json"), 'w') as f:
+                f.write("{not json")
+            self.assertEqual(load_manifest(tmp), {})
+
+    def test_explain_rebuild(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            dest_path = os.path.join(tmp, "index.html")
+            entry = make_entry("index.md", "abc", "def", "/")
+            self.assertEqual(explain_rebuild(entry, entry, dest_path), "output missing")
+            open(dest_path, 'w').close()
+            self.assertIsNone(explain_rebuild(entry, entry, dest_path))
+            changed = make_entry("index.md", "abc", "def", "/site/")
+            self.assertEqual(explain_rebuild(entry, changed, dest_path), "basepath changed")
+            self.assertEqual(explain_rebuild(None, entry, dest_path), "new page")
+
+    def test_remove_stale_outputs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "blog", "old"))
+            stale = os.path.join(tmp, "blog", "old", "index.html")
+            open(stale, 'w').close()
+            old_pages = {"blog/old/index.html": make_entry("blog/old/index.md", "a", "b", "/")}
+            removed = remove_stale_outputs(tmp, old_pages, {})
+            self.assertEqual(removed, 1)
+            self.assertFalse(os.path.exists(stale))
+            self.assertFalse(os.path.exists(os.path.join(tmp, "blog")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from minify import Minifier, minify_css, minify_markup
+
+
+class TestMinifyMarkup(unittest.TestCase):
+    def test_whitespace_between_block_tags_dropped(self):
+        text = "<!doctype html>\n<html>\n  <head>\n    <title>Hi</title>\n  </head>\n</html>\n"
+        self.assertEqual(minify_markup(text), "<!doctype html><html><head><title>Hi</title></head></html>")
+
+    def test_inline_whitespace_kept_as_one_space(self):
+        self.assertEqual(minify_markup("<p>a  <b>x</b>\n <i>y</i></p>"), "<p>a <b>x</b> <i>y</i></p>")
+
+    def test_preserved_elements(self):
+        text = "<div>\n<pre>  a\n  b</pre>\n<script>if (a  <  b) {}</script>\n</div>"
+        self.assertEqual(minify_markup(text), "<div><pre>  a\n  b</pre><script>if (a  <  b) {}</script></div>")
+
+    def test_attributes_kept(self):
+        text = '<meta content="a  b" />\n<a href="'
+        self.assertEqual(minify_markup(text), '<meta content="a  b" /><a href="')
+
+
+class TestMinifyCSS(unittest.TestCase):
+    def test_rules(self):
+        css = "/* theme */\nbody {\n  color: #fff;\n  margin: 0 auto;\n}\n\nh1,\nh2 > a {\n  color: red !important;\n}\n"
+        self.assertEqual(minify_css(css), "body{color:#fff;margin:0 auto}h1,h2>a{color:red!important}")
+
+    def test_strings_urls_and_calc(self):
+        css = 'a { content: "x  ;}" ; background: url( a b.png ) ; width: calc(1px + 2px) }'
+        self.assertEqual(minify_css(css), 'a{content:"x  ;}";background:url( a b.png );width:calc(1px + 2px)}')
+
+    def test_selectors_and_media_queries(self):
+        css = "@media (max-width: 600px) and (min-width: 1px) { div :hover { top: 0 } }"
+        self.assertEqual(minify_css(css), "@media (max-width:600px) and (min-width:1px){div :hover{top:0}}")
+
+    def test_license_comment_kept(self):
+        self.assertEqual(minify_css("/*! MIT */\na { }"), "/*! MIT */a{}")
+
+
+class TestMinifier(unittest.TestCase):
+    def test_counts_savings(self):
+        minifier = Minifier()
+        self.assertEqual(minifier.text("a \n\t b\nc"), "a b c")
+        self.assertEqual(minifier.saved, 3)
+
+    def test_non_breaking_space_kept(self):
+        minifier = Minifier()
+        self.assertEqual(minifier.text("a  b"), "a  b")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+from block_markdown_converter import markdown_to_html_node
+from htmlnode import HTMLNode, LeafNode, ParentNode
+from node_arena import NodeArena
+from textnode import TextNode, TextType
+
+
+class TestNodeArena(unittest.TestCase):
+    def test_round_trip(self):
+        md = """# Title
+
+Some **bold** and a [link](/here) with ![img](/a.png)
+
+- one
+- _two_
+
+```
+code here
+```
+"""
+        node = markdown_to_html_node(md)
+        arena = NodeArena()
+        root = arena.add(node)
+        self.assertEqual(arena.to_html(root), node.to_html())
+        self.assertEqual(arena.to_html_node(root).to_html(), node.to_html())
+
+    def test_children_are_contiguous(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "a"), LeafNode("b", "b")]),
+            LeafNode("i", "c", {"class": "x"}),
+        ])
+        arena = NodeArena()
+        arena.add(node)
+        self.assertEqual(len(arena), 5)
+        self.assertEqual([arena.tags[i] for i in arena.children(0)], ["p", "i"])
+        self.assertEqual([arena.values[i] for i in arena.children(1)], ["a", "b"])
+        self.assertTrue(arena.is_leaf(2))
+        self.assertEqual(arena.to_html(), '<div><p>a<b>b</b></p><i class="x">c</i></div>')
+
+    def test_several_trees(self):
+        arena = NodeArena()
+        first = arena.add(ParentNode("p", [LeafNode(None, "one")]))
+        second = arena.add(ParentNode("p", [LeafNode(None, "two")]))
+        self.assertEqual(arena.to_html(first), "<p>one</p>")
+        self.assertEqual(arena.to_html(second), "<p>two</p>")
+
+    def test_empty_parent(self):
+        arena = NodeArena()
+        arena.add(ParentNode("div", []))
+        self.assertEqual(arena.to_html(), "<div></div>")
+
+    def test_invalid_nodes(self):
+        with self.assertRaises(ValueError):
+            NodeArena().add(ParentNode("div", None))
+        with self.assertRaises(ValueError):
+            NodeArena().add(HTMLNode("div", "x"))
+
+
+class TestCompactNodes(unittest.TestCase):
+    def test_nodes_have_no_dict(self):
+        for node in (
+            TextNode("x", TextType.TEXT),
+            HTMLNode("p", "x"),
+            LeafNode("p", "x"),
+            ParentNode("p", []),
+        ):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+
+if __name__ == "__main__":
+    unittest.main()
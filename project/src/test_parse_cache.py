@@ -0,0 +1,112 @@
+import os
+import tempfile
+import time
+import unittest
+
+from block_markdown_converter import markdown_to_html_node
+from generate_content import generate_pages_recursive, parse_page_cached, parse_source
+from htmlnode import LeafNode, ParentNode, RawHTML
+from manifest import hash_bytes
+from parse_cache import MemoryParseCache, ParseCache, decode_tree, encode_tree
+from testutil import write_file
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(os.path.join(self.tmp.name, "cache"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_encode_round_trip(self):
+        node = markdown_to_html_node(
+            "# Title\n\nSome **bold** [link](/x) ![img](/a.png)\n\n- one\n- two\n\n```\ncode\n```"
+        )
+        self.assertEqual(decode_tree(encode_tree(node)).to_html(), node.to_html())
+
+    def test_encode_raw_html(self):
+        node = ParentNode("div", [RawHTML("<p>a</p>", 3), LeafNode("b", "x")])
+        decoded = decode_tree(encode_tree(node))
+        self.assertIsInstance(decoded.children[0], RawHTML)
+        self.assertEqual(decoded.children[0].saved, 3)
+        self.assertEqual(decoded.to_html(), node.to_html())
+
+    def test_minified_entries_kept_apart(self):
+        source = b"# Home\n\nHello"
+        self.assertNotEqual(self.cache.key(hash_bytes(source)), self.cache.key(hash_bytes(source), minify=True))
+
+    def test_miss_then_hit(self):
+        source = b"---\nauthor: Tolkien\n---\n# Home\r\n\r\nHello"
+        parsed, result = parse_source(source, self.cache)
+        self.assertEqual(result, "miss")
+        cached, result = parse_source(source, self.cache)
+        self.assertEqual(result, "hit")
+        self.assertEqual(cached[0], {"author": "Tolkien"})
+        self.assertEqual(cached[1], "Home")
+        self.assertEqual(cached[2].to_html(), parsed[2].to_html())
+
+    def test_hit_does_not_open_source(self):
+        source = b"# Home\n\nHello"
+        parse_source(source, self.cache)
+
+        def open_source():
+            raise AssertionError("source opened on a hit")
+
+        parsed, result = parse_page_cached(hash_bytes(source), open_source, self.cache)
+        self.assertEqual(result, "hit")
+        self.assertEqual(parsed[1], "Home")
+
+    def test_memory_cache_in_front_of_disk(self):
+        source = b"# Home\n\nHello"
+        parse_source(source, MemoryParseCache(backing=self.cache))
+        memory = MemoryParseCache(backing=self.cache)
+        _, result = parse_source(source, memory)
+        self.assertEqual(result, "hit")
+        self.assertEqual(len(memory.entries), 1)
+
+    def test_corrupt_entry_is_a_miss(self):
+        source = b"# Home"
+        key = self.cache.key(hash_bytes(source))
+        os.makedirs(self.cache.cache_dir)
+        with open(self.cache.entry_path(key), 'wb') as f:
+            f.write(b"not marshal")
+        _, result = parse_source(source, self.cache)
+        self.assertEqual(result, "miss")
+        _, result = parse_source(source, self.cache)
+        self.assertEqual(result, "hit")
+
+    def test_prune_evicts_least_recently_used(self):
+        for i in range(4):
+            parse_source(f"# Page {i}\n\n".encode() + b"text " * 200, self.cache)
+        paths = [self.cache.entry_path(self.cache.key(hash_bytes(f"# Page {i}\n\n".encode() + b"text " * 200)))
+                 for i in range(4)]
+        now = time.time()
+        for age, path in enumerate(reversed(paths)):
+            os.utime(path, (now - age * 10, now - age * 10))
+        entry_size = os.path.getsize(paths[0])
+        self.cache.max_bytes = entry_size * 2
+        self.assertEqual(self.cache.prune(), 2)
+        self.assertEqual([os.path.exists(path) for path in paths], [False, False, True, True])
+
+
+class TestGeneratePagesWithParseCache(unittest.TestCase):
+    def test_basepath_change_hits_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            template = os.path.join(tmp, "template.html")
+            cache = ParseCache(os.path.join(tmp, "cache"))
+            write_file(template, "<title>{{ Title }}</title>{{ Content }}")
+            write_file(os.path.join(content, "index.md"), "# Home\n\n[link](/about)")
+            write_file(os.path.join(content, "about", "index.md"), "# About")
+
+            first = generate_pages_recursive(content, template, os.path.join(tmp, "a"), "/", parse_cache=cache)
+            second = generate_pages_recursive(content, template, os.path.join(tmp, "b"), "/site/", parse_cache=cache)
+            self.assertEqual((first["parse_cache_hits"], first["parse_cache_misses"]), (0, 2))
+            self.assertEqual((second["parse_cache_hits"], second["parse_cache_misses"]), (2, 0))
+            with open(os.path.join(tmp, "b", "index.html")) as f:
+                self.assertEqual(f.read(), '<title>Home</title><div><h1>Home</h1><p><a href="/site/about">link</a></p></div>')
+
+
+if __name__ == "__main__":
+    unittest.main()
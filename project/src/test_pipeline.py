@@ -0,0 +1,85 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from generate_content import generate_pages_recursive
+from pipeline import run_pipeline
+from testutil import write_file
+
+
+class TestRunPipeline(unittest.TestCase):
+    def test_every_item_flows_through(self):
+        written = {}
+        lock = threading.Lock()
+
+        def write(item, output):
+            with lock:
+                written[item] = output
+
+        results, utilization = run_pipeline(
+            range(50), lambda item: item * 2, lambda item, data: (data + 1, item), write,
+            readers=3, writers=2, queue_size=2,
+        )
+        self.assertEqual(sorted(results), list(range(50)))
+        self.assertEqual(written, {item: item * 2 + 1 for item in range(50)})
+        self.assertEqual(set(utilization), {"read", "process", "write"})
+        for share in utilization.values():
+            self.assertGreaterEqual(share, 0.0)
+            self.assertLessEqual(share, 1.0)
+
+    def test_errors_are_raised_from_each_stage(self):
+        def fail_on(bad):
+            def stage(item, *args):
+                if item == bad:
+                    raise ValueError(f"bad item {item}")
+                return (item, item) if args else item
+            return stage
+
+        ok = lambda item, *args: (item, item) if args else item
+        for read, process, write in (
+            (fail_on(7), ok, ok),
+            (ok, fail_on(7), ok),
+            (ok, ok, fail_on(7)),
+        ):
+            with self.assertRaises(ValueError):
+                run_pipeline(range(20), read, process, write, queue_size=1)
+
+    def test_empty(self):
+        self.assertEqual(run_pipeline([], None, None, None)[0], [])
+
+
+class TestGeneratePagesPipelined(unittest.TestCase):
+    def test_matches_serial_output(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            template = os.path.join(tmp, "template.html")
+            write_file(template, '<title>{{ Title }}</title><a href="/x">{{ Content }}</a>')
+            for i in range(8):
+                write_file(os.path.join(content, f"page{i}", "index.md"), f"# Page {i}\n\n**bold** {i}")
+            serial = os.path.join(tmp, "serial")
+            pipelined = os.path.join(tmp, "pipelined")
+            generate_pages_recursive(content, template, serial, "/site/")
+            stats = generate_pages_recursive(content, template, pipelined, "/site/", pipeline=True)
+            self.assertEqual(stats["rebuilt"], 8)
+            self.assertIn("pipeline_utilization", stats)
+            for i in range(8):
+                rel_path = os.path.join(f"page{i}", "index.html")
+                with open(os.path.join(serial, rel_path)) as a, open(os.path.join(pipelined, rel_path)) as b:
+                    self.assertEqual(a.read(), b.read())
+
+    def test_error_names_page(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            template = os.path.join(tmp, "template.html")
+            write_file(template, "{{ Content }}")
+            write_file(os.path.join(content, "good", "index.md"), "# Good")
+            bad_page = os.path.join(content, "bad", "index.md")
+            write_file(bad_page, "no title here")
+            with self.assertRaises(RuntimeError) as cm:
+                generate_pages_recursive(content, template, os.path.join(tmp, "public"), "/", pipeline=True)
+            self.assertIn(bad_page, str(cm.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+
+from png_optimize import PNG_SIGNATURE, PNGOptimizer, chunk_bytes, optimize_png, read_chunks, unfilter_rows
+
+
+def make_png(rows, color_type=2, channels=3, extra_chunks=(), filter_type=0, level=1):
+    # A non-interlaced 8-bit PNG of the given raw rows, all written with one filter type
+    height = len(rows)
+    width = len(rows[0]) // channels
+    filtered = bytearray()
+    previous = bytes(len(rows[0]))
+    for row in rows:
+        filtered.append(filter_type)
+        if filter_type == 2:
+            filtered += bytes((a - b) & 0xff for a, b in zip(row, previous))
+        else:
+            filtered += row
+        previous = row
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    chunks = [chunk_bytes(b"IHDR", header)]
+    chunks.extend(chunk_bytes(chunk_type, body) for chunk_type, body in extra_chunks)
+    chunks.append(chunk_bytes(b"IDAT", zlib.compress(bytes(filtered), level)))
+    chunks.append(chunk_bytes(b"IEND", b""))
+    return PNG_SIGNATURE + b"".join(chunks)
+
+
+def decode_rows(data):
+    chunks = read_chunks(data)
+    width, height, _, color_type, _, _, _ = struct.unpack(">IIBBBBB", chunks[0][1])
+    channels = {2: 3, 6: 4}[color_type]
+    filtered = zlib.decompress(b"".join(body for chunk_type, body in chunks if chunk_type == b"IDAT"))
+    return unfilter_rows(filtered, width * channels, height, channels)
+
+
+def gradient(width, height):
+    return [bytes((x * 7 + y * 3 + c * 50) & 0xff for x in range(width) for c in range(3)) for y in range(height)]
+
+
+class TestOptimizePNG(unittest.TestCase):
+    def test_smaller_and_lossless(self):
+        rows = gradient(40, 30)
+        data = make_png(rows)
+        optimized = optimize_png(data)
+        self.assertLess(len(optimized), len(data))
+        self.assertEqual(decode_rows(optimized), rows)
+
+    def test_unfilter_all_filter_types(self):
+        rows = gradient(16, 8)
+        for filter_type in (0, 2):
+            self.assertEqual(decode_rows(make_png(rows, filter_type=filter_type)), rows)
+        # The optimizer's own output mixes all five filter types
+        rgba = [bytes((x * 13 + y * y * 5 + c * 31) & 0xff for x in range(17) for c in range(4)) for y in range(9)]
+        self.assertEqual(decode_rows(optimize_png(make_png(rgba, color_type=6, channels=4))), rgba)
+
+    def test_metadata_dropped_and_transparency_kept(self):
+        data = make_png(gradient(20, 20), extra_chunks=[
+            (b"tEXt", b"Software\x00Some Editor"),
+            (b"pHYs", struct.pack(">IIB", 2835, 2835, 1)),
+            (b"tRNS", b"\x00\x00\x00\x00\x00\x00"),
+        ])
+        chunk_types = [chunk_type for chunk_type, _ in read_chunks(optimize_png(data))]
+        self.assertEqual(chunk_types, [b"IHDR", b"tRNS", b"IDAT", b"IEND"])
+
+    def test_original_kept_when_not_smaller(self):
+        data = optimize_png(make_png(gradient(20, 20)))
+        self.assertIs(optimize_png(data), data)
+
+    def test_animated_png_left_alone(self):
+        data = make_png(gradient(8, 8), extra_chunks=[(b"acTL", struct.pack(">II", 1, 0))])
+        self.assertIs(optimize_png(data), data)
+
+    def test_bad_crc(self):
+        data = bytearray(make_png(gradient(4, 4)))
+        data[-5] ^= 0xff
+        with self.assertRaises(ValueError):
+            optimize_png(bytes(data))
+
+
+class TestPNGOptimizer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, "images")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cached_by_source_hash(self):
+        data = make_png(gradient(30, 30))
+        optimized = PNGOptimizer(self.cache_dir).optimize(data)
+        self.assertLess(len(optimized), len(data))
+
+        optimizer = PNGOptimizer(self.cache_dir)
+        self.assertEqual(optimizer.optimize(data), optimized)
+        self.assertEqual((optimizer.optimized, optimizer.cache_hits), (0, 1))
+        self.assertEqual(optimizer.bytes_saved, len(data) - len(optimized))
+
+    def test_unreadable_file_kept(self):
+        optimizer = PNGOptimizer(self.cache_dir)
+        self.assertEqual(optimizer.optimize(b"not a png"), b"not a png")
+        self.assertEqual(optimizer.optimize(b"not a png"), b"not a png")
+        self.assertEqual((optimizer.optimized, optimizer.cache_hits, optimizer.bytes_saved), (1, 1, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from generate_content import generate_pages_recursive
+from precompress import Precompressor, compress_file, is_compressible, remove_precompressed
+from testutil import write_file
+
+
+class TestPrecompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_is_compressible(self):
+        self.assertTrue(is_compressible("a/index.html"))
+        self.assertTrue(is_compressible("a/STYLE.CSS"))
+        self.assertFalse(is_compressible("a/image.png"))
+        self.assertFalse(is_compressible("a/.build-manifest.json"))
+
+    def test_compress_and_skip_current(self):
+        path = os.path.join(self.root, "index.html")
+        write_file(path, "<p>hello</p>" * 200)
+        outcome, bytes_in, bytes_out, _ = compress_file(path, min_size=10)
+        self.assertEqual(outcome, "compressed")
+        self.assertEqual(bytes_in, os.path.getsize(path))
+        self.assertLess(bytes_out, bytes_in)
+        with gzip.open(path + ".gz", 'rt') as f:
+            self.assertEqual(f.read(), "<p>hello</p>" * 200)
+
+        self.assertEqual(compress_file(path, min_size=10)[0], "current")
+
+    def test_output_is_reproducible(self):
+        path = os.path.join(self.root, "index.html")
+        write_file(path, "<p>hello</p>" * 200)
+        compress_file(path, min_size=10)
+        with open(path + ".gz", 'rb') as f:
+            first = f.read()
+        os.remove(path + ".gz")
+        compress_file(path, min_size=10)
+        with open(path + ".gz", 'rb') as f:
+            self.assertEqual(f.read(), first)
+
+    def test_small_file_removes_stale_sibling(self):
+        path = os.path.join(self.root, "index.html")
+        write_file(path, "<p>hello</p>" * 200)
+        compress_file(path, min_size=10)
+        write_file(path, "<p>hi</p>")
+        self.assertEqual(compress_file(path, min_size=100)[0], "small")
+        self.assertFalse(os.path.exists(path + ".gz"))
+
+    def test_submit_tree_removes_orphans(self):
+        page = os.path.join(self.root, "blog", "index.html")
+        write_file(page, "<p>hello</p>" * 200)
+        write_file(os.path.join(self.root, "gone.html.gz"), "stale")
+        write_file(os.path.join(self.root, "archive.tar.gz"), "kept")
+
+        precompressor = Precompressor(min_size=10, workers=2)
+        precompressor.submit_tree(self.root)
+        stats = precompressor.finish()
+        self.assertEqual(stats["compressed"], 1)
+        self.assertEqual(stats["orphans_removed"], 1)
+        self.assertTrue(os.path.exists(page + ".gz"))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "gone.html.gz")))
+        self.assertTrue(os.path.exists(os.path.join(self.root, "archive.tar.gz")))
+
+    def test_remove_precompressed(self):
+        page = os.path.join(self.root, "blog", "index.html")
+        write_file(page, "<p>hello</p>" * 200)
+        write_file(os.path.join(self.root, "small.css"), "p{}")
+        precompressor = Precompressor(min_size=10)
+        precompressor.submit_tree(self.root)
+        precompressor.finish()
+        # A .gz the site ships itself isn't the precompressor's to remove
+        write_file(os.path.join(self.root, "data.json.gz"), "kept")
+
+        remove_precompressed(self.root)
+        self.assertFalse(os.path.exists(page + ".gz"))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "small.css.gz")))
+        self.assertTrue(os.path.exists(page))
+        self.assertTrue(os.path.exists(os.path.join(self.root, "data.json.gz")))
+        self.assertEqual(sorted(os.listdir(self.root)), ["blog", "data.json.gz", "small.css"])
+        # Nothing to do the second time
+        remove_precompressed(self.root)
+
+    def test_pages_are_submitted_as_written(self):
+        content = os.path.join(self.root, "content")
+        public = os.path.join(self.root, "public")
+        template = os.path.join(self.root, "template.html")
+        write_file(template, "{{ Content }}")
+        write_file(os.path.join(content, "index.md"), "# Home\n\n" + "Some text. " * 200)
+
+        precompressor = Precompressor(min_size=10)
+        generate_pages_recursive(content, template, public, "/", on_written=precompressor.submit)
+        self.assertEqual(list(precompressor.futures), [os.path.join(public, "index.html")])
+        stats = precompressor.finish()
+        self.assertEqual(stats["compressed"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import unittest
+
+from block_memo import block_memo
+from generate_content import generate_page, generate_pages_recursive
+from profiling import PAGE_STAGES, disable_profiling, enable_profiling, get_profiler
+from testutil import write_file
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        write_file(self.template, '<title>{{ Title }}</title><a href="/x">{{ Content }}</a>')
+        for i in range(3):
+            write_file(
+                os.path.join(self.content, f"page{i}", "index.md"),
+                f"# Page {i}\n\n" + "Some **bold** and _italic_ text.\n\n" * (i + 1),
+            )
+
+    def tearDown(self):
+        disable_profiling()
+        self.tmp.cleanup()
+
+    def test_off_by_default(self):
+        self.assertIsNone(get_profiler())
+
+    def test_profiled_page_matches_streamed_page(self):
+        source = os.path.join(self.content, "page2", "index.md")
+        plain = os.path.join(self.tmp.name, "plain.html")
+        profiled = os.path.join(self.tmp.name, "profiled.html")
+        generate_page(source, self.template, plain, "/site/")
+        # Otherwise every block would come out of the memo without being parsed again
+        block_memo.clear()
+        profiler = enable_profiling()
+        generate_page(source, self.template, profiled, "/site/")
+        with open(plain) as a, open(profiled) as b:
+            self.assertEqual(a.read(), b.read())
+        self.assertEqual(set(profiler.pages[source]), set(PAGE_STAGES))
+        self.assertGreater(profiler.pages[source]["inline_parse"], 0)
+
+    def test_slowest_pages_and_trace(self):
+        profiler = enable_profiling()
+        generate_pages_recursive(self.content, self.template, os.path.join(self.tmp.name, "public"), "/")
+        slowest = profiler.slowest_pages(2)
+        self.assertEqual(len(slowest), 2)
+        self.assertGreaterEqual(slowest[0][0], slowest[1][0])
+        self.assertIn("Slowest 2 of 3 pages", profiler.report(2))
+
+        trace_path = os.path.join(self.tmp.name, "trace.json")
+        profiler.write_chrome_trace(trace_path)
+        with open(trace_path) as f:
+            events = json.load(f)["traceEvents"]
+        self.assertEqual(len([e for e in events if e["cat"] == "page"]), 3)
+        for event in events:
+            self.assertEqual(event["ph"], "X")
+            self.assertGreaterEqual(event["ts"], 0)
+
+    def test_parallel_build_merges_worker_profiles(self):
+        profiler = enable_profiling()
+        generate_pages_recursive(
+            self.content, self.template, os.path.join(self.tmp.name, "public"), "/", jobs=2
+        )
+        self.assertEqual(len(profiler.pages), 3)
+        self.assertEqual(len([e for e in profiler.events if e[1] == "page"]), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import json
+import os
+import tempfile
+import unittest
+
+from dependencies import configure_word_collection
+from generate_content import generate_pages_recursive
+from search_index import SearchIndex, decode_postings, encode_postings, page_url, shard_key, tokenize
+from testutil import write_file
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+class TestSearchHelpers(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Tolkien's Hobbit, 2nd ed. (a snake_case Éowyn)"),
+                         ["tolkien", "hobbit", "2nd", "ed", "snake", "case", "éowyn"])
+
+    def test_postings_round_trip(self):
+        postings = [(0, 3), (4, 1), (5, 2), (120, 7)]
+        self.assertEqual(encode_postings(postings), [0, 3, 4, 1, 1, 2, 115, 7])
+        self.assertEqual(decode_postings(encode_postings(postings)), postings)
+
+    def test_shard_key(self):
+        self.assertEqual(shard_key("tolkien"), "to")
+        self.assertEqual(shard_key("2nd"), "2n")
+        self.assertEqual(shard_key("éowyn"), "_")
+
+    def test_page_url(self):
+        self.assertEqual(page_url("index.html", "/"), "/")
+        self.assertEqual(page_url(os.path.join("blog", "tom", "index.html"), "/site/"), "/site/blog/tom/")
+        self.assertEqual(page_url("about.html", "/"), "/about.html")
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.public = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def document(self, name, words):
+        return {"url": f"/{name}/", "title": name.title(), "words": words}
+
+    def shard(self, key):
+        return read_json(os.path.join(self.public, "search", key + ".json"))
+
+    def test_update(self):
+        documents = {
+            "a.html": self.document("a", {"tolkien": 2, "tom": 1}),
+            "b.html": self.document("b", {"tolkien": 1, "ring": 4}),
+        }
+        stats = SearchIndex(self.public).update(documents, documents)
+        self.assertEqual(stats, {"documents": 2, "shards_written": 2, "shards_removed": 0})
+        self.assertEqual(self.shard("to"), {"tolkien": [0, 2, 1, 1], "tom": [0, 1]})
+        self.assertEqual(self.shard("ri"), {"ring": [1, 4]})
+        self.assertEqual(read_json(os.path.join(self.public, "search", "documents.json")), {
+            "version": 1, "shards": ["ri", "to"], "documents": [["/a/", "A"], ["/b/", "B"]],
+        })
+
+        # Only the shard of the changed word is written again
+        changed = {"b.html": self.document("b", {"tolkien": 1, "ring": 5})}
+        stats = SearchIndex(self.public).update(documents, changed)
+        self.assertEqual(stats["shards_written"], 1)
+        self.assertEqual(self.shard("ri"), {"ring": [1, 5]})
+
+        # A removed page gives up its ID to the next new page, and empty shards go
+        pages = {"b.html", "c.html"}
+        stats = SearchIndex(self.public).update(pages, {"c.html": self.document("c", {"ring": 1})})
+        self.assertEqual(stats["shards_removed"], 0)
+        self.assertEqual(self.shard("to"), {"tolkien": [1, 1]})
+        self.assertEqual(self.shard("ri"), {"ring": [0, 1, 1, 5]})
+        stats = SearchIndex(self.public).update({"c.html"}, {})
+        self.assertEqual(stats["shards_removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "search", "to.json")))
+
+    def test_page_without_words(self):
+        documents = {"a.html": self.document("a", None)}
+        with self.assertRaisesRegex(ValueError, r"no words were collected for a\.html"):
+            SearchIndex(self.public).update(documents, documents)
+
+
+class TestSearchBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.public = os.path.join(self.tmp.name, "public")
+        write_file(self.template, "{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nWelcome, *Tolkien* fans.\n\nShared footer")
+        write_file(os.path.join(self.content, "tom", "index.md"), "# Tom\n\n[Tom](/) Bombadil\n\nShared footer")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        configure_word_collection(False)
+
+    def build(self, search=True):
+        return generate_pages_recursive(self.content, self.template, self.public, "/", incremental=True, search=search)
+
+    def postings(self, term):
+        shard_path = os.path.join(self.public, "search", shard_key(term) + ".json")
+        shard = read_json(shard_path) if os.path.exists(shard_path) else {}
+        documents = read_json(os.path.join(self.public, "search", "documents.json"))["documents"]
+        return {documents[doc][0]: count for doc, count in decode_postings(shard.get(term, []))}
+
+    def test_words_of_every_page(self):
+        self.build()
+        self.assertEqual(self.postings("tolkien"), {"/": 1})
+        self.assertEqual(self.postings("tom"), {"/tom/": 2})
+        # The footer block comes from the block memo on the second page
+        self.assertEqual(self.postings("footer"), {"/": 1, "/tom/": 1})
+
+    def test_enabling_search_rebuilds_pages_missing_from_it(self):
+        self.build(search=False)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "search")))
+        stats = self.build()
+        self.assertEqual(set(stats["reasons"].values()), {"not in search index"})
+        self.assertEqual(self.postings("bombadil"), {"/tom/": 1})
+
+        stats = self.build()
+        self.assertEqual(stats["rebuilt"], 0)
+        write_file(os.path.join(self.content, "tom", "index.md"), "# Tom\n\nGoldberry")
+        stats = self.build()
+        self.assertEqual(stats["rebuilt"], 1)
+        self.assertEqual(self.postings("bombadil"), {})
+        self.assertEqual(self.postings("goldberry"), {"/tom/": 1})
+
+        self.build(search=False)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "search")))
+
+
+if __name__ == "__main__":
+    unittest.main()
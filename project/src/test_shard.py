@@ -0,0 +1,131 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from copystatic import sync_static_files
+from generate_content import collect_pages, generate_pages_recursive
+from manifest import load_manifest, save_shard_record
+from shard import STATIC_SHARD, make_shard_record, merge_shards, parse_shard, shard_of, shard_pages
+from testutil import write_file
+
+
+def read_tree(root):
+    tree = {}
+    for dir_path, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dir_path, filename)
+            with open(path, 'rb') as f:
+                tree[os.path.relpath(path, root)] = f.read()
+    return tree
+
+
+def build_shard(content, static, template, dest, index, count, search=False):
+    # What main.py --shard does, minus the options
+    if index == STATIC_SHARD:
+        sync_static_files(static, dest)
+    all_pages = collect_pages(content, dest)
+    pages = shard_pages(all_pages, content, index, count)
+    generate_pages_recursive(content, template, dest, "/", pages=pages, search=search, partial=True)
+    save_shard_record(dest, make_shard_record(index, count, all_pages, pages, content, dest))
+
+
+class TestShard(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.static = os.path.join(self.tmp.name, "static")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        for i in range(12):
+            write_file(os.path.join(self.content, f"section{i % 3}", f"page{i}.md"), f"# Page {i}\n\n[home](/)")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build_shards(self, count, search=False):
+        # Each shard in a process of its own, as on separate build nodes
+        shard_dirs = [os.path.join(self.tmp.name, "shards", str(index)) for index in range(count)]
+        processes = [
+            multiprocessing.Process(
+                target=build_shard, args=(self.content, self.static, self.template, shard_dir, index, count, search)
+            )
+            for index, shard_dir in enumerate(shard_dirs)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+        return shard_dirs
+
+    def test_shard_of_is_stable_and_spread(self):
+        self.assertEqual(shard_of("blog/post.md", 4), shard_of("blog/post.md", 4))
+        self.assertEqual(shard_of(os.path.join("blog", "post.md"), 4), shard_of("blog/post.md", 4))
+        self.assertEqual({shard_of(f"page{i}.md", 4) for i in range(100)}, {0, 1, 2, 3})
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for text in ("4/4", "-1/4", "1", "a/b", "0/0"):
+            with self.assertRaises(ValueError):
+                parse_shard(text)
+
+    def test_merge_matches_full_build(self):
+        full = os.path.join(self.tmp.name, "full")
+        sync_static_files(self.static, full)
+        generate_pages_recursive(self.content, self.template, full, "/")
+
+        merged = os.path.join(self.tmp.name, "merged")
+        stats = merge_shards(self.build_shards(3), merged)
+        self.assertEqual(stats["pages"], 13)
+        self.assertEqual(read_tree(merged), read_tree(full))
+        self.assertEqual(load_manifest(merged), load_manifest(full))
+
+        # The merged output carries on as an incremental build
+        stats = generate_pages_recursive(self.content, self.template, merged, "/", incremental=True)
+        self.assertEqual((stats["rebuilt"], stats["skipped"]), (0, 13))
+
+    def test_merge_writes_search_index(self):
+        shard_dirs = self.build_shards(3, search=True)
+        for shard_dir in shard_dirs:
+            self.assertFalse(os.path.exists(os.path.join(shard_dir, "search")))
+        merged = os.path.join(self.tmp.name, "merged")
+        stats = merge_shards(shard_dirs, merged)
+        self.assertEqual(stats["search"]["documents"], 13)
+        with open(os.path.join(merged, "search", "documents.json")) as f:
+            documents = json.load(f)["documents"]
+        self.assertEqual(sorted(url for url, _ in documents)[:2], ["/", "/section0/page0.html"])
+
+    def test_missing_shard(self):
+        shard_dirs = self.build_shards(3)
+        with self.assertRaisesRegex(ValueError, r"missing \[1\]"):
+            merge_shards([shard_dirs[0], shard_dirs[2]], os.path.join(self.tmp.name, "merged"))
+
+    def test_collision(self):
+        shard_dirs = self.build_shards(2)
+        write_file(os.path.join(shard_dirs[1], "index.css"), "body { margin: 0 }")
+        merged = os.path.join(self.tmp.name, "merged")
+        with self.assertRaisesRegex(ValueError, r"more than one shard: index\.css"):
+            merge_shards(shard_dirs, merged)
+        self.assertFalse(os.path.exists(merged))
+
+    def test_missing_page(self):
+        shard_dirs = self.build_shards(2)
+        record_dir = shard_dirs[shard_of("index.md", 2)]
+        os.remove(os.path.join(record_dir, "index.html"))
+        with self.assertRaisesRegex(ValueError, r"missing from their shard's output: index\.html"):
+            merge_shards(shard_dirs, os.path.join(self.tmp.name, "merged"))
+
+    def test_different_content_trees(self):
+        shard_dirs = self.build_shards(2)
+        write_file(os.path.join(self.content, "new.md"), "# New")
+        build_shard(self.content, self.static, self.template, shard_dirs[1], 1, 2)
+        with self.assertRaisesRegex(ValueError, "different content tree"):
+            merge_shards(shard_dirs, os.path.join(self.tmp.name, "merged"))
+
+
+if __name__ == "__main__":
+    unittest.main()
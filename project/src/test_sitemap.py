@@ -0,0 +1,150 @@
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+from generate_content import generate_pages_recursive
+from sitemap import ATOM_NS, SITEMAP_NS, Sitemap, page_dates, page_section
+from testutil import write_file
+
+SITE_URL = "https://example.org"
+
+
+def read_xml(path):
+    return ET.parse(path).getroot()
+
+
+def entry(url, updated, published=None, title="Page", author=None):
+    return {"url": url, "title": title, "published": published or updated, "updated": updated, "author": author}
+
+
+class TestSitemapHelpers(unittest.TestCase):
+    def test_page_dates(self):
+        self.assertEqual(page_dates({"Date": "2024-05-01"}, "unused.md"),
+                         ("2024-05-01T00:00:00Z", "2024-05-01T00:00:00Z"))
+        self.assertEqual(page_dates({"Date": "2024-05-01", "Updated": "2024-06-01 12:30+02:00"}, "unused.md"),
+                         ("2024-05-01T00:00:00Z", "2024-06-01T10:30:00Z"))
+        with self.assertRaisesRegex(ValueError, r"page\.md: invalid Date"):
+            page_dates({"Date": "May 1st"}, "page.md")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "page.md")
+            write_file(path, "# Page")
+            os.utime(path, (0, 86400))
+            self.assertEqual(page_dates({}, path), ("1970-01-02T00:00:00Z", "1970-01-02T00:00:00Z"))
+
+    def test_page_section(self):
+        self.assertEqual(page_section(os.path.join("blog", "tom", "index.html")), "blog")
+        self.assertEqual(page_section(os.path.join("blog", "post.html")), "blog")
+        self.assertIsNone(page_section(os.path.join("blog", "index.html")))
+        self.assertIsNone(page_section("about.html"))
+
+
+class TestSitemap(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.public = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, *parts):
+        return os.path.join(self.public, *parts)
+
+    def test_sitemap_and_feed(self):
+        entries = {
+            "index.html": entry("/", "2024-01-01T00:00:00Z", title="Home"),
+            os.path.join("blog", "index.html"): entry("/blog/", "2024-01-01T00:00:00Z", title="Blog & News"),
+            os.path.join("blog", "old.html"): entry("/blog/old.html", "2024-03-01T00:00:00Z", "2024-01-01T00:00:00Z"),
+            os.path.join("blog", "new.html"): entry("/blog/new.html", "2024-02-01T00:00:00Z", author="Tom"),
+        }
+        stats = Sitemap(self.public).update(entries, entries, SITE_URL + "/", "/")
+        self.assertEqual(stats, {"urls": 4, "written": 2, "unchanged": 0, "removed": 0})
+
+        urls = read_xml(self.path("sitemap.xml"))
+        self.assertEqual(
+            [(url.findtext(f"{{{SITEMAP_NS}}}loc"), url.findtext(f"{{{SITEMAP_NS}}}lastmod")) for url in urls],
+            [
+                ("https://example.org/", "2024-01-01T00:00:00Z"),
+                ("https://example.org/blog/", "2024-01-01T00:00:00Z"),
+                ("https://example.org/blog/new.html", "2024-02-01T00:00:00Z"),
+                ("https://example.org/blog/old.html", "2024-03-01T00:00:00Z"),
+            ],
+        )
+
+        feed = read_xml(self.path("blog", "feed.xml"))
+        self.assertEqual(feed.findtext(f"{{{ATOM_NS}}}title"), "Blog & News")
+        self.assertEqual(feed.findtext(f"{{{ATOM_NS}}}updated"), "2024-03-01T00:00:00Z")
+        # Newest published first, and the section's own index page isn't an entry
+        feed_entries = feed.findall(f"{{{ATOM_NS}}}entry")
+        self.assertEqual([e.findtext(f"{{{ATOM_NS}}}id") for e in feed_entries],
+                         ["https://example.org/blog/new.html", "https://example.org/blog/old.html"])
+        self.assertEqual(feed_entries[0].findtext(f"{{{ATOM_NS}}}author/{{{ATOM_NS}}}name"), "Tom")
+
+    def test_split_at_url_limit(self):
+        entries = {f"page{i}.html": entry(f"/page{i}.html", f"2024-01-0{i + 1}T00:00:00Z") for i in range(5)}
+        stats = Sitemap(self.public).update(entries, entries, SITE_URL, "/site/", max_urls=2)
+        self.assertEqual(stats["written"], 4)
+        index = read_xml(self.path("sitemap.xml"))
+        self.assertEqual(index.tag, f"{{{SITEMAP_NS}}}sitemapindex")
+        self.assertEqual(
+            [(s.findtext(f"{{{SITEMAP_NS}}}loc"), s.findtext(f"{{{SITEMAP_NS}}}lastmod")) for s in index],
+            [
+                ("https://example.org/site/sitemap-1.xml", "2024-01-02T00:00:00Z"),
+                ("https://example.org/site/sitemap-2.xml", "2024-01-04T00:00:00Z"),
+                ("https://example.org/site/sitemap-3.xml", "2024-01-05T00:00:00Z"),
+            ],
+        )
+        self.assertEqual(len(read_xml(self.path("sitemap-3.xml"))), 1)
+
+        # Only the shard holding the changed page and the index are written again
+        for name in os.listdir(self.public):
+            os.utime(self.path(name), (0, 0))
+        changed = {"page4.html": entry("/page4.html", "2024-02-01T00:00:00Z")}
+        stats = Sitemap(self.public).update(entries, changed, SITE_URL, "/site/", max_urls=2)
+        self.assertEqual((stats["written"], stats["unchanged"]), (2, 2))
+        self.assertEqual(os.stat(self.path("sitemap-1.xml")).st_mtime, 0)
+        self.assertNotEqual(os.stat(self.path("sitemap-3.xml")).st_mtime, 0)
+
+        # Back under the limit, the shards go
+        stats = Sitemap(self.public).update({"page0.html", "page1.html"}, {}, SITE_URL, "/site/", max_urls=2)
+        self.assertEqual(stats["removed"], 3)
+        self.assertEqual(sorted(os.listdir(self.public)), [".sitemap-manifest.json", "sitemap.xml"])
+
+
+class TestSitemapBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.public = os.path.join(self.tmp.name, "public")
+        write_file(self.template, "{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "blog", "tom", "index.md"),
+                   "---\nDate: 2024-05-01\nAuthor: Tom\n---\n# Tom")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, site_url=SITE_URL):
+        return generate_pages_recursive(self.content, self.template, self.public, "/", incremental=True,
+                                        site_url=site_url)
+
+    def test_build(self):
+        self.build(site_url=None)
+        stats = self.build()
+        self.assertEqual(set(stats["reasons"].values()), {"not in sitemap"})
+        self.assertEqual(stats["sitemap"]["written"], 2)
+        feed = read_xml(os.path.join(self.public, "blog", "feed.xml"))
+        self.assertEqual(feed.findtext(f"{{{ATOM_NS}}}entry/{{{ATOM_NS}}}published"), "2024-05-01T00:00:00Z")
+
+        stats = self.build()
+        self.assertEqual((stats["rebuilt"], stats["sitemap"]["unchanged"]), (0, 2))
+
+        self.build(site_url=None)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "sitemap.xml")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "feed.xml")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import TemplateCache, compile_template, find_layout
+from testutil import write_file
+
+
+class TestTemplate(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "template.html")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_render_matches_replace(self):
+        text = '<title>{{ Title }}</title><link href="/index.css" />{{ Content }}'
+        write_file(self.path, text)
+        content = '<img src="/images/a.png" alt="a"></img>'
+        expected = text.replace("{{ Title }}", "Hi").replace("{{ Content }}", content)
+        expected = expected.replace('href="/', 'href="/site/').replace('src="/', 'src="/site/')
+        template = compile_template(self.path, "/site/")
+        self.assertEqual(template.render({"Title": "Hi", "Content": content}), expected)
+
+    def test_write_streams_nodes(self):
+        write_file(self.path, '<link href="/a.css" />{{ Content }}<footer>{{ Content }}</footer>')
+        template = compile_template(self.path, "/site/")
+        node = ParentNode("p", [LeafNode("a", "x", {"href": "/x"}), LeafNode(None, "y")])
+        stream = io.StringIO()
+        template.write(stream, {"Content": node})
+        self.assertEqual(stream.getvalue(), template.render({"Content": node}))
+        self.assertEqual(
+            stream.getvalue(),
+            '<link href="/site/a.css" /><p><a href="/site/x">x</a>y</p>'
+            '<footer><p><a href="/site/x">x</a>y</p></footer>',
+        )
+
+    def test_minified(self):
+        write_file(self.path, "<html>\n  <head>\n    <title>{{ Title }}</title>\n  </head>\n"
+                              "  <body>\n    {{ Content }}\n  </body>\n</html>\n")
+        template = compile_template(self.path, minify=True)
+        self.assertNotEqual(template.fingerprint, compile_template(self.path).fingerprint)
+        content = ParentNode("p", [LeafNode(None, "a  b"), LeafNode("img", "", {"src": "/x.png"})])
+        minifier = template.make_minifier()
+        expected = '<html><head><title>Hi</title></head><body><p>a b<img src="/x.png"></p></body></html>'
+        self.assertEqual(template.render({"Title": "Hi", "Content": content}, minifier), expected)
+        plain = compile_template(self.path).render({"Title": "Hi", "Content": content})
+        self.assertEqual(minifier.saved, len(plain) - len(expected))
+
+        stream = io.StringIO()
+        template.write(stream, {"Title": "Hi", "Content": content})
+        self.assertEqual(stream.getvalue(), expected)
+
+    def test_assets(self):
+        write_file(self.path, '<link href="/index.css" /><img src="{{ Image }}" />{{ Content }}')
+        assets = {"/index.css": "/index.3f9a1c2b.css", "/a.png": "/a.0123abcd.png"}
+        template = compile_template(self.path, "/site/", assets=assets)
+        self.assertNotEqual(template.fingerprint, compile_template(self.path, "/site/").fingerprint)
+        content = ParentNode("p", [LeafNode("img", "", {"src": "/a.png"}), LeafNode("a", "b", {"href": "/b.png"})])
+        expected = ('<link href="/site/index.3f9a1c2b.css" /><img src="/site/a.0123abcd.png" />'
+                    '<p><img src="/site/a.0123abcd.png"></img><a href="/site/b.png">b</a></p>')
+        self.assertEqual(template.render({"Image": "/a.png", "Content": content}), expected)
+        stream = io.StringIO()
+        template.write(stream, {"Image": "/a.png", "Content": content})
+        self.assertEqual(stream.getvalue(), expected)
+
+    def test_unknown_slot_left_alone(self):
+        write_file(self.path, "{{ Title }} {{ Missing }}")
+        template = compile_template(self.path)
+        self.assertEqual(template.render({"Title": "Hi"}), "Hi {{ Missing }}")
+
+    def test_slot_in_url_attribute(self):
+        write_file(self.path, '<a href="{{ url }}">x</a>')
+        template = compile_template(self.path, "/site/")
+        self.assertEqual(template.render({"url": "/blog"}), '<a href="/site/blog">x</a>')
+
+    def test_include(self):
+        write_file(os.path.join(self.tmp.name, "partials", "nav.html"), "<nav>{{ Title }}</nav>")
+        write_file(self.path, '<body>{% include "partials/nav.html" %}{{ Content }}</body>')
+        template = compile_template(self.path)
+        self.assertEqual(
+            template.render({"Title": "T", "Content": "C"}), "<body><nav>T</nav>C</body>"
+        )
+        self.assertEqual(len(template.dependencies), 2)
+
+    def test_include_cycle(self):
+        write_file(self.path, '{% include "template.html" %}')
+        with self.assertRaises(ValueError):
+            compile_template(self.path)
+
+    def test_cache_invalidated_by_mtime(self):
+        write_file(self.path, "one {{ Title }}")
+        cache = TemplateCache()
+        first = cache.get(self.path)
+        self.assertIs(cache.get(self.path), first)
+        write_file(self.path, "two {{ Title }}")
+        future = time.time() + 10
+        os.utime(self.path, (future, future))
+        second = cache.get(self.path)
+        self.assertIsNot(second, first)
+        self.assertNotEqual(second.fingerprint, first.fingerprint)
+        self.assertEqual(second.render({"Title": "x"}), "two x")
+
+    def test_find_layout(self):
+        content = os.path.join(self.tmp.name, "content")
+        write_file(os.path.join(content, "blog", "layout.html"), "{{ Content }}")
+        write_file(os.path.join(content, "blog", "post", "index.md"), "# Post")
+        write_file(os.path.join(content, "index.md"), "# Home")
+        layouts = {}
+        self.assertEqual(
+            find_layout(os.path.join(content, "blog", "post", "index.md"), content, self.path, layouts),
+            os.path.join(content, "blog", "layout.html"),
+        )
+        self.assertEqual(
+            find_layout(os.path.join(content, "index.md"), content, self.path, layouts),
+            self.path,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import inspect
+import os
+import sys
+import tempfile
+import unittest
+
+from testutil import write_file
+from walk import walk_files
+
+
+class TestWalkFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        for rel_path in ("b.md", "a/z.md", "a/image.png", "drafts/wip.md", "c/d/e.md", "a.md"):
+            write_file(os.path.join(self.root, rel_path), rel_path)
+        os.makedirs(os.path.join(self.root, "empty"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def walk(self, **kwargs):
+        return [rel_path.replace(os.sep, "/") for rel_path, _ in walk_files(self.root, **kwargs)]
+
+    def test_sorted_depth_first(self):
+        self.assertEqual(self.walk(), ["a/image.png", "a/z.md", "a.md", "b.md", "c/d/e.md", "drafts/wip.md"])
+
+    def test_entries(self):
+        for rel_path, entry in walk_files(self.root):
+            self.assertEqual(entry.path, os.path.join(self.root, rel_path))
+            self.assertEqual(entry.stat().st_size, len(rel_path.replace(os.sep, "/")))
+
+    def test_globs(self):
+        self.assertEqual(self.walk(include=("*.md",), exclude=("drafts",)), ["a/z.md", "a.md", "b.md", "c/d/e.md"])
+        self.assertEqual(self.walk(exclude=("*.png", "c/*")), ["a/z.md", "a.md", "b.md", "drafts/wip.md"])
+        self.assertEqual(self.walk(include=("a/*",)), ["a/image.png", "a/z.md"])
+
+    def test_deeper_than_recursion_limit(self):
+        # A tree deeper than the stack the walk is given room for
+        path = os.path.join(self.root, "deep")
+        for _ in range(200):
+            path = os.path.join(path, "d")
+        write_file(path + ".md")
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(len(inspect.stack()) + 50)
+        try:
+            files = [rel_path for rel_path, _ in walk_files(os.path.join(self.root, "deep"))]
+        finally:
+            sys.setrecursionlimit(limit)
+        self.assertEqual(files, [os.path.relpath(path + ".md", os.path.join(self.root, "deep"))])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import gzip
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from copystatic import sync_static_files
+from dependencies import configure_word_collection
+from generate_content import generate_pages_recursive
+from template import configure_assets
+from testutil import read_file, write_file
+from watch import InotifyWatcher, PollingWatcher, Rebuilder, make_watcher
+
+
+class TestRebuilder(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.public = os.path.join(root, "public")
+        self.template = os.path.join(root, "template.html")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        generate_pages_recursive(self.content, self.template, self.public, "/", incremental=True)
+        self.rebuilder = Rebuilder(self.content, self.static, self.template, self.public, "/")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_page_change_rebuilds_only_that_page(self):
+        other = os.path.join(self.public, "blog", "index.html")
+        os.utime(other, (0, 0))
+        source = os.path.join(self.content, "index.md")
+        write_file(source, "# Home again")
+        self.rebuilder.handle({source})
+        self.assertIn("Home again", read_file(os.path.join(self.public, "index.html")))
+        self.assertEqual(os.stat(other).st_mtime, 0)
+
+    def test_deleted_page_removed(self):
+        source = os.path.join(self.content, "blog", "index.md")
+        os.remove(source)
+        self.rebuilder.handle({source})
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "index.html")))
+
+    def test_static_file_copied_and_removed(self):
+        css = os.path.join(self.static, "index.css")
+        self.rebuilder.handle({css})
+        self.assertEqual(read_file(os.path.join(self.public, "index.css")), "body {}")
+        os.remove(css)
+        self.rebuilder.handle({css})
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.css")))
+
+    def test_precompressed_siblings_follow_rebuilds(self):
+        rebuilder = Rebuilder(self.content, self.static, self.template, self.public, "/",
+                              precompress=True, gzip_min_size=0)
+        source = os.path.join(self.content, "index.md")
+        write_file(source, "# Home again")
+        rebuilder.handle({source})
+        with gzip.open(os.path.join(self.public, "index.html.gz"), 'rt') as f:
+            self.assertIn("Home again", f.read())
+        os.remove(source)
+        rebuilder.handle({source})
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.html.gz")))
+
+    def test_fingerprinted_assets_follow_rebuilds(self):
+        write_file(self.template, '<link href="/index.css">{{ Content }}')
+        stats = sync_static_files(self.static, self.public, fingerprint=True)
+        configure_assets(stats["assets"])
+        self.addCleanup(configure_assets, None)
+        generate_pages_recursive(self.content, self.template, self.public, "/", incremental=True)
+        rebuilder = Rebuilder(self.content, self.static, self.template, self.public, "/", fingerprint=True)
+
+        css = os.path.join(self.static, "index.css")
+        write_file(css, "body { margin: 0 }")
+        rebuilder.handle({css})
+        with open(os.path.join(self.public, "asset-manifest.json")) as f:
+            new_name = json.load(f)["assets"]["/index.css"]
+        self.assertNotEqual(new_name, stats["assets"]["/index.css"])
+        self.assertEqual(read_file(os.path.join(self.public, new_name[1:])), "body { margin: 0 }")
+        self.assertFalse(os.path.exists(os.path.join(self.public, stats["assets"]["/index.css"][1:])))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.css")))
+        self.assertIn(f'href="{new_name}"', read_file(os.path.join(self.public, "index.html")))
+
+    def test_search_index_kept(self):
+        generate_pages_recursive(self.content, self.template, self.public, "/", incremental=True, search=True)
+        self.addCleanup(configure_word_collection, False)
+        rebuilder = Rebuilder(self.content, self.static, self.template, self.public, "/", search=True)
+        source = os.path.join(self.content, "index.md")
+        write_file(source, "# Home of Goldberry")
+        rebuilder.handle({source})
+        with open(os.path.join(self.public, "search", "go.json")) as f:
+            self.assertIn("goldberry", json.load(f))
+
+    def test_sitemap_kept(self):
+        site_url = "https://example.org"
+        generate_pages_recursive(self.content, self.template, self.public, "/", incremental=True, site_url=site_url)
+        rebuilder = Rebuilder(self.content, self.static, self.template, self.public, "/", site_url=site_url)
+        source = os.path.join(self.content, "blog", "post.md")
+        write_file(source, "# Post")
+        rebuilder.handle({source})
+        self.assertIn("https://example.org/blog/post.html", read_file(os.path.join(self.public, "sitemap.xml")))
+        self.assertIn("https://example.org/blog/post.html", read_file(os.path.join(self.public, "blog", "feed.xml")))
+
+    def test_template_change_rebuilds_all(self):
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        os.utime(self.template, (1, 1))
+        self.rebuilder.handle({self.template})
+        self.assertTrue(read_file(os.path.join(self.public, "blog", "index.html")).startswith("<h1>"))
+
+
+class TestWatchers(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        write_file(os.path.join(self.root, "index.md"), "# Home")
+        write_file(self.template, "{{ Content }}")
+        write_file(os.path.join(self.tmp.name, "unrelated.txt"), "")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check_watcher(self, watcher):
+        try:
+            source = os.path.join(self.root, "sub", "new.md")
+            write_file(source, "# New")
+            changed = watcher.wait(1.0)
+            self.assertIn(source, changed)
+            write_file(self.template, "{{ Title }}")
+            write_file(os.path.join(self.tmp.name, "unrelated.txt"), "x")
+            os.utime(self.template, (1, 1))
+            changed = watcher.wait(1.0)
+            self.assertIn(self.template, changed)
+            self.assertNotIn(os.path.join(self.tmp.name, "unrelated.txt"), changed)
+        finally:
+            watcher.close()
+
+    def test_polling(self):
+        self.check_watcher(PollingWatcher([self.root], {self.template}))
+
+    def test_inotify(self):
+        watcher = make_watcher([self.root], {self.template})
+        if not isinstance(watcher, InotifyWatcher):
+            watcher.close()
+            self.skipTest("inotify not available")
+        self.check_watcher(watcher)
+
+
+if __name__ == "__main__":
+    unittest.main()
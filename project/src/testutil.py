@@ -0,0 +1,15 @@
+import os
+
+# Helpers shared by the test modules
+
+
+def write_file(path, content=""):
+    # Create the file's directories as needed
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def read_file(path):
+    with open(path) as f:
+        return f.read()
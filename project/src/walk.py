@@ -0,0 +1,40 @@
+import fnmatch
+import os
+
+
+def matches(rel_path, patterns):
+    # Globs are matched against the path relative to the walk's root, with "/" separators;
+    # "*" also matches across directories, so "*.md" matches blog/post.md
+    rel_path = rel_path.replace(os.sep, "/")
+    return any(fnmatch.fnmatchcase(rel_path, pattern) for pattern in patterns)
+
+
+def sorted_entries(dir_path):
+    with os.scandir(dir_path) as entries:
+        return sorted(entries, key=lambda entry: entry.name)
+
+
+def walk_files(root, include=None, exclude=None):
+    # Yield (path relative to root, os.DirEntry) for every file under root, depth first with
+    # each directory's entries in name order, so every walk of the same tree agrees.
+    # is_file() and is_dir() come from the directory listing itself on most filesystems,
+    # and stat() is fetched once and cached by the entry, so a caller that needs sizes or
+    # mtimes gets them without another stat call. A file is yielded if it matches one of the
+    # include globs (any file without them) and none of the exclude globs; a directory that
+    # matches an exclude glob isn't entered. An explicit stack instead of recursion keeps
+    # very deep trees clear of the recursion limit.
+    stack = [("", iter(sorted_entries(root)))]
+    while stack:
+        rel_dir_path, entries = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        rel_path = os.path.join(rel_dir_path, entry.name)
+        if exclude and matches(rel_path, exclude):
+            continue
+        if entry.is_file():
+            if not include or matches(rel_path, include):
+                yield rel_path, entry
+        elif entry.is_dir():
+            stack.append((rel_path, iter(sorted_entries(entry.path))))
@@ -0,0 +1,384 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from copystatic import copy_file, sync_static_files
+from generate_content import build_page, generate_pages_recursive, page_dest_path
+from png_optimize import PNGOptimizer
+from precompress import DEFAULT_LEVEL, DEFAULT_MIN_SIZE, Precompressor
+from template import configure_assets, find_layout, load_template
+
+POLL_INTERVAL = 0.1
+LIVERELOAD_PATH = "/__livereload"
+LIVERELOAD_SCRIPT = (
+    f'<script>new EventSource("{LIVERELOAD_PATH}").onmessage = () => location.reload();</script>'
+)
+
+# inotify event bits, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    # Portable fallback: compare the mtimes of every watched file between polls
+    def __init__(self, roots, files):
+        self.roots = roots
+        self.files = files
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self):
+        snapshot = {}
+        for root in self.roots:
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        snapshot[path] = os.stat(path).st_mtime_ns
+                    except OSError:
+                        pass
+        for path in self.files:
+            try:
+                snapshot[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                pass
+        return snapshot
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            snapshot = self.take_snapshot()
+            changed = {
+                path for path in snapshot.keys() | self.snapshot.keys()
+                if snapshot.get(path) != self.snapshot.get(path)
+            }
+            self.snapshot = snapshot
+            if changed or time.monotonic() >= deadline:
+                return changed
+            time.sleep(POLL_INTERVAL)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    # Linux only: the kernel tells us which paths changed, so nothing is rescanned
+    def __init__(self, roots, files):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}
+        self.tree_dirs = set()
+        # Single files are watched through their directory, since editors often replace them by rename
+        self.files = {os.path.abspath(path) for path in files}
+        self.file_dirs = {os.path.dirname(path) for path in self.files}
+        for root in roots:
+            self.add_tree(root)
+        for directory in self.file_dirs:
+            self.add_directory(directory)
+
+    def add_directory(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.directories[wd] = os.path.abspath(directory)
+
+    def add_tree(self, root):
+        # Returns the files already in the tree, which may have appeared before the watch did
+        files = set()
+        for dirpath, _, filenames in os.walk(root):
+            self.add_directory(dirpath)
+            self.tree_dirs.add(os.path.abspath(dirpath))
+            files.update(os.path.join(dirpath, filename) for filename in filenames)
+        return files
+
+    def wait(self, timeout):
+        changed = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        while ready:
+            try:
+                data = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                break
+            changed.update(self.parse_events(data))
+            # Editors tend to write in bursts; give the rest of the burst a moment to arrive
+            ready, _, _ = select.select([self.fd], [], [], 0.01)
+        return changed
+
+    def parse_events(self, data):
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, so report every watched root as changed
+                changed.update(self.directories.values())
+                continue
+            directory = self.directories.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if directory not in self.tree_dirs and path not in self.files:
+                # Something else in the directory of a watched file
+                continue
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                changed.update(self.add_tree(path))
+            changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def make_watcher(roots, files):
+    try:
+        return InotifyWatcher(roots, files)
+    except (OSError, AttributeError):
+        # AttributeError: libc without inotify, i.e. not Linux
+        return PollingWatcher(roots, files)
+
+
+class ReloadBroadcaster:
+    # Connected browsers wait on this; every rebuild bumps the version and wakes them up
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+def make_handler(dir_path_public, broadcaster):
+    class LiveReloadHandler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=dir_path_public, **kwargs)
+
+        def do_GET(self):
+            if self.path == LIVERELOAD_PATH:
+                self.send_events()
+                return
+            path = self.translate_path(self.path)
+            if os.path.isdir(path):
+                path = os.path.join(path, "index.html")
+            if path.endswith(".html") and os.path.isfile(path):
+                self.send_html(path)
+                return
+            super().do_GET()
+
+        def send_html(self, path):
+            with open(path, 'rb') as f:
+                body = f.read()
+            script = LIVERELOAD_SCRIPT.encode()
+            if b"</body>" in body:
+                body = body.replace(b"</body>", script + b"</body>", 1)
+            else:
+                body += script
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_events(self):
+            # Server-sent events: one "reload" message per rebuild, comments as keepalives
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            version = broadcaster.version
+            try:
+                while True:
+                    new_version = broadcaster.wait(version, 15)
+                    if new_version != version:
+                        self.wfile.write(b"data: reload\n\n")
+                        version = new_version
+                    else:
+                        self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    return LiveReloadHandler
+
+
+class Rebuilder:
+    # Turns a set of changed paths into the smallest rebuild we know how to do
+    def __init__(self, dir_path_content, dir_path_static, template_path, dir_path_public, basepath,
+                 minify=False, fingerprint=False, image_cache_dir=None, search=False,
+                 site_url=None, precompress=False, gzip_level=DEFAULT_LEVEL, gzip_min_size=DEFAULT_MIN_SIZE):
+        self.dir_path_content = os.path.abspath(dir_path_content)
+        self.dir_path_static = os.path.abspath(dir_path_static)
+        self.template_path = os.path.abspath(template_path)
+        self.dir_path_public = dir_path_public
+        self.basepath = basepath
+        # Static files are written like a full build writes them, as SiteState does
+        self.minify = minify
+        self.fingerprint = fingerprint
+        self.image_cache_dir = image_cache_dir
+        # Rebuilds keep the search index and sitemap up to date, so page edits go through the
+        # incremental build
+        self.search = search
+        self.site_url = site_url
+        # The fingerprinted asset names pages were last rendered with
+        self.assets = None
+        # Every rebuild refreshes the .gz siblings of what it wrote, as SiteState does
+        self.precompress = precompress
+        self.gzip_level = gzip_level
+        self.gzip_min_size = gzip_min_size
+        self.on_written = None
+
+    def template_files(self):
+        return set(load_template(self.template_path, self.basepath).dependencies)
+
+    def handle(self, changed_paths):
+        rebuild_pages = False
+        sync_static = False
+        pages = set()
+        for path in changed_paths:
+            path = os.path.abspath(path)
+            if path.startswith(self.dir_path_content + os.sep):
+                if path.endswith(".md"):
+                    pages.add(path)
+                else:
+                    # Layouts, partials or whole directories: let the incremental build sort it out
+                    rebuild_pages = True
+            elif path.startswith(self.dir_path_static + os.sep):
+                if not self.update_static_file(path):
+                    sync_static = True
+            elif path == self.dir_path_static:
+                sync_static = True
+            else:
+                rebuild_pages = True
+
+        if pages and (self.search or self.site_url):
+            # Only the incremental build updates the search index, sitemap and feeds
+            rebuild_pages = True
+        precompressor = None
+        if self.precompress:
+            precompressor = Precompressor(self.gzip_level, self.gzip_min_size)
+            self.on_written = precompressor.submit
+        try:
+            self.rebuild(sync_static, rebuild_pages, pages)
+        finally:
+            self.on_written = None
+        if precompressor is not None:
+            # Also drops the .gz of pages and files that were removed
+            precompressor.submit_tree(self.dir_path_public)
+            precompressor.finish()
+
+    def rebuild(self, sync_static, rebuild_pages, pages):
+        if sync_static:
+            png_optimizer = PNGOptimizer(self.image_cache_dir) if self.image_cache_dir is not None else None
+            stats = sync_static_files(
+                self.dir_path_static, self.dir_path_public, on_written=self.on_written,
+                minify=self.minify, fingerprint=self.fingerprint, png_optimizer=png_optimizer,
+            )
+            if stats["assets"] != self.assets:
+                # Pages have to name the assets' new fingerprinted names
+                configure_assets(stats["assets"])
+                self.assets = stats["assets"]
+                rebuild_pages = True
+        if rebuild_pages:
+            generate_pages_recursive(
+                self.dir_path_content, self.template_path, self.dir_path_public,
+                self.basepath, incremental=True, on_written=self.on_written, search=self.search,
+                site_url=self.site_url,
+            )
+        else:
+            for path in sorted(pages):
+                self.update_page(path)
+
+    def written(self, dest_path):
+        if self.on_written is not None:
+            self.on_written(dest_path)
+
+    def update_page(self, entry_path):
+        dest_path = page_dest_path(entry_path, self.dir_path_content, self.dir_path_public)
+        if not os.path.exists(entry_path):
+            if os.path.exists(dest_path):
+                print(f"Removing {dest_path}")
+                os.remove(dest_path)
+            return
+        page_template_path = find_layout(entry_path, self.dir_path_content, self.template_path, {})
+        build_page(entry_path, page_template_path, dest_path, self.basepath)
+        self.written(dest_path)
+
+    def update_static_file(self, from_path):
+        # Returns False when the change can't be handled file by file
+        if self.minify or self.fingerprint or self.image_cache_dir is not None:
+            # The file isn't simply copied, and a fingerprinted name can change
+            return False
+        rel_path = os.path.relpath(from_path, self.dir_path_static)
+        dest_path = os.path.join(self.dir_path_public, rel_path)
+        if os.path.isfile(from_path):
+            copy_file(from_path, dest_path)
+            print(f" * {from_path} -> {dest_path}")
+            self.written(dest_path)
+            return True
+        if not os.path.exists(from_path) and os.path.isfile(dest_path):
+            os.remove(dest_path)
+            return True
+        return False
+
+
+def watch(dir_path_content, dir_path_static, template_path, dir_path_public, basepath="/", port=8888, **settings):
+    # settings are Rebuilder's build options, such as precompress
+    rebuilder = Rebuilder(dir_path_content, dir_path_static, template_path, dir_path_public, basepath, **settings)
+    broadcaster = ReloadBroadcaster()
+    server = ThreadingHTTPServer(("", port), make_handler(dir_path_public, broadcaster))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    watcher = make_watcher([dir_path_content, dir_path_static], rebuilder.template_files())
+    print(f"Watching for changes ({type(watcher).__name__}), serving on http://localhost:{port}/")
+    try:
+        while True:
+            changed = watcher.wait(1.0)
+            if not changed:
+                continue
+            start = time.perf_counter()
+            try:
+                rebuilder.handle(changed)
+            except Exception as e:
+                # Keep watching; the next save will usually fix it
+                print(f"Rebuild failed: {e}")
+                continue
+            broadcaster.notify()
+            print(f"Rebuilt {len(changed)} changed path(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        server.shutdown()